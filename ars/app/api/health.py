@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends
+
+from ars.app.schemas.health import PipelineHealthResponse
+from ars.app.services.admission import AdmissionController, get_admission_controller
+
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/pipeline", response_model=PipelineHealthResponse)
+async def get_pipeline_health(
+    admission: AdmissionController = Depends(get_admission_controller),
+):
+    """
+    Состояние конвейера заявок по последнему замеру.
+
+    degraded / overloaded - worker'ы отстают, и создание заявок ограничено
+    политикой ADMISSION_POLICY; unknown - замеров пока нет.
+    """
+    snapshot = admission.current_snapshot()
+    if snapshot is None:
+        return PipelineHealthResponse(status=admission.status(), admission_policy=admission.policy)
+    return PipelineHealthResponse(
+        status=admission.status(),
+        admission_policy=admission.policy,
+        pending_requests=snapshot.pending_requests,
+        oldest_pending_age_s=snapshot.oldest_pending_age_s,
+        stale_pending=snapshot.stale_pending,
+        outbox_backlog=snapshot.outbox_backlog,
+        sampled_at=snapshot.sampled_at,
+    )
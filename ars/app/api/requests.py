@@ -1,83 +1,385 @@
+import math
 import uuid
+from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ars.app.core.db import SessionLocal
 from ars.app.core.config import settings
+from ars.app.core.db import AsyncSessionLocal
 from ars.app.schemas.access_request import (
+    AccessRequestBatchCreate,
+    AccessRequestBatchItemResult,
+    AccessRequestBatchResponse,
     AccessRequestCreate,
     AccessRequestResponse,
     UserPermissionsResponse,
+    access_request_row,
 )
 from ars.app.services.access_request import (
+    InvalidCursorError,
     create_access_request,
+    create_access_request_idempotent,
+    create_access_requests,
+    format_validation_error,
     get_access_request,
     get_user_requests,
 )
-from common.clients.registry_client import RegistryClient
+from ars.app.core.registry import get_registry_client
+from ars.app.services.admission import (
+    AdmissionController,
+    AdmissionRejectedError,
+    get_admission_controller,
+)
+from ars.app.services.idempotency import IdempotencyKeyReusedError
+from ars.app.services.ndjson import NDJSONIngestResponse, ingest_ndjson
+from ars.app.services.permissions import PermissionsCache, get_permissions_cache
+from ars.app.services.projection import get_projected_permissions
+from ars.app.services.request_cache import (
+    RequestCacheBackend,
+    etag_matches,
+    get_request_cache,
+    is_final,
+    make_etag,
+    render_request,
+)
+from ars.app.services.status_watch import stream_request_events, wait_for_request
+from common.clients.registry_client import AsyncRegistryClient
+from common.clients.resilience import BulkheadFullError, CircuitOpenError
+from common.clock import utcnow
+from common.enums import AccessAction, AccessRequestStatus
+from common.serialization import FastJSONResponse
 
 
 router = APIRouter(prefix="/access-requests", tags=["access-requests"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def _caller(request: Request) -> str:
+    """Вызывающий для admission control: X-Caller-Id или адрес клиента."""
+    caller = request.headers.get("X-Caller-Id")
+    if caller:
+        return caller
+    return request.client.host if request.client else "unknown"
+
+
+def _admit(
+    admission: AdmissionController,
+    request: Request,
+    cost: int = 1,
+    priority: bool = False,
+) -> None:
+    """429 с Retry-After, если конвейер заявок перегружен и политика не пропускает заявки."""
+    try:
+        admission.admit(_caller(request), cost, priority)
+    except AdmissionRejectedError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
 
 
 @router.post("", response_model=AccessRequestResponse, status_code=201)
-def create_request(
+async def create_request(
     data: AccessRequestCreate,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    idempotency_key: str | None = Header(None, min_length=1, max_length=255),
+    db: AsyncSession = Depends(get_db),
+    admission: AdmissionController = Depends(get_admission_controller),
 ):
     """
     Создает заявку на выдачу или отзыв прав.
     
     Заявка сохраняется со статусом PENDING и отправляется в очередь.
     Worker обработает её асинхронно.
+
+    С заголовком Idempotency-Key повтор запроса (например, после таймаута)
+    вернет уже созданную заявку с заголовком Idempotent-Replayed: true.
+
+    Если worker'ы отстают, заявка может быть не принята (429 с Retry-After,
+    см. GET /health/pipeline); отзыв прав принимается всегда. Повтор с
+    Idempotency-Key уже созданной заявки возвращается без admission control.
+    Ключи у каждого вызывающего (X-Caller-Id) свои.
+    """
+
+    def admit():
+        _admit(admission, request, priority=data.action == AccessAction.REVOKE)
+
+    if idempotency_key is None:
+        admit()
+        return await create_access_request(db, data)
+    try:
+        req, replayed = await create_access_request_idempotent(
+            db, data, _caller(request), idempotency_key, admit=admit
+        )
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return req
+
+
+@router.post("/batch", response_model=AccessRequestBatchResponse)
+async def create_requests_batch(
+    data: AccessRequestBatchCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    admission: AdmissionController = Depends(get_admission_controller),
+):
+    """
+    Создает пачку заявок (например, при онбординге команды).
+
+    Корректные элементы сохраняются одной транзакцией, для каждого элемента
+    возвращается id созданной заявки или ошибка валидации. Admission control
+    решает о пачке целиком.
     """
-    return create_access_request(db, data)
+    _admit(
+        admission,
+        request,
+        cost=len(data.items),
+        priority=all(
+            isinstance(item, dict) and item.get("action") == AccessAction.REVOKE.value
+            for item in data.items
+        ),
+    )
+    valid: list[tuple[int, AccessRequestCreate]] = []
+    results: list[AccessRequestBatchItemResult] = []
+    for index, item in enumerate(data.items):
+        try:
+            valid.append((index, AccessRequestCreate.model_validate(item)))
+        except ValidationError as e:
+            results.append(
+                AccessRequestBatchItemResult(index=index, error=format_validation_error(e))
+            )
+
+    request_ids = await create_access_requests(db, [item for _, item in valid])
+    results.extend(
+        AccessRequestBatchItemResult(index=index, id=request_id)
+        for (index, _), request_id in zip(valid, request_ids)
+    )
+    results.sort(key=lambda result: result.index)
+
+    return AccessRequestBatchResponse(
+        created=len(request_ids),
+        failed=len(data.items) - len(request_ids),
+        results=results,
+    )
+
+
+@router.post("/stream")
+async def create_requests_stream(
+    request: Request,
+    admission: AdmissionController = Depends(get_admission_controller),
+):
+    """
+    Потоковая загрузка заявок из NDJSON (по заявке AccessRequestCreate на строку).
+
+    Тело читается по частям, заявки сохраняются пакетами; в ответ
+    построчно (NDJSON) возвращаются id созданных заявок или ошибки.
+    Admission control решает о каждом пакете: после отказа остальные
+    строки не сохраняются и получают ошибку с retry_after.
+    """
+    caller = _caller(request)
+
+    def admit(items: list[AccessRequestCreate]) -> None:
+        admission.admit(
+            caller,
+            len(items),
+            priority=all(item.action is AccessAction.REVOKE for item in items),
+        )
+
+    return NDJSONIngestResponse(
+        ingest_ndjson(request.stream(), admit),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/events")
+async def stream_request_events_endpoint(
+    ids: list[uuid.UUID] = Query(min_length=1, max_length=settings.status_stream_max_ids),
+):
+    """
+    Server-Sent Events со статусами заявок ids (?ids=...&ids=...).
+
+    Сначала приходит текущее состояние каждой заявки, затем - каждая смена
+    статуса; поток закрывается, когда у всех заявок итоговый статус.
+    """
+    return StreamingResponse(
+        stream_request_events(list(dict.fromkeys(ids))),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _request_response(body: bytes, final: bool, if_none_match: str | None) -> Response:
+    """Ответ с ETag; 304, если у клиента та же версия."""
+    etag = make_etag(body)
+    headers = {
+        "ETag": etag,
+        # Итоговый статус больше не меняется; промежуточный - только с перепроверкой.
+        # Заявка - данные пользователя: кешируют только клиенты, не общие прокси
+        "Cache-Control": (
+            f"private, max-age={settings.request_cache_max_age_s}, immutable"
+            if final
+            else "no-cache"
+        ),
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @router.get("/{request_id}", response_model=AccessRequestResponse)
-def get_request(
+async def get_request(
     request_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    wait: float = Query(0, ge=0, le=settings.status_wait_max_s),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+    cache: RequestCacheBackend = Depends(get_request_cache),
 ):
-    """Получает статус заявки по ID."""
-    req = get_access_request(db, str(request_id))
+    """
+    Получает статус заявки по ID.
+
+    wait > 0 - long-poll: ответ придет, как только заявка получит итоговый
+    статус (APPROVED / REJECTED), но не позже чем через wait секунд.
+
+    Ответ несет ETag (If-None-Match -> 304). Заявки с итоговым статусом
+    неизменяемы: они отдаются из кеша без запроса к БД.
+    """
+    body = await cache.get(request_id)
+    if body is not None:
+        return _request_response(body, True, if_none_match)
+
+    if wait > 0:
+        req = await wait_for_request(request_id, wait)
+    else:
+        req = await get_access_request(db, request_id)
     if not req:
         raise HTTPException(status_code=404, detail="Заявка не найдена")
-    return req
+
+    body = render_request(req)
+    final = is_final(req)
+    if final:
+        await cache.set(request_id, body)
+    return _request_response(body, final, if_none_match)
 
 
 @router.get("/user/{user_id}", response_model=list[AccessRequestResponse])
-def get_user_requests_endpoint(
+async def get_user_requests_endpoint(
     user_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.history_page_size, ge=1, le=settings.history_max_page_size),
+    cursor: str | None = None,
+    status: AccessRequestStatus | None = None,
+    action: AccessAction | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    db: AsyncSession = Depends(get_db),
 ):
-    """Получает все заявки пользователя."""
-    requests = get_user_requests(db, str(user_id))
+    """
+    Получает заявки пользователя постранично, от новых к старым.
+
+    Тело - список заявок, как и раньше. Если есть следующая страница, ее
+    курсор приходит в заголовке X-Next-Cursor, а ссылка на нее - в Link
+    (rel="next"). created_from / created_to - полуинтервал [from, to)
+    по времени создания (UTC).
+    """
+    try:
+        requests, next_cursor = await get_user_requests(
+            db,
+            user_id,
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            action=action,
+            created_from=created_from,
+            created_to=created_to,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {}
+    if next_cursor is not None:
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        headers = {"X-Next-Cursor": next_cursor, "Link": f'<{next_url}>; rel="next"'}
+    if settings.fast_json:
+        return FastJSONResponse([access_request_row(req) for req in requests], headers=headers)
+    response.headers.update(headers)
     return requests
 
 
 @router.get("/user/{user_id}/permissions", response_model=UserPermissionsResponse)
-def get_user_permissions(
+async def get_user_permissions(
     user_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    registry_client: AsyncRegistryClient = Depends(get_registry_client),
+    cache: PermissionsCache = Depends(get_permissions_cache),
 ):
     """
     Получает текущие права пользователя (read-модель).
+
+    По умолчанию права читаются из локальной проекции одним запросом к БД:
+    одобренные заявки применяются к ней сразу, изменения в обход ARS - при
+    сверке со снимком Registry; max_staleness_s - время с начала последней
+    сверки.
+
+    Пока проекция не заполнена (или PERMISSIONS_SOURCE=registry), ответ
+    Registry кешируется на PERMISSIONS_CACHE_TTL_S и сбрасывается, когда
+    заявка пользователя одобрена. Если Registry недоступен или перегружен,
+    сразу отвечает 503 с заголовком Retry-After, не дожидаясь таймаутов.
     """
-    client = RegistryClient(settings.registry_service_url)
+    projected = None
+    if settings.permissions_source == "projection":
+        projected = await get_projected_permissions(db, user_id)
+
+    if projected is not None:
+        reconciled_at, permissions = projected
+        source = "projection"
+        max_staleness_s = (utcnow() - reconciled_at).total_seconds()
+    else:
+        try:
+            permissions = await cache.get(user_id, registry_client)
+        except CircuitOpenError as e:
+            raise HTTPException(
+                status_code=503,
+                detail="Registry временно недоступен",
+                headers={"Retry-After": str(max(1, round(e.retry_after)))},
+            )
+        except BulkheadFullError:
+            raise HTTPException(
+                status_code=503,
+                detail="Registry перегружен",
+                headers={"Retry-After": "1"},
+            )
+        source = "registry"
+        reconciled_at = None
+        max_staleness_s = settings.permissions_cache_ttl_s
 
-    permissions = client.get_user_permission_groups(user_id)
+    if settings.fast_json:
+        return FastJSONResponse(
+            {
+                "user_id": user_id,
+                "permission_groups": [
+                    {"id": group["id"], "name": group.get("name")} for group in permissions
+                ],
+                "source": source,
+                "reconciled_at": reconciled_at,
+                "max_staleness_s": max_staleness_s,
+            }
+        )
     return UserPermissionsResponse(
         user_id=user_id,
         permission_groups=permissions,
+        source=source,
+        reconciled_at=reconciled_at,
+        max_staleness_s=max_staleness_s,
     )
-
@@ -1,5 +1,9 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
+from common.db.urls import async_database_url
+
 
 class Settings(BaseSettings):
     database_url: str
@@ -11,6 +15,111 @@ class Settings(BaseSettings):
     registry_service_url: str
     app_name: str = "Access Request Service"
 
+    # Пул соединений с БД (асинхронный движок)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout_s: float = 30.0
+    db_pool_recycle_s: int = 1800
+
+    # Таймауты, circuit breaker и bulkhead для запросов в Registry
+    registry_connect_timeout_s: float = 2.0
+    registry_read_timeout_s: float = 5.0
+    registry_breaker_failure_threshold: int = 5
+    registry_breaker_recovery_s: float = 30.0
+    registry_max_concurrency: int = 20
+
+    # Уведомления worker'а (Postgres LISTEN/NOTIFY): проверка соединения
+    # подписки и пауза перед переподключением, сек
+    notify_keepalive_s: float = 30.0
+    notify_retry_s: float = 5.0
+
+    # Кеш прав пользователей (GET .../permissions): время жизни записи, сек,
+    # и максимум пользователей; сбрасывается по уведомлениям worker'а
+    permissions_cache_ttl_s: float = 30.0
+    permissions_cache_max_entries: int = 10000
+
+    # Права пользователей (GET .../permissions): projection - локальная проекция
+    # user_permissions (обновляет worker, сверяется со снимком Registry),
+    # registry - запрос в Registry через кеш. Интервал сверки, страница снимка,
+    # аренда сверки и допуск на расхождение часов ARS и worker'а, сек; если
+    # последняя сверка старше projection_max_staleness_s, права читаются из Registry
+    permissions_source: Literal["projection", "registry"] = "projection"
+    projection_reconcile_interval_s: float = 300.0
+    projection_snapshot_page_size: int = 5000
+    projection_lease_s: float = 120.0
+    projection_clock_skew_s: float = 5.0
+    projection_max_staleness_s: float = 900.0
+
+    # Кеш ответов по заявкам с итоговым статусом: максимум заявок и
+    # Cache-Control max-age для клиентов и прокси, сек
+    request_cache_max_entries: int = 50000
+    request_cache_max_age_s: int = 86400
+
+    # Ожидание статуса заявки (long-poll ?wait= и SSE): максимум ожидания и
+    # длительности SSE-потока, интервал keepalive-комментариев SSE, интервал
+    # опроса БД без уведомлений (не Postgres) и максимум заявок в одном потоке
+    status_wait_max_s: float = 60.0
+    status_stream_max_s: float = 300.0
+    status_stream_keepalive_s: float = 15.0
+    status_poll_interval_s: float = 1.0
+    status_stream_max_ids: int = 100
+
+    # Ответы без валидации response_model: строки БД -> orjson
+    fast_json: bool = False
+
+    # Количество шардов очереди заявок (должно совпадать с worker)
+    queue_shards: int = 8
+
+    # Publisher: соединений в пуле, таймауты подключения и подтверждения (сек),
+    # пауза перед переподключением
+    publisher_pool_size: int = 2
+    publisher_connect_timeout_s: float = 5.0
+    publisher_confirm_timeout_s: float = 10.0
+    publisher_reconnect_delay_s: float = 1.0
+
+    # Idempotency-Key в POST /access-requests: окно хранения ключей и
+    # интервал удаления просроченных, сек
+    idempotency_key_ttl_s: int = 86400
+    idempotency_purge_interval_s: float = 3600.0
+
+    # Admission control на создании заявок: политика при отставании worker'ов
+    # (off, reject - 429, token_bucket - лимит на вызывающего, priority - только
+    # приоритетные), интервал замера очереди, пороги degraded / overloaded по
+    # числу PENDING-заявок и возрасту admission_age_rank-й по старшинству (сек),
+    # горизонт: более старые PENDING-заявки считаются застрявшими и не учитываются,
+    # Retry-After (сек), ведро на вызывающего (заявок в секунду, запас, максимум
+    # вызывающих) и вызывающие (X-Caller-Id), заявки которых принимаются всегда
+    admission_policy: Literal["off", "reject", "token_bucket", "priority"] = "off"
+    admission_sample_interval_s: float = 1.0
+    admission_pending_horizon_s: float = 3600.0
+    admission_age_rank: int = 10
+    admission_degraded_pending: int = 10000
+    admission_overloaded_pending: int = 50000
+    admission_degraded_age_s: float = 60.0
+    admission_overloaded_age_s: float = 300.0
+    admission_retry_after_s: float = 5.0
+    admission_caller_rate: float = 10.0
+    admission_caller_burst: float = 100.0
+    admission_max_callers: int = 10000
+    admission_priority_callers: list[str] = []
+
+    # Максимум заявок в POST /access-requests/batch
+    batch_max_items: int = 5000
+
+    # История заявок пользователя: размер страницы по умолчанию и максимальный
+    history_page_size: int = 100
+    history_max_page_size: int = 1000
+
+    # Потоковая загрузка NDJSON: строк в одной транзакции и максимальная длина строки
+    ndjson_batch_size: int = 500
+    ndjson_max_line_bytes: int = 65536
+
+    # Transactional outbox: сообщений за одну публикацию, интервал опроса
+    # таблицы и пауза после ошибки публикации, сек
+    outbox_batch_size: int = 100
+    outbox_poll_interval_s: float = 1.0
+    outbox_retry_interval_s: float = 5.0
+
     @property
     def rabbitmq_url(self) -> str:
         return (
@@ -18,9 +127,13 @@ class Settings(BaseSettings):
             f"@{self.rabbitmq_host}:{self.rabbitmq_port}{self.rabbitmq_vhost}"
         )
 
+    @property
+    def async_database_url(self) -> str:
+        """URL БД с асинхронным драйвером (asyncpg / aiosqlite)."""
+        return async_database_url(self.database_url)
+
     class Config:
         env_file = ".env"
 
 
 settings = Settings()
-
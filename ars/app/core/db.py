@@ -1,7 +1,20 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from ars.app.core.config import settings
 
+# Синхронный движок - для миграций и скриптов
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(bind=engine)
+
+# Асинхронный движок для API: запросы к БД не занимают потоки threadpool'а
+async_engine = create_async_engine(
+    settings.async_database_url,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_s,
+    pool_recycle=settings.db_pool_recycle_s,
+    pool_pre_ping=True,
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
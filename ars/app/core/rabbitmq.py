@@ -1,79 +1,328 @@
 import json
 import logging
-from typing import Optional
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import closing
+from typing import Any, Optional
 
 import pika
-from pika.exceptions import AMQPConnectionError, AMQPChannelError
 
 from ars.app.core.config import settings
+from common.messaging import (
+    ACCESS_REQUEST_EXCHANGE,
+    PUBLISHED_AT_HEADER,
+    declare_topology,
+    shard_for_user,
+    shard_queue_name,
+)
 
 logger = logging.getLogger(__name__)
 
-# Название очереди для заявок на доступ
-ACCESS_REQUEST_QUEUE = "access_request_created"
 
+def access_request_created_payload(
+    request_id: str, user_id: str, permission_group_id: str, action: str
+) -> str:
+    """Тело сообщения access_request_created."""
+    return json.dumps(
+        {
+            "request_id": request_id,
+            "user_id": user_id,
+            "permission_group_id": permission_group_id,
+            "action": action,
+        }
+    )
 
-class RabbitMQPublisher:
-    """Класс для публикации событий в RabbitMQ."""
 
-    def __init__(self):
-        self._connection: Optional[pika.BlockingConnection] = None
-        self._channel: Optional[pika.channel.Channel] = None
+class PublishError(Exception):
+    """Брокер не подтвердил публикацию (nack, разрыв соединения или таймаут)."""
+
+
+class _ConfirmingConnection:
+    """
+    Соединение с RabbitMQ в собственном I/O-потоке с асинхронными publisher confirms.
+
+    Публиковать можно из любого потока: публикация передается в I/O-поток
+    через add_callback_threadsafe, вызывающий получает Future, который
+    завершается при Basic.Ack / Basic.Nack. Подтверждения не ждутся
+    поштучно, поэтому в полете одновременно может быть много сообщений.
+    При разрыве соединения неподтвержденные Future завершаются ошибкой,
+    соединение восстанавливается автоматически.
+    """
 
-    def _ensure_connection(self):
-        """Устанавливает соединение с RabbitMQ, если оно не установлено."""
-        if self._connection is None or self._connection.is_closed:
+    def __init__(self, name: str):
+        self.name = name
+        self._ready = threading.Event()
+        self._stopping = False
+        self._connection: Optional[pika.SelectConnection] = None
+        self._channel: Any = None
+        # Состояние ниже меняется только в I/O-потоке
+        self._delivery_tag = 0
+        self._pending: dict[int, Future] = {}
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        parameters = pika.URLParameters(settings.rabbitmq_url)
+        while not self._stopping:
             try:
-                parameters = pika.URLParameters(settings.rabbitmq_url)
-                self._connection = pika.BlockingConnection(parameters)
-                self._channel = self._connection.channel()
-                self._channel.queue_declare(queue=ACCESS_REQUEST_QUEUE, durable=True)
-                logger.info("Подключение к RabbitMQ установлено")
-            except (AMQPConnectionError, AMQPChannelError) as e:
-                logger.error(f"Ошибка подключения к RabbitMQ: {e}")
-                raise
+                # Топология объявляется синхронно до запуска I/O-цикла
+                with closing(pika.BlockingConnection(parameters)) as connection:
+                    declare_topology(connection.channel(), settings.queue_shards)
+                self._connection = pika.SelectConnection(
+                    parameters,
+                    on_open_callback=self._on_connection_open,
+                    on_open_error_callback=self._on_connection_error,
+                    on_close_callback=self._on_connection_closed,
+                )
+                self._connection.ioloop.start()
+            except Exception as e:
+                logger.error(f"{self.name}: ошибка соединения с RabbitMQ: {e}")
 
-    def publish_access_request_created(
-        self, request_id: str, user_id: str, permission_group_id: str, action: str
-    ):
-        """Публикует событие о создании заявки на доступ."""
-        try:
-            self._ensure_connection()
+            self._ready.clear()
+            if not self._stopping:
+                time.sleep(settings.publisher_reconnect_delay_s)
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection, error):
+        logger.error(f"{self.name}: не удалось подключиться к RabbitMQ: {error}")
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        self._fail_pending(reason)
+        self._channel = None
+        if not self._stopping:
+            logger.warning(f"{self.name}: соединение с RabbitMQ закрыто: {reason}")
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel):
+        self._channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.confirm_delivery(
+            ack_nack_callback=self._on_confirm,
+            callback=self._on_confirm_mode,
+        )
 
-            message = {
-                "request_id": request_id,
-                "user_id": user_id,
-                "permission_group_id": permission_group_id,
-                "action": action,
-            }
+    def _on_confirm_mode(self, frame):
+        self._delivery_tag = 0
+        self._ready.set()
+        logger.info(f"{self.name}: подключение к RabbitMQ установлено")
 
+    def _on_channel_closed(self, channel, reason):
+        self._ready.clear()
+        self._fail_pending(reason)
+        self._channel = None
+        # Канал закрыт брокером - переподключаемся целиком
+        if self._connection and self._connection.is_open:
+            self._connection.close()
+
+    def _fail_pending(self, reason):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(PublishError(f"Соединение закрыто: {reason}"))
+
+    def _on_confirm(self, frame):
+        method = frame.method
+        ack = isinstance(method, pika.spec.Basic.Ack)
+        if method.multiple:
+            tags = [tag for tag in self._pending if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+
+        for tag in tags:
+            future = self._pending.pop(tag, None)
+            if future is None or future.done():
+                continue
+            if ack:
+                future.set_result(None)
+            else:
+                future.set_exception(PublishError("Сообщение отклонено брокером (nack)"))
+
+    def _publish(self, future: Future, exchange: str, routing_key: str, body, headers):
+        if self._channel is None or not self._channel.is_open:
+            future.set_exception(PublishError("Канал RabbitMQ не открыт"))
+            return
+        try:
             self._channel.basic_publish(
-                exchange="",
-                routing_key=ACCESS_REQUEST_QUEUE,
-                body=json.dumps(message),
+                exchange=exchange,
+                routing_key=routing_key,
+                body=body,
                 properties=pika.BasicProperties(
                     delivery_mode=2,  # Сохранять сообщения на диск
+                    headers=headers,
                 ),
             )
+        except Exception as e:
+            future.set_exception(PublishError(str(e)))
+            return
+        self._delivery_tag += 1
+        self._pending[self._delivery_tag] = future
+
+    def publish(
+        self, exchange: str, routing_key: str, body, headers: dict, timeout: float
+    ) -> Future:
+        """Ставит публикацию в очередь I/O-потока (потокобезопасно)."""
+        future: Future = Future()
+        if not self._ready.wait(timeout):
+            future.set_exception(PublishError(f"{self.name}: нет соединения с RabbitMQ"))
+            return future
+        try:
+            self._connection.ioloop.add_callback_threadsafe(
+                lambda: self._publish(future, exchange, routing_key, body, headers)
+            )
+        except Exception as e:
+            future.set_exception(PublishError(str(e)))
+        return future
+
+    def close(self, timeout: float = 5.0):
+        self._stopping = True
+        connection = self._connection
+        if connection is not None and not connection.is_closed:
+            try:
+                connection.ioloop.add_callback_threadsafe(connection.close)
+            except Exception:
+                pass
+        self._thread.join(timeout)
+
+
+class RabbitMQPublisher:
+    """
+    Потокобезопасный publisher с пулом соединений и publisher confirms.
+
+    Сообщения шарда всегда идут через одно и то же соединение пула,
+    поэтому порядок сообщений одного пользователя сохраняется.
+    Соединения открываются при первой публикации.
+    """
+
+    def __init__(self, pool_size: Optional[int] = None):
+        self.pool_size = pool_size or settings.publisher_pool_size
+        self._connections: list[_ConfirmingConnection] = []
+        self._lock = threading.Lock()
+
+    def _connection_for(self, shard: int) -> _ConfirmingConnection:
+        if not self._connections:
+            with self._lock:
+                if not self._connections:
+                    self._connections = [
+                        _ConfirmingConnection(f"rabbitmq-publisher-{index}")
+                        for index in range(self.pool_size)
+                    ]
+        return self._connections[shard % self.pool_size]
+
+    def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body,
+        headers: dict,
+        shard: int = 0,
+        connect_deadline: Optional[float] = None,
+    ) -> Future:
+        """
+        Публикация без ожидания подтверждения: Future завершится при ack / nack.
+
+        connect_deadline (time.monotonic()) ограничивает ожидание соединения
+        сразу для всего пакета публикаций.
+        """
+        if connect_deadline is None:
+            connect_deadline = time.monotonic() + settings.publisher_connect_timeout_s
+        return self._connection_for(shard).publish(
+            exchange,
+            routing_key,
+            body,
+            headers,
+            timeout=max(0.0, connect_deadline - time.monotonic()),
+        )
+
+    def _publish_access_request(self, user_id: str, body: str, connect_deadline: float) -> Future:
+        """Публикует сообщение о заявке в шард пользователя."""
+        shard = shard_for_user(user_id, settings.queue_shards)
+        return self.publish(
+            ACCESS_REQUEST_EXCHANGE,
+            shard_queue_name(shard),
+            body,
+            {PUBLISHED_AT_HEADER: int(time.time() * 1000)},
+            shard=shard,
+            connect_deadline=connect_deadline,
+        )
+
+    @staticmethod
+    def _connect_deadline() -> float:
+        return time.monotonic() + settings.publisher_connect_timeout_s
+
+    @staticmethod
+    def _wait_confirms(futures: list[Future]) -> None:
+        """Ждет подтверждения всех публикаций; первая ошибка пробрасывается."""
+        deadline = time.monotonic() + settings.publisher_confirm_timeout_s
+        for future in futures:
+            try:
+                future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                raise PublishError("Таймаут ожидания подтверждения брокера")
+
+    def publish_access_request_created(
+        self, request_id: str, user_id: str, permission_group_id: str, action: str
+    ):
+        """Публикует событие о создании заявки на доступ и ждет подтверждения."""
+        try:
+            self._wait_confirms(
+                [
+                    self._publish_access_request(
+                        user_id,
+                        access_request_created_payload(
+                            request_id, user_id, permission_group_id, action
+                        ),
+                        self._connect_deadline(),
+                    )
+                ]
+            )
             logger.info(f"Событие access_request_created опубликовано: {request_id}")
         except Exception as e:
             logger.error(f"Ошибка при публикации события: {e}")
             raise
 
+    def publish_outbox_messages(self, messages: list) -> None:
+        """
+        Публикует пакет сообщений из outbox и ждет подтверждения всех.
+
+        Сообщения отправляются сразу, подтверждения собираются конвейером.
+        При ошибке исключение пробрасывается: relay оставит весь пакет
+        в outbox и повторит его (доставка at-least-once).
+        """
+        connect_deadline = self._connect_deadline()
+        futures = [
+            self._publish_access_request(str(message.user_id), message.payload, connect_deadline)
+            for message in messages
+        ]
+        try:
+            self._wait_confirms(futures)
+        except Exception as e:
+            logger.error(f"Ошибка при публикации сообщений outbox: {e}")
+            raise
+
     def close(self):
-        """Закрывает соединение с RabbitMQ."""
-        if self._connection and not self._connection.is_closed:
-            self._connection.close()
-            logger.info("Соединение с RabbitMQ закрыто")
+        """Закрывает соединения с RabbitMQ."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        if connections:
+            logger.info("Соединения с RabbitMQ закрыты")
 
 
 # Глобальный экземпляр publisher (singleton)
 _publisher: Optional[RabbitMQPublisher] = None
+_publisher_lock = threading.Lock()
 
 
 def get_publisher() -> RabbitMQPublisher:
     """Возвращает глобальный экземпляр RabbitMQ publisher."""
     global _publisher
     if _publisher is None:
-        _publisher = RabbitMQPublisher()
+        with _publisher_lock:
+            if _publisher is None:
+                _publisher = RabbitMQPublisher()
     return _publisher
@@ -0,0 +1,29 @@
+from fastapi import Request
+
+from common.clients.registry_client import AsyncRegistryClient
+from common.clients.resilience import CircuitBreaker
+from ars.app.core.config import settings
+
+registry_breaker = CircuitBreaker(
+    "registry",
+    failure_threshold=settings.registry_breaker_failure_threshold,
+    recovery_timeout_s=settings.registry_breaker_recovery_s,
+)
+
+
+def create_registry_client() -> AsyncRegistryClient:
+    """
+    Клиент на время жизни приложения (создается в lifespan): общий пул
+    соединений и общий bulkhead для всех запросов API.
+    """
+    return AsyncRegistryClient(
+        settings.registry_service_url,
+        connect_timeout_s=settings.registry_connect_timeout_s,
+        read_timeout_s=settings.registry_read_timeout_s,
+        breaker=registry_breaker,
+        max_concurrency=settings.registry_max_concurrency,
+    )
+
+
+def get_registry_client(request: Request) -> AsyncRegistryClient:
+    return request.app.state.registry_client
@@ -1,8 +1,69 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 
+from ars.app.api.health import router as health_router
 from ars.app.api.requests import router as access_requests_router
 from ars.app.core.config import settings
+from ars.app.core.db import async_engine
+from ars.app.core.rabbitmq import get_publisher
+from ars.app.core.registry import create_registry_client
+from ars.app.services.admission import get_admission_controller
+from ars.app.services.idempotency import run_purger
+from ars.app.services.notifications import get_notification_listener
+from ars.app.services.outbox import get_outbox_relay
+from ars.app.services.permissions import get_permissions_cache
+from ars.app.services.projection import run_reconciler
+from ars.app.services.status_watch import get_status_watcher
+from common.messaging import ACCESS_REQUEST_STATUS_CHANNEL, PERMISSIONS_CHANGED_CHANNEL
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.registry_client = create_registry_client()
+    relay = get_outbox_relay()
+    relay.start()
+
+    # Уведомления worker'а: сброс кеша прав и пробуждение ожидающих статуса
+    notifications = get_notification_listener()
+    permissions_cache = get_permissions_cache()
+    status_watcher = get_status_watcher()
+    notifications.add_handler(PERMISSIONS_CHANGED_CHANNEL, permissions_cache.on_permissions_changed)
+    notifications.add_handler(ACCESS_REQUEST_STATUS_CHANNEL, status_watcher.on_status_changed)
+    notifications.add_reset_handler(permissions_cache.clear)
+    notifications.add_reset_handler(status_watcher.wake_all)
+    notifications.start()
+
+    # Замер глубины очереди заявок для admission control
+    admission = get_admission_controller()
+    admission.start()
+
+    background = [asyncio.create_task(run_purger(), name="idempotency-purger")]
+    if settings.permissions_source == "projection":
+        # Заполнение проекции прав при старте и периодическая сверка с Registry
+        background.append(
+            asyncio.create_task(
+                run_reconciler(app.state.registry_client), name="permissions-reconciler"
+            )
+        )
+
+    yield
+
+    for task in background:
+        task.cancel()
+    for task in background:
+        with suppress(asyncio.CancelledError):
+            await task
+    await admission.stop()
+    await notifications.stop()
+    await asyncio.to_thread(relay.stop)
+    get_publisher().close()
+    await app.state.registry_client.close()
+    await async_engine.dispose()
+
 
-app = FastAPI(title=settings.app_name)
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
 app.include_router(access_requests_router)
+app.include_router(health_router)
@@ -1,7 +1,11 @@
 import uuid
 from datetime import datetime
 
-from pydantic import BaseModel
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field
+
+from ars.app.core.config import settings
 
 from common.enums import AccessRequestStatus, AccessAction
 
@@ -13,6 +17,30 @@ class AccessRequestCreate(BaseModel):
     action: AccessAction
 
 
+class AccessRequestBatchCreate(BaseModel):
+    """
+    Пакет заявок.
+
+    Элементы проверяются по отдельности: некорректный элемент (в том числе
+    не JSON-объект) не мешает создать остальные, его ошибка возвращается
+    в результатах.
+    """
+    items: list[Any] = Field(min_length=1, max_length=settings.batch_max_items)
+
+
+class AccessRequestBatchItemResult(BaseModel):
+    """Результат по элементу пакета (index - позиция в items)."""
+    index: int
+    id: uuid.UUID | None = None
+    error: str | None = None
+
+
+class AccessRequestBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[AccessRequestBatchItemResult]
+
+
 class AccessRequestResponse(BaseModel):
     """Схема ответа с информацией о заявке."""
     id: uuid.UUID
@@ -28,6 +56,23 @@ class AccessRequestResponse(BaseModel):
         from_attributes = True
 
 
+def access_request_row(req) -> dict[str, Any]:
+    """
+    Заявка из БД как словарь для FastJSONResponse (режим FAST_JSON): поля и
+    порядок - как у AccessRequestResponse, без валидации pydantic.
+    """
+    return {
+        "id": req.id,
+        "user_id": req.user_id,
+        "permission_group_id": req.permission_group_id,
+        "action": req.action,
+        "status": req.status,
+        "created_at": req.created_at,
+        "updated_at": req.updated_at,
+        "rejection_reason": req.rejection_reason,
+    }
+
+
 class PermissionGroupRead(BaseModel):
     id: uuid.UUID
     name: str | None = None
@@ -36,3 +81,9 @@ class PermissionGroupRead(BaseModel):
 class UserPermissionsResponse(BaseModel):
     user_id: uuid.UUID
     permission_groups: list[PermissionGroupRead]
+    # projection - локальная проекция прав, registry - ответ Registry (через кеш)
+    source: Literal["projection", "registry"]
+    # Время последней сверки проекции с Registry (только для projection)
+    reconciled_at: datetime | None = None
+    # Насколько ответ может отставать от Registry, сек
+    max_staleness_s: float
@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class PipelineHealthResponse(BaseModel):
+    """Состояние конвейера заявок (ARS -> outbox -> RabbitMQ -> worker)."""
+    status: Literal["ok", "degraded", "overloaded", "unknown"]
+    admission_policy: str
+    # Принятые, но еще не взятые worker'ом заявки моложе горизонта (счетчик из БД,
+    # не глубина очередей RabbitMQ) и возраст ADMISSION_AGE_RANK-й по старшинству
+    pending_requests: int | None = None
+    oldest_pending_age_s: float | None = None
+    # PENDING-заявки старше горизонта: на состояние не влияют
+    stale_pending: int | None = None
+    # Сообщения, еще не опубликованные в RabbitMQ
+    outbox_backlog: int | None = None
+    sampled_at: datetime | None = None
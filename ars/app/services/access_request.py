@@ -1,59 +1,250 @@
+import base64
 import logging
-from sqlalchemy.orm import Session
+import uuid
+from datetime import datetime, timezone
+from typing import Callable
 
-from ars.app.core.rabbitmq import get_publisher
-from common.enums import AccessRequestStatus
+from pydantic import ValidationError
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ars.app.core.rabbitmq import access_request_created_payload
+from ars.app.services.idempotency import find_replay, request_hash
+from ars.app.services.outbox import get_outbox_relay
+from common.enums import AccessAction, AccessRequestStatus
 from common.models.access_request import AccessRequest
+from common.models.idempotency import IdempotencyKey
+from common.models.outbox import OutboxMessage
 from ars.app.schemas.access_request import AccessRequestCreate
 
 
 logger = logging.getLogger(__name__)
 
 
-def create_access_request(db: Session, data: AccessRequestCreate) -> AccessRequest:
-    """
-    Создает заявку и отправляет её в очередь для обработки.
-    
-    ARS не проверяет конфликты - это делает Worker.
-    """
+def format_validation_error(e: ValidationError) -> str:
+    """Ошибки валидации элемента одной строкой (для результатов пакетной загрузки)."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" if err["loc"] else err["msg"]
+        for err in e.errors()
+    )
+
+
+def _outbox_row(request_id: uuid.UUID, data: AccessRequestCreate) -> dict:
+    """Строка outbox с сообщением access_request_created для заявки."""
+    return {
+        "request_id": request_id,
+        "user_id": data.user_id,
+        "payload": access_request_created_payload(
+            request_id=str(request_id),
+            user_id=str(data.user_id),
+            permission_group_id=str(data.permission_group_id),
+            action=data.action.value,
+        ),
+    }
+
+
+def _add_access_request(db: AsyncSession, data: AccessRequestCreate) -> AccessRequest:
     req = AccessRequest(
+        id=uuid.uuid4(),
         user_id=data.user_id,
         permission_group_id=data.permission_group_id,
         action=data.action,
     )
     db.add(req)
-    db.commit()
-    db.refresh(req)
+    db.add(OutboxMessage(**_outbox_row(req.id, data)))
+    return req
+
+
+async def create_access_request(db: AsyncSession, data: AccessRequestCreate) -> AccessRequest:
+    """
+    Создает заявку и ставит сообщение для Worker'а в outbox.
     
-    # Отправляем заявку в очередь для обработки Worker'ом
-    try:
-        publisher = get_publisher()
-        publisher.publish_access_request_created(
-            request_id=str(req.id),
-            user_id=str(req.user_id),
-            permission_group_id=str(req.permission_group_id),
-            action=req.action.value,
-        )
-        logger.info(f"Заявка {req.id} создана и отправлена в очередь")
-    except Exception as e:
-        logger.error(f"Не удалось отправить заявку {req.id} в очередь: {e}")
-        # Не прерываем выполнение - заявка уже создана, Worker может обработать позже
+    Заявка и сообщение сохраняются одним commit'ом: принятая заявка
+    не потеряется, даже если RabbitMQ недоступен. Публикует сообщение
+    outbox relay. ARS не проверяет конфликты - это делает Worker.
+    """
+    req = _add_access_request(db, data)
+    # Значения по умолчанию (статус, даты) вычисляются на стороне Python,
+    # после commit перечитывать строку не нужно
+    await db.commit()
+
+    get_outbox_relay().notify()
+    logger.info(f"Заявка {req.id} создана")
     
     return req
 
 
-def get_access_request(db: Session, request_id: str) -> AccessRequest | None:
+async def create_access_request_idempotent(
+    db: AsyncSession,
+    data: AccessRequestCreate,
+    caller: str,
+    idempotency_key: str,
+    admit: Callable[[], None] | None = None,
+) -> tuple[AccessRequest, bool]:
+    """
+    Создает заявку с Idempotency-Key вызывающего caller: (заявка, повтор ли это).
+
+    Повтор с тем же ключом и телом возвращает уже созданную заявку, не
+    ставя новое сообщение в outbox. Ключ сохраняется одним commit'ом с
+    заявкой; из параллельных дублей commit проходит у одного, остальные
+    получают нарушение первичного ключа и возвращают его заявку.
+
+    admit вызывается только перед созданием новой заявки: повтор уже
+    принятой заявки не проходит admission control повторно.
+    """
+    data_hash = request_hash(data)
+    existing = await find_replay(db, caller, idempotency_key, data_hash)
+    if existing is not None:
+        logger.info(f"Повтор запроса с Idempotency-Key {idempotency_key}: заявка {existing.id}")
+        return existing, True
+
+    if admit is not None:
+        admit()
+
+    req = _add_access_request(db, data)
+    db.add(
+        IdempotencyKey(
+            caller=caller,
+            key=idempotency_key,
+            request_id=req.id,
+            request_hash=data_hash,
+        )
+    )
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        existing = await find_replay(db, caller, idempotency_key, data_hash)
+        if existing is None:
+            raise
+        logger.info(
+            f"Параллельный дубль с Idempotency-Key {idempotency_key}: заявка {existing.id}"
+        )
+        return existing, True
+
+    get_outbox_relay().notify()
+    logger.info(f"Заявка {req.id} создана (Idempotency-Key {idempotency_key})")
+
+    return req, False
+
+
+async def create_access_requests(
+    db: AsyncSession, items: list[AccessRequestCreate]
+) -> list[uuid.UUID]:
+    """
+    Создает пачку заявок одним commit'ом.
+
+    Заявки и сообщения outbox вставляются многострочными INSERT'ами
+    (по одному на таблицу); relay опубликует сообщения пакетами
+    в порядке заявок. Возвращает id заявок в порядке items.
+    """
+    if not items:
+        return []
+
+    request_ids = [uuid.uuid4() for _ in items]
+    await db.execute(
+        insert(AccessRequest),
+        [
+            {
+                "id": request_id,
+                "user_id": data.user_id,
+                "permission_group_id": data.permission_group_id,
+                "action": data.action,
+            }
+            for request_id, data in zip(request_ids, items)
+        ],
+    )
+    await db.execute(
+        insert(OutboxMessage),
+        [_outbox_row(request_id, data) for request_id, data in zip(request_ids, items)],
+    )
+    await db.commit()
+
+    get_outbox_relay().notify()
+    logger.info(f"Создано заявок пакетом: {len(request_ids)}")
+
+    return request_ids
+
+
+async def get_access_request(db: AsyncSession, request_id: uuid.UUID) -> AccessRequest | None:
     """Получает заявку по ID."""
-    return db.query(AccessRequest).filter(AccessRequest.id == request_id).one_or_none()
+    return await db.get(AccessRequest, request_id)
+
 
+class InvalidCursorError(ValueError):
+    """Курсор пагинации не удалось разобрать."""
+
+
+def encode_cursor(req: AccessRequest) -> str:
+    """Курсор страницы - позиция последней заявки в порядке (created_at, id)."""
+    raw = f"{req.created_at.isoformat()}|{req.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        created_at, request_id = (
+            base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        )
+        return datetime.fromisoformat(created_at), uuid.UUID(request_id)
+    except ValueError as e:
+        raise InvalidCursorError(f"Некорректный курсор: {cursor}") from e
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """created_at хранится без часового пояса, в UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+async def get_user_requests(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    limit: int,
+    cursor: str | None = None,
+    status: AccessRequestStatus | None = None,
+    action: AccessAction | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> tuple[list[AccessRequest], str | None]:
+    """
+    Получает страницу заявок пользователя, от новых к старым.
+
+    Keyset-пагинация по (created_at, id) по индексу
+    ix_access_requests_user_created_id: стоимость запроса не зависит от
+    номера страницы. Возвращает заявки и курсор следующей страницы
+    (None - страница последняя).
+    """
+    query = select(AccessRequest).where(AccessRequest.user_id == user_id)
+    if cursor is not None:
+        query = query.where(
+            tuple_(AccessRequest.created_at, AccessRequest.id) < decode_cursor(cursor)
+        )
+    if status is not None:
+        query = query.where(AccessRequest.status == status)
+    if action is not None:
+        query = query.where(AccessRequest.action == action)
+    if created_from is not None:
+        query = query.where(AccessRequest.created_at >= _naive_utc(created_from))
+    if created_to is not None:
+        query = query.where(AccessRequest.created_at < _naive_utc(created_to))
 
-def get_user_requests(db: Session, user_id: str) -> list[AccessRequest]:
-    """Получает все заявки пользователя."""
-    return db.query(AccessRequest).filter(AccessRequest.user_id == user_id).all()
+    # Лишняя строка показывает, есть ли следующая страница
+    query = query.order_by(AccessRequest.created_at.desc(), AccessRequest.id.desc())
+    requests = list(await db.scalars(query.limit(limit + 1)))
+    if len(requests) <= limit:
+        return requests, None
+    requests = requests[:limit]
+    return requests, encode_cursor(requests[-1])
 
 
-def update_request_status(
-    db: Session, request_id: str, status: AccessRequestStatus, rejection_reason: str | None = None
+async def update_request_status(
+    db: AsyncSession,
+    request_id: uuid.UUID,
+    status: AccessRequestStatus,
+    rejection_reason: str | None = None,
 ) -> AccessRequest:
     """
     Обновляет статус заявки.
@@ -61,16 +252,15 @@ def update_request_status(
     Используется Worker'ом для обновления статуса после обработки.
     """
     
-    req = get_access_request(db, request_id)
+    req = await get_access_request(db, request_id)
     if not req:
         raise ValueError(f"Заявка {request_id} не найдена")
     
-    req.status = AccessRequestStatus
+    req.status = status
     if rejection_reason:
         req.rejection_reason = rejection_reason
     
-    db.commit()
-    db.refresh(req)
+    await db.commit()
     
     logger.info(f"Статус заявки {request_id} обновлен на {status}")
     return req
@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from sqlalchemy import func, select
+
+from ars.app.core.config import settings
+from ars.app.core.db import AsyncSessionLocal
+from common.clock import utcnow
+from common.enums import AccessRequestStatus
+from common.models.access_request import AccessRequest
+from common.models.outbox import OutboxMessage
+
+
+logger = logging.getLogger(__name__)
+
+# Состояние конвейера заявок (ARS -> outbox -> RabbitMQ -> worker)
+STATUS_OK = "ok"
+STATUS_DEGRADED = "degraded"
+STATUS_OVERLOADED = "overloaded"
+# Замеров нет или они устарели: заявки принимаются без ограничений
+STATUS_UNKNOWN = "unknown"
+
+
+class PipelineSnapshot(NamedTuple):
+    # Принятые, но еще не взятые worker'ом заявки (PENDING) моложе горизонта
+    # admission_pending_horizon_s: в outbox и в очереди. Это счетчик из БД, а не
+    # глубина очередей RabbitMQ: брокер не опрашивается
+    pending_requests: int
+    # Возраст admission_age_rank-й по старшинству из них, сек (0 - их меньше)
+    oldest_pending_age_s: float
+    # PENDING-заявки старше горизонта: потерянные публикации, сообщения в DLQ.
+    # На состояние конвейера не влияют, их возвращает redrive
+    stale_pending: int
+    # Сообщения, еще не опубликованные в RabbitMQ
+    outbox_backlog: int
+    sampled_at: datetime
+    sampled_monotonic: float
+
+
+class AdmissionRejectedError(Exception):
+    """Заявка не принята: конвейер перегружен. retry_after - через сколько секунд повторить."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBuckets:
+    """
+    Token bucket на каждого вызывающего: rate токенов в секунду, не больше burst.
+
+    Хранятся последние max_callers вызывающих (LRU); вытесненный вызывающий
+    снова начинает с полного ведра.
+    """
+
+    def __init__(self, rate: float, burst: float, max_callers: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_callers = max_callers
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, caller: str, cost: float = 1) -> float:
+        """Списывает cost токенов; 0 - списано, иначе сколько секунд ждать до нужного запаса."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(caller, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        elif cost > self.burst or self.rate <= 0:
+            wait = math.inf
+        else:
+            wait = (cost - tokens) / self.rate
+        self._buckets[caller] = (tokens, now)
+        self._buckets.move_to_end(caller)
+        while len(self._buckets) > self.max_callers:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """
+    Admission control на создании заявок.
+
+    Раз в admission_sample_interval_s читает из БД число PENDING-заявок моложе
+    admission_pending_horizon_s, возраст admission_age_rank-й по старшинству из
+    них и размер outbox; по порогам определяет состояние конвейера и применяет
+    политику admission_policy (по умолчанию off - только замеры):
+
+        состояние    reject   token_bucket         priority
+        degraded     прием    ведро на вызывающего  только приоритетные
+        overloaded   429      429                   только приоритетные
+
+    Приоритетные заявки - отзыв прав (REVOKE) и заявки вызывающих из
+    admission_priority_callers. Если замеров нет (старт, ошибки БД),
+    заявки принимаются. Горизонт и ранг нужны, чтобы несколько застрявших
+    заявок (потерянная публикация, сообщение в DLQ) не держали конвейер в
+    overloaded бесконечно.
+    """
+
+    def __init__(self):
+        self.policy = settings.admission_policy
+        self.buckets = TokenBuckets(
+            rate=settings.admission_caller_rate,
+            burst=settings.admission_caller_burst,
+            max_callers=settings.admission_max_callers,
+        )
+        self.snapshot: Optional[PipelineSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        # Замеры идут и при policy=off: состояние конвейера видно в /health/pipeline
+        self._task = asyncio.create_task(self._run(), name="admission-sampler")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def sample(self) -> PipelineSnapshot:
+        now = utcnow()
+        horizon = now - timedelta(seconds=settings.admission_pending_horizon_s)
+        pending = AccessRequest.status == AccessRequestStatus.PENDING
+        async with AsyncSessionLocal() as db:
+            pending_requests = await db.scalar(
+                select(func.count()).where(pending, AccessRequest.created_at >= horizon)
+            )
+            stale_pending = await db.scalar(
+                select(func.count()).where(pending, AccessRequest.created_at < horizon)
+            )
+            # Индекс (status, created_at): читается admission_age_rank строк
+            oldest = await db.scalar(
+                select(AccessRequest.created_at)
+                .where(pending, AccessRequest.created_at >= horizon)
+                .order_by(AccessRequest.created_at)
+                .offset(settings.admission_age_rank - 1)
+                .limit(1)
+            )
+            outbox_backlog = await db.scalar(select(func.count()).select_from(OutboxMessage))
+        self.snapshot = PipelineSnapshot(
+            pending_requests=pending_requests,
+            oldest_pending_age_s=max(0.0, (now - oldest).total_seconds()) if oldest else 0.0,
+            stale_pending=stale_pending,
+            outbox_backlog=outbox_backlog,
+            sampled_at=now,
+            sampled_monotonic=time.monotonic(),
+        )
+        return self.snapshot
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sample()
+            except Exception as e:
+                logger.error(f"Ошибка замера состояния конвейера заявок: {e}")
+            await asyncio.sleep(settings.admission_sample_interval_s)
+
+    def current_snapshot(self) -> Optional[PipelineSnapshot]:
+        """Последний замер, если он не старше трех интервалов замера."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+        max_age = 3 * settings.admission_sample_interval_s
+        if time.monotonic() - snapshot.sampled_monotonic > max_age:
+            return None
+        return snapshot
+
+    def status(self) -> str:
+        snapshot = self.current_snapshot()
+        if snapshot is None:
+            return STATUS_UNKNOWN
+        if (
+            snapshot.pending_requests >= settings.admission_overloaded_pending
+            or snapshot.oldest_pending_age_s >= settings.admission_overloaded_age_s
+        ):
+            return STATUS_OVERLOADED
+        if (
+            snapshot.pending_requests >= settings.admission_degraded_pending
+            or snapshot.oldest_pending_age_s >= settings.admission_degraded_age_s
+        ):
+            return STATUS_DEGRADED
+        return STATUS_OK
+
+    def is_priority_caller(self, caller: str) -> bool:
+        return caller in settings.admission_priority_callers
+
+    def admit(self, caller: str, cost: int = 1, priority: bool = False) -> None:
+        """
+        Решение о приеме cost заявок от caller; priority - все заявки приоритетные.
+
+        Raises:
+            AdmissionRejectedError: заявки не приняты, повторить через retry_after
+        """
+        if self.policy == "off":
+            return
+        status = self.status()
+        if status in (STATUS_OK, STATUS_UNKNOWN):
+            return
+        if priority or self.is_priority_caller(caller):
+            return
+
+        retry_after = settings.admission_retry_after_s
+        if self.policy == "priority":
+            raise AdmissionRejectedError(
+                f"Конвейер заявок {status}: принимаются только приоритетные заявки",
+                retry_after,
+            )
+        if status == STATUS_OVERLOADED:
+            raise AdmissionRejectedError(f"Конвейер заявок {status}", retry_after)
+        if self.policy == "token_bucket":
+            wait = self.buckets.take(caller, cost)
+            if wait == math.inf:
+                raise AdmissionRejectedError(
+                    f"Конвейер заявок {status}: пакет из {cost} заявок больше лимита "
+                    f"вызывающего ({self.buckets.burst:g})",
+                    retry_after,
+                )
+            if wait:
+                raise AdmissionRejectedError(
+                    f"Конвейер заявок {status}: превышен лимит заявок вызывающего {caller}",
+                    wait,
+                )
+
+
+_controller: AdmissionController | None = None
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
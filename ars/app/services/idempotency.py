@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ars.app.core.config import settings
+from ars.app.core.db import AsyncSessionLocal
+from ars.app.schemas.access_request import AccessRequestCreate
+from common.clock import utcnow
+from common.models.access_request import AccessRequest
+from common.models.idempotency import IdempotencyKey
+
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyKeyReusedError(ValueError):
+    """Idempotency-Key уже использован для запроса с другим телом."""
+
+
+def request_hash(data: AccessRequestCreate) -> str:
+    return hashlib.sha256(data.model_dump_json().encode("utf-8")).hexdigest()
+
+
+def _expires_before() -> datetime:
+    return utcnow() - timedelta(seconds=settings.idempotency_key_ttl_s)
+
+
+async def find_replay(
+    db: AsyncSession, caller: str, key: str, data_hash: str
+) -> AccessRequest | None:
+    """
+    Заявка, уже созданная вызывающим caller с этим ключом, или None.
+
+    Просроченный, но еще не удаленный ключ удаляется в текущей транзакции -
+    его место займет новая заявка.
+    """
+    row = await db.get(IdempotencyKey, (caller, key))
+    if row is None:
+        return None
+    if row.created_at < _expires_before():
+        await db.delete(row)
+        await db.flush()
+        return None
+    if row.request_hash != data_hash:
+        raise IdempotencyKeyReusedError(
+            f"Idempotency-Key {key} уже использован для другой заявки"
+        )
+    return await db.get(AccessRequest, row.request_id)
+
+
+async def purge_expired_keys() -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.created_at < _expires_before())
+        )
+        await db.commit()
+        return result.rowcount
+
+
+async def run_purger() -> None:
+    """Раз в idempotency_purge_interval_s удаляет ключи старше окна хранения."""
+    while True:
+        try:
+            purged = await purge_expired_keys()
+            if purged:
+                logger.info(f"Удалено просроченных Idempotency-Key: {purged}")
+        except Exception as e:
+            logger.error(f"Ошибка удаления просроченных Idempotency-Key: {e}")
+        await asyncio.sleep(settings.idempotency_purge_interval_s)
@@ -0,0 +1,136 @@
+import json
+import math
+from typing import AsyncIterator, Callable
+
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from ars.app.core.config import settings
+from ars.app.core.db import AsyncSessionLocal
+from ars.app.schemas.access_request import AccessRequestCreate
+from ars.app.services.access_request import create_access_requests, format_validation_error
+from ars.app.services.admission import AdmissionRejectedError
+
+
+class NDJSONIngestResponse(StreamingResponse):
+    """
+    Ответ, который читает тело запроса во время отправки результатов.
+
+    StreamingResponse параллельно ждет http.disconnect через receive() и
+    при этом забирает себе части тела запроса, поэтому здесь ответ только
+    отправляется; обрыв соединения завершит отправку ошибкой записи.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+def _result_line(result: dict) -> bytes:
+    return (json.dumps(result) + "\n").encode("utf-8")
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, bytes | None]]:
+    """
+    Разбивает поток байтов на строки: (номер строки, строка).
+
+    Слишком длинная строка не накапливается в памяти: вместо нее
+    возвращается None, остаток строки пропускается.
+    """
+    buffer = b""
+    line_no = 0
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            newline = buffer.find(b"\n")
+            if newline < 0:
+                break
+            line, buffer = buffer[:newline], buffer[newline + 1:]
+            line_no += 1
+            if skipping or len(line) > settings.ndjson_max_line_bytes:
+                skipping = False
+                yield line_no, None
+            else:
+                yield line_no, line
+        if len(buffer) > settings.ndjson_max_line_bytes:
+            skipping = True
+            buffer = b""
+    if skipping or buffer.strip():
+        line_no += 1
+        yield line_no, None if skipping else buffer
+
+
+async def ingest_ndjson(
+    chunks: AsyncIterator[bytes],
+    admit: Callable[[list[AccessRequestCreate]], None] | None = None,
+) -> AsyncIterator[bytes]:
+    """
+    Потоковая загрузка заявок из NDJSON.
+
+    Строки проверяются по мере чтения и сохраняются пакетами по
+    settings.ndjson_batch_size (заявки + outbox одним commit'ом).
+    Следующая порция тела читается только после того, как результаты
+    пакета отправлены клиенту, поэтому память не зависит от размера файла.
+    На каждую непустую строку возвращается строка результата:
+    {"line": N, "id": "..."} или {"line": N, "error": "..."}.
+
+    admit решает о приеме каждого пакета перед сохранением (admission
+    control). После отказа (AdmissionRejectedError) заявки больше не
+    сохраняются: строки отказавшего пакета и остаток тела получают ошибку
+    с retry_after (секунды до повтора) - с них клиент продолжает загрузку.
+    """
+    batch: list[tuple[int, AccessRequestCreate]] = []
+    errors: list[dict] = []
+    refused: AdmissionRejectedError | None = None
+
+    def refusal(line_no: int) -> dict:
+        return {
+            "line": line_no,
+            "error": str(refused),
+            "retry_after": max(1, math.ceil(refused.retry_after)),
+        }
+
+    async def flush():
+        nonlocal refused
+        results = list(errors)
+        errors.clear()
+        if batch:
+            items = [item for _, item in batch]
+            if refused is None and admit is not None:
+                try:
+                    admit(items)
+                except AdmissionRejectedError as e:
+                    refused = e
+            if refused is not None:
+                results.extend(refusal(line_no) for line_no, _ in batch)
+            else:
+                async with AsyncSessionLocal() as db:
+                    request_ids = await create_access_requests(db, items)
+                results.extend(
+                    {"line": line_no, "id": str(request_id)}
+                    for (line_no, _), request_id in zip(batch, request_ids)
+                )
+            batch.clear()
+        results.sort(key=lambda result: result["line"])
+        return b"".join(_result_line(result) for result in results)
+
+    async for line_no, line in _iter_lines(chunks):
+        if refused is not None:
+            # Остаток тела дочитывается, чтобы клиент получил ответ по каждой строке
+            if line is None or line.strip():
+                errors.append(refusal(line_no))
+        elif line is None:
+            errors.append({"line": line_no, "error": "Строка слишком длинная"})
+        elif not line.strip():
+            continue
+        else:
+            try:
+                batch.append((line_no, AccessRequestCreate.model_validate_json(line)))
+            except ValidationError as e:
+                errors.append({"line": line_no, "error": format_validation_error(e)})
+
+        if len(batch) + len(errors) >= settings.ndjson_batch_size:
+            yield await flush()
+
+    if batch or errors:
+        yield await flush()
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from ars.app.core.config import settings
+from ars.app.core.db import async_engine
+
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationListener:
+    """
+    Подписка на уведомления worker'а через Postgres LISTEN/NOTIFY.
+
+    Одно соединение из пула async_engine держится все время работы и
+    слушает все каналы, для которых зарегистрированы обработчики; раз в
+    notify_keepalive_s оно проверяется. Пока LISTEN не активен (старт,
+    обрыв, переподключение), уведомления теряются - тогда вызываются
+    reset-обработчики. Вне Postgres слушатель не запускается.
+    """
+
+    def __init__(self):
+        self._handlers: dict[str, list[Callable[[str], None]]] = {}
+        self._reset_handlers: list[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return async_engine.dialect.name == "postgresql"
+
+    def add_handler(self, channel: str, handler: Callable[[str], None]) -> None:
+        handlers = self._handlers.setdefault(channel, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+    def add_reset_handler(self, handler: Callable[[], None]) -> None:
+        if handler not in self._reset_handlers:
+            self._reset_handlers.append(handler)
+
+    def start(self) -> None:
+        if not self.enabled:
+            logger.warning("БД не Postgres: уведомления worker'а (LISTEN/NOTIFY) недоступны")
+            return
+        self._task = asyncio.create_task(self._run(), name="pg-notifications")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _on_notification(self, connection, pid, channel: str, payload: str) -> None:
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.warning(f"Ошибка обработки уведомления {channel} ({payload!r}): {e}")
+
+    def _reset(self) -> None:
+        for handler in self._reset_handlers:
+            handler()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with async_engine.connect() as conn:
+                    raw = await conn.get_raw_connection()
+                    listener = raw.driver_connection
+                    lost = asyncio.Event()
+                    listener.add_termination_listener(lambda _: lost.set())
+                    for channel in self._handlers:
+                        await listener.add_listener(channel, self._on_notification)
+                    self._reset()
+                    logger.info(f"Подписка на уведомления активна: {', '.join(self._handlers)}")
+                    try:
+                        # Проверка соединения: молча оборванный TCP не вызывает termination listener
+                        while not lost.is_set():
+                            try:
+                                await asyncio.wait_for(lost.wait(), settings.notify_keepalive_s)
+                            except asyncio.TimeoutError:
+                                await listener.execute("SELECT 1")
+                    finally:
+                        if not listener.is_closed():
+                            for channel in self._handlers:
+                                await listener.remove_listener(channel, self._on_notification)
+                    logger.warning("Соединение подписки на уведомления потеряно")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка подписки на уведомления: {e}")
+            self._reset()
+            await asyncio.sleep(settings.notify_retry_s)
+
+
+_listener: NotificationListener | None = None
+
+
+def get_notification_listener() -> NotificationListener:
+    global _listener
+    if _listener is None:
+        _listener = NotificationListener()
+    return _listener
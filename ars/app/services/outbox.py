@@ -0,0 +1,120 @@
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from ars.app.core.config import settings
+from ars.app.core.db import SessionLocal
+from ars.app.core.rabbitmq import get_publisher
+from common.models.outbox import OutboxMessage
+
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки relay: публикует только один экземпляр ARS за раз
+_RELAY_LOCK_KEY = "ars_outbox_relay"
+
+
+class OutboxRelay:
+    """
+    Публикует сообщения из outbox в RabbitMQ.
+
+    Работает в отдельном потоке (pika блокирующий): забирает до
+    settings.outbox_batch_size сообщений по порядку, публикует их
+    с подтверждениями брокера и удаляет из outbox в той же транзакции.
+    При нескольких экземплярах ARS пакет публикует тот, кто взял
+    advisory-блокировку relay, остальные пропускают цикл: параллельные
+    relay перемешали бы порядок заявок одного пользователя.
+    """
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self) -> None:
+        """В outbox появились сообщения - опубликовать, не дожидаясь опроса."""
+        self._wakeup.set()
+
+    @staticmethod
+    def _try_lock(db: Session) -> bool:
+        """
+        Advisory-блокировка relay до конца транзакции (Postgres).
+
+        Вне Postgres не берется: SQLite - только локальная разработка с одним ARS.
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return True
+        return db.scalar(
+            select(func.pg_try_advisory_xact_lock(func.hashtextextended(_RELAY_LOCK_KEY, 0)))
+        )
+
+    def relay_batch(self) -> int:
+        """Публикует один пакет сообщений, возвращает их число."""
+        with SessionLocal() as db:
+            if not self._try_lock(db):
+                # Публикует другой экземпляр ARS
+                return 0
+            messages = db.scalars(
+                select(OutboxMessage)
+                .order_by(OutboxMessage.id)
+                .limit(settings.outbox_batch_size)
+            ).all()
+            if not messages:
+                return 0
+
+            get_publisher().publish_outbox_messages(messages)
+
+            db.execute(
+                delete(OutboxMessage).where(
+                    OutboxMessage.id.in_([message.id for message in messages])
+                )
+            )
+            db.commit()
+        return len(messages)
+
+    def _run(self) -> None:
+        logger.info("Outbox relay запущен")
+        while not self._stopping.is_set():
+            self._wakeup.clear()
+            try:
+                relayed = self.relay_batch()
+            except Exception as e:
+                logger.error(
+                    f"Outbox relay: ошибка публикации, повтор через "
+                    f"{settings.outbox_retry_interval_s} с: {e}"
+                )
+                self._stopping.wait(settings.outbox_retry_interval_s)
+                continue
+
+            if relayed:
+                logger.info(f"Outbox relay: опубликовано сообщений: {relayed}")
+            if relayed < settings.outbox_batch_size:
+                self._wakeup.wait(settings.outbox_poll_interval_s)
+        logger.info("Outbox relay остановлен")
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+# Глобальный экземпляр relay (singleton)
+_relay: Optional[OutboxRelay] = None
+
+
+def get_outbox_relay() -> OutboxRelay:
+    """Возвращает глобальный экземпляр outbox relay."""
+    global _relay
+    if _relay is None:
+        _relay = OutboxRelay()
+    return _relay
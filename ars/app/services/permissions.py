@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+
+from ars.app.core.config import settings
+from common.clients.registry_client import AsyncRegistryClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class PermissionsCache:
+    """
+    Read-through кеш прав пользователей из Registry.
+
+    Запись живет ttl_s секунд, при переполнении вытесняется давно не
+    читавшаяся (LRU). Одновременные промахи по одному пользователю
+    обслуживаются одним запросом в Registry; отмена одного из ожидающих
+    запросов не отменяет загрузку для остальных.
+
+    Сброс (invalidate) отвязывает незавершенную загрузку: ее ответ мог быть
+    получен до одобрения заявки, поэтому в кеш он не попадает.
+    """
+
+    def __init__(self, ttl_s: float, max_entries: int):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: OrderedDict[uuid.UUID, tuple[float, list[dict]]] = OrderedDict()
+        self._loading: dict[uuid.UUID, asyncio.Task] = {}
+
+    async def get(self, user_id: uuid.UUID, registry_client: AsyncRegistryClient) -> list[dict]:
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            expires_at, permissions = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(user_id)
+                return permissions
+            del self._entries[user_id]
+
+        task = self._loading.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._load(user_id, registry_client))
+            # Ошибку забирают ожидающие; если все они отменены - не шуметь в логе loop'а
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._loading[user_id] = task
+        return await asyncio.shield(task)
+
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        self._entries.pop(user_id, None)
+        self._loading.pop(user_id, None)
+
+    def clear(self) -> None:
+        """Сбрасывает весь кеш (например, после потери уведомлений)."""
+        self._entries.clear()
+        self._loading.clear()
+
+    def on_permissions_changed(self, payload: str) -> None:
+        """Обработчик PERMISSIONS_CHANGED_CHANNEL: payload - user_id."""
+        self.invalidate(uuid.UUID(payload))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def _load(self, user_id: uuid.UUID, registry_client: AsyncRegistryClient) -> list[dict]:
+        task = asyncio.current_task()
+        try:
+            permissions = await registry_client.get_user_permission_groups(user_id)
+        finally:
+            current = self._loading.get(user_id) is task
+            if current:
+                del self._loading[user_id]
+        if current:
+            self._entries[user_id] = (time.monotonic() + self.ttl_s, permissions)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return permissions
+
+
+_cache: PermissionsCache | None = None
+
+
+def get_permissions_cache() -> PermissionsCache:
+    global _cache
+    if _cache is None:
+        _cache = PermissionsCache(
+            ttl_s=settings.permissions_cache_ttl_s,
+            max_entries=settings.permissions_cache_max_entries,
+        )
+    return _cache
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import uuid
+from contextlib import suppress
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ars.app.core.config import settings
+from ars.app.core.db import AsyncSessionLocal, async_engine
+from common.clients.registry_client import AsyncRegistryClient
+from common.clock import utcnow
+from common.db.upsert import dialect_insert
+from common.models.user_permission import PermissionsProjectionState, UserPermission
+
+
+logger = logging.getLogger(__name__)
+
+_STATE_ID = 1
+
+
+async def get_projected_permissions(
+    db: AsyncSession, user_id: uuid.UUID
+) -> tuple[datetime, list[dict]] | None:
+    """
+    Права пользователя из проекции одним запросом по первичному ключу
+    user_permissions, вместе с временем последней сверки.
+
+    None - проекция еще не заполнена или не сверялась дольше
+    projection_max_staleness_s: права нужно читать из Registry.
+    """
+    rows = (
+        await db.execute(
+            select(
+                PermissionsProjectionState.reconciled_at,
+                UserPermission.group_id,
+                UserPermission.group_name,
+            )
+            .select_from(PermissionsProjectionState)
+            .outerjoin(
+                UserPermission,
+                and_(UserPermission.user_id == user_id, UserPermission.active.is_(True)),
+            )
+            .where(PermissionsProjectionState.id == _STATE_ID)
+        )
+    ).all()
+    if not rows or rows[0].reconciled_at is None:
+        return None
+    reconciled_at = rows[0].reconciled_at
+    if utcnow() - reconciled_at > timedelta(seconds=settings.projection_max_staleness_s):
+        return None
+    return reconciled_at, [
+        {"id": row.group_id, "name": row.group_name}
+        for row in rows
+        if row.group_id is not None
+    ]
+
+
+async def _acquire_lease(db: AsyncSession, now: datetime) -> bool:
+    """Аренда сверки: не дает нескольким экземплярам ARS сверять одновременно."""
+    insert = dialect_insert(async_engine.dialect.name)
+    await db.execute(
+        insert(PermissionsProjectionState)
+        .values(id=_STATE_ID)
+        .on_conflict_do_nothing(index_elements=[PermissionsProjectionState.id])
+    )
+    result = await db.execute(
+        update(PermissionsProjectionState)
+        .where(
+            PermissionsProjectionState.id == _STATE_ID,
+            or_(
+                PermissionsProjectionState.lease_until.is_(None),
+                PermissionsProjectionState.lease_until < now,
+            ),
+        )
+        .values(lease_until=now + timedelta(seconds=settings.projection_lease_s))
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def _apply_snapshot_page(
+    db: AsyncSession,
+    after: dict | None,
+    page: dict,
+    fetched_at: datetime,
+) -> None:
+    """
+    Приводит диапазон ключей (after, последний ключ страницы] к странице снимка.
+
+    Строки диапазона, не обновлявшиеся worker'ом после запроса страницы,
+    заменяются строками снимка; более свежие изменения worker'а (в том
+    числе отзывы, active=False) сохраняются.
+    """
+    key = tuple_(UserPermission.user_id, UserPermission.group_id)
+    conditions = [
+        UserPermission.updated_at
+        < fetched_at - timedelta(seconds=settings.projection_clock_skew_s)
+    ]
+    if after is not None:
+        conditions.append(key > (uuid.UUID(after["user_id"]), uuid.UUID(after["group_id"])))
+    if page["next_after"] is not None:
+        last = page["next_after"]
+        conditions.append(key <= (uuid.UUID(last["user_id"]), uuid.UUID(last["group_id"])))
+    await db.execute(delete(UserPermission).where(*conditions))
+
+    if page["items"]:
+        insert = dialect_insert(async_engine.dialect.name)
+        stmt = insert(UserPermission).values(
+            [
+                {
+                    "user_id": uuid.UUID(item["user_id"]),
+                    "group_id": uuid.UUID(item["group_id"]),
+                    "group_name": item["group_name"],
+                    "active": True,
+                    "updated_at": fetched_at,
+                }
+                for item in page["items"]
+            ]
+        )
+        # Строка, записанная worker'ом после запроса страницы, остается как есть;
+        # из снимка берется только имя группы
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[UserPermission.user_id, UserPermission.group_id],
+                set_={"group_name": stmt.excluded.group_name},
+            )
+        )
+
+    await db.execute(
+        update(PermissionsProjectionState)
+        .where(PermissionsProjectionState.id == _STATE_ID)
+        .values(
+            lease_until=utcnow() + timedelta(seconds=settings.projection_lease_s)
+        )
+    )
+    await db.commit()
+
+
+async def reconcile_permissions(registry_client: AsyncRegistryClient) -> int | None:
+    """
+    Сверяет проекцию прав со снимком Registry (первый запуск - заполняет).
+
+    Снимок читается постранично по ключу (user_id, group_id), каждая страница
+    применяется отдельной транзакцией. Возвращает число прав в снимке или None,
+    если сверку сейчас выполняет другой экземпляр ARS.
+    """
+    started_at = utcnow()
+    async with AsyncSessionLocal() as db:
+        if not await _acquire_lease(db, started_at):
+            return None
+
+        total = 0
+        after = None
+        try:
+            while True:
+                fetched_at = utcnow()
+                page = await registry_client.get_user_permissions_snapshot(
+                    after, limit=settings.projection_snapshot_page_size
+                )
+                await _apply_snapshot_page(db, after, page, fetched_at)
+                total += len(page["items"])
+                after = page["next_after"]
+                if after is None:
+                    break
+        except BaseException:
+            # Освобождаем аренду, чтобы следующая сверка не ждала ее истечения
+            with suppress(Exception):
+                await db.rollback()
+                await db.execute(
+                    update(PermissionsProjectionState)
+                    .where(PermissionsProjectionState.id == _STATE_ID)
+                    .values(lease_until=None)
+                )
+                await db.commit()
+            raise
+
+        # Изменения Registry до started_at учтены: это и есть граница устаревания
+        await db.execute(
+            update(PermissionsProjectionState)
+            .where(PermissionsProjectionState.id == _STATE_ID)
+            .values(reconciled_at=started_at, lease_until=None)
+        )
+        await db.commit()
+        return total
+
+
+async def run_reconciler(registry_client: AsyncRegistryClient) -> None:
+    """Сверка при старте (заполнение проекции), затем раз в projection_reconcile_interval_s."""
+    while True:
+        try:
+            total = await reconcile_permissions(registry_client)
+            if total is not None:
+                logger.info(f"Проекция прав сверена с Registry: {total} прав")
+        except Exception as e:
+            logger.error(f"Ошибка сверки проекции прав с Registry: {e}")
+        await asyncio.sleep(settings.projection_reconcile_interval_s)
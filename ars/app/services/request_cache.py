@@ -0,0 +1,91 @@
+import hashlib
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from ars.app.core.config import settings
+from ars.app.schemas.access_request import AccessRequestResponse, access_request_row
+from ars.app.services.status_watch import FINAL_STATUSES
+from common.models.access_request import AccessRequest
+from common.serialization import dumps
+
+
+class RequestCacheBackend(ABC):
+    """
+    Хранилище готовых ответов по финализированным заявкам.
+
+    Значения неизменяемы (итоговый статус заявки больше не меняется),
+    поэтому инвалидация не нужна - бэкенду достаточно get/set, и его можно
+    заменить общим для нескольких экземпляров ARS (например, Redis).
+    """
+
+    @abstractmethod
+    async def get(self, request_id: uuid.UUID) -> bytes | None: ...
+
+    @abstractmethod
+    async def set(self, request_id: uuid.UUID, body: bytes) -> None: ...
+
+
+class InMemoryRequestCacheBackend(RequestCacheBackend):
+    """LRU в памяти процесса, не больше max_entries ответов."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[uuid.UUID, bytes] = OrderedDict()
+
+    async def get(self, request_id: uuid.UUID) -> bytes | None:
+        body = self._entries.get(request_id)
+        if body is not None:
+            self._entries.move_to_end(request_id)
+        return body
+
+    async def set(self, request_id: uuid.UUID, body: bytes) -> None:
+        self._entries[request_id] = body
+        self._entries.move_to_end(request_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_backend: RequestCacheBackend | None = None
+
+
+def get_request_cache() -> RequestCacheBackend:
+    global _backend
+    if _backend is None:
+        _backend = InMemoryRequestCacheBackend(settings.request_cache_max_entries)
+    return _backend
+
+
+def set_request_cache(backend: RequestCacheBackend) -> None:
+    """Подключает другой бэкенд (до старта приложения)."""
+    global _backend
+    _backend = backend
+
+
+def is_final(req: AccessRequest) -> bool:
+    return req.status in FINAL_STATUSES
+
+
+def render_request(req: AccessRequest) -> bytes:
+    if settings.fast_json:
+        return dumps(access_request_row(req))
+    return AccessRequestResponse.model_validate(req).model_dump_json().encode("utf-8")
+
+
+def make_etag(body: bytes) -> str:
+    """Сильный ETag: хеш тела ответа."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match: список ETag'ов или "*"; сравнение слабое (RFC 9110, 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(",")
+    )
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterable, Iterator
+
+from sqlalchemy import select
+
+from ars.app.core.config import settings
+from ars.app.core.db import AsyncSessionLocal
+from ars.app.schemas.access_request import AccessRequestResponse
+from ars.app.services.notifications import get_notification_listener
+from common.enums import AccessRequestStatus
+from common.models.access_request import AccessRequest
+
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = (AccessRequestStatus.APPROVED, AccessRequestStatus.REJECTED)
+
+
+class Subscription:
+    """Ожидание смены статуса набора заявок."""
+
+    def __init__(self, request_ids: Iterable[uuid.UUID]):
+        self.request_ids = set(request_ids)
+        self._changed: set[uuid.UUID] = set()
+        self._event = asyncio.Event()
+
+    def wake(self, request_id: uuid.UUID) -> None:
+        self._changed.add(request_id)
+        self._event.set()
+
+    async def wait(self, timeout: float) -> set[uuid.UUID]:
+        """Ждет уведомлений до timeout секунд; возвращает заявки, статус которых менялся."""
+        if not self._event.is_set():
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        changed, self._changed = self._changed, set()
+        self._event.clear()
+        return changed
+
+
+class StatusWatcher:
+    """
+    Будит ожидающих по уведомлениям ACCESS_REQUEST_STATUS_CHANNEL вместо
+    опроса БД. При потере уведомлений (переподключение подписки) будятся
+    все подписки - они перечитают статусы сами.
+    """
+
+    def __init__(self):
+        self._subscriptions: dict[uuid.UUID, set[Subscription]] = {}
+
+    @contextmanager
+    def subscribe(self, request_ids: Iterable[uuid.UUID]) -> Iterator[Subscription]:
+        subscription = Subscription(request_ids)
+        for request_id in subscription.request_ids:
+            self._subscriptions.setdefault(request_id, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            for request_id in subscription.request_ids:
+                subscribers = self._subscriptions.get(request_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[request_id]
+
+    def on_status_changed(self, payload: str) -> None:
+        """Обработчик ACCESS_REQUEST_STATUS_CHANNEL: payload "STATUS|id,id,..."."""
+        _, request_ids = payload.split("|", 1)
+        for raw_id in request_ids.split(","):
+            request_id = uuid.UUID(raw_id)
+            for subscription in self._subscriptions.get(request_id, ()):
+                subscription.wake(request_id)
+
+    def wake_all(self) -> None:
+        for request_id, subscribers in self._subscriptions.items():
+            for subscription in subscribers:
+                subscription.wake(request_id)
+
+
+_watcher: StatusWatcher | None = None
+
+
+def get_status_watcher() -> StatusWatcher:
+    global _watcher
+    if _watcher is None:
+        _watcher = StatusWatcher()
+    return _watcher
+
+
+def _wait_timeout(remaining: float) -> float:
+    """Без уведомлений (не Postgres) статусы перечитываются с интервалом status_poll_interval_s."""
+    if get_notification_listener().enabled:
+        return remaining
+    return min(remaining, settings.status_poll_interval_s)
+
+
+async def _load_requests(request_ids: Iterable[uuid.UUID]) -> dict[uuid.UUID, AccessRequest]:
+    # Короткая сессия на каждое чтение: ожидание не держит соединение из пула
+    async with AsyncSessionLocal() as db:
+        rows = await db.scalars(select(AccessRequest).where(AccessRequest.id.in_(list(request_ids))))
+        return {row.id: row for row in rows}
+
+
+async def wait_for_request(request_id: uuid.UUID, wait_s: float) -> AccessRequest | None:
+    """
+    Long-poll: возвращает заявку, как только она получит итоговый статус,
+    или текущее состояние по истечении wait_s. None - заявки нет.
+    """
+    deadline = time.monotonic() + wait_s
+    with get_status_watcher().subscribe([request_id]) as subscription:
+        while True:
+            # Подписка оформлена до чтения: смена статуса между ними не потеряется
+            request = (await _load_requests([request_id])).get(request_id)
+            remaining = deadline - time.monotonic()
+            if request is None or request.status in FINAL_STATUSES or remaining <= 0:
+                return request
+            await subscription.wait(_wait_timeout(remaining))
+
+
+def _sse_event(event: str, data: str) -> bytes:
+    return f"event: {event}\ndata: {data}\n\n".encode("utf-8")
+
+
+async def stream_request_events(request_ids: list[uuid.UUID]) -> AsyncIterator[bytes]:
+    """
+    Server-Sent Events по заявкам request_ids.
+
+    Сначала - текущее состояние каждой заявки (event: status, data -
+    AccessRequestResponse), затем по событию на каждую смену статуса.
+    Несуществующая заявка - event: not_found. Поток завершается, когда все
+    заявки получили итоговый статус, или через status_stream_max_s
+    (EventSource переподключится сам). В паузах - keepalive-комментарии.
+    """
+    deadline = time.monotonic() + settings.status_stream_max_s
+    pending = set(request_ids)
+    last_status: dict[uuid.UUID, AccessRequestStatus] = {}
+
+    with get_status_watcher().subscribe(pending) as subscription:
+        changed = set(pending)
+        last_write = time.monotonic()
+        while True:
+            changed &= pending
+            if changed:
+                requests = await _load_requests(changed)
+                for request_id in sorted(changed):
+                    request = requests.get(request_id)
+                    if request is None:
+                        pending.discard(request_id)
+                        yield _sse_event("not_found", json.dumps({"id": str(request_id)}))
+                    elif request.status != last_status.get(request_id):
+                        last_status[request_id] = request.status
+                        if request.status in FINAL_STATUSES:
+                            pending.discard(request_id)
+                        yield _sse_event(
+                            "status", AccessRequestResponse.model_validate(request).model_dump_json()
+                        )
+                    else:
+                        continue
+                    last_write = time.monotonic()
+
+            remaining = deadline - time.monotonic()
+            if not pending or remaining <= 0:
+                return
+
+            keepalive_in = last_write + settings.status_stream_keepalive_s - time.monotonic()
+            if keepalive_in <= 0:
+                yield b": keepalive\n\n"
+                last_write = time.monotonic()
+                continue
+
+            changed = await subscription.wait(_wait_timeout(min(remaining, keepalive_in)))
+            if not get_notification_listener().enabled:
+                changed = set(pending)
@@ -6,7 +6,7 @@ from sqlalchemy import pool
 from alembic import context
 
 from common.models.access_request import Base
-from common.models import access_request
+from common.models import access_request, idempotency, outbox, user_permission
 from app.core.config import settings
 
 # this is the Alembic Config object, which provides
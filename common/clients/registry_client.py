@@ -1,60 +1,326 @@
 import logging
 import uuid
+from typing import Any, Callable, NamedTuple
 
 import httpx
 
+from common.clients.resilience import AsyncBulkhead, Bulkhead, CircuitBreaker
+
 
 logger = logging.getLogger(__name__)
 
+# Таймауты по умолчанию: Registry - внутренний сервис, долгое ожидание
+# соединения означает, что он недоступен
+DEFAULT_CONNECT_TIMEOUT_S = 2.0
+DEFAULT_READ_TIMEOUT_S = 10.0
+DEFAULT_MAX_CONCURRENCY = 10
+
+
+def _timeout(connect_timeout_s: float, read_timeout_s: float) -> httpx.Timeout:
+    return httpx.Timeout(read_timeout_s, connect=connect_timeout_s)
+
+
+def _is_failure(resp: httpx.Response) -> bool:
+    """Ошибки сервера учитываются circuit breaker'ом, ответы 4xx - нет."""
+    return resp.status_code >= 500
+
+
+# =============================
+# ENDPOINTS
+# =============================
+#
+# Запросы к Registry и разбор ответов общие для синхронного и асинхронного
+# клиентов: клиенты отличаются только тем, как отправляют запрос.
+
+class _Call(NamedTuple):
+    # Имя endpoint'а для bulkhead'а
+    endpoint: str
+    method: str
+    path: str
+    kwargs: dict[str, Any]
+    parse: Callable[[httpx.Response], Any]
+
+
+def _json(resp: httpx.Response) -> Any:
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _no_content(resp: httpx.Response) -> None:
+    resp.raise_for_status()
+
+
+def _user_permission_groups(user_id: uuid.UUID) -> _Call:
+    return _Call(
+        "user-permission-groups",
+        "GET",
+        f"/internal/users/{user_id}/permission-groups",
+        {},
+        _json,
+    )
+
+
+def _parse_conflict_check(resp: httpx.Response) -> tuple[bool, str | None]:
+    data = _json(resp)
+    return data["has_conflict"], data.get("reason")
+
+
+def _check_conflicts(user_current_groups: list[str], new_group_id: uuid.UUID) -> _Call:
+    return _Call(
+        "check-conflicts",
+        "POST",
+        "/internal/permission-groups/check-conflicts",
+        {
+            "json": {
+                "user_current_groups": user_current_groups,
+                "new_group_id": str(new_group_id),
+            }
+        },
+        _parse_conflict_check,
+    )
+
+
+def _parse_conflict_matrix(resp: httpx.Response) -> dict | None:
+    if resp.status_code == 304:
+        return None
+    return _json(resp)
+
+
+def _conflict_matrix(version: str | None) -> _Call:
+    kwargs = {}
+    if version:
+        # Не изменилась - 304, иначе только изменения после version
+        kwargs = {"headers": {"If-None-Match": f'"{version}"'}, "params": {"since": version}}
+    return _Call(
+        "conflict-matrix",
+        "GET",
+        "/internal/permission-groups/conflicts",
+        kwargs,
+        _parse_conflict_matrix,
+    )
+
+
+def _permissions_snapshot(after: dict | None, limit: int) -> _Call:
+    params = {"limit": limit}
+    if after is not None:
+        params.update(after_user_id=after["user_id"], after_group_id=after["group_id"])
+    return _Call(
+        "permissions-snapshot",
+        "GET",
+        "/internal/user-permission-groups/snapshot",
+        {"params": params},
+        _json,
+    )
+
+
+def _grant(user_id: uuid.UUID, group_id: uuid.UUID) -> _Call:
+    return _Call(
+        "grant",
+        "POST",
+        f"/internal/users/{user_id}/permission-groups/{group_id}/grant",
+        {},
+        _no_content,
+    )
+
+
+def _revoke(user_id: uuid.UUID, group_id: uuid.UUID) -> _Call:
+    return _Call(
+        "revoke",
+        "POST",
+        f"/internal/users/{user_id}/permission-groups/{group_id}/revoke",
+        {},
+        _no_content,
+    )
+
+
+class AccessChange(NamedTuple):
+    """Результат .../apply; group_name - имя выданной группы (для проекции прав)."""
+    applied: bool
+    reason: str | None
+    group_name: str | None = None
+
+
+def _parse_apply(resp: httpx.Response) -> AccessChange:
+    data = _json(resp)
+    return AccessChange(data["applied"], data.get("reason"), data.get("group_name"))
+
+
+def _apply(user_id: uuid.UUID, group_id: uuid.UUID, action: str) -> _Call:
+    return _Call(
+        "apply",
+        "POST",
+        f"/internal/users/{user_id}/permission-groups/{group_id}/apply",
+        {"json": {"action": action}},
+        _parse_apply,
+    )
+
+
+def _record_outcome(breaker: CircuitBreaker, resp: httpx.Response) -> None:
+    if _is_failure(resp):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+# =============================
+# CLIENTS
+# =============================
+
 
 class RegistryClient:
-    """Клиент для запросов в Registry (internal API only)."""
+    """
+    Клиент для запросов в Registry (internal API only).
 
-    def __init__(self, url):
+    Все запросы проходят через circuit breaker (его можно разделять между
+    экземплярами клиента) и bulkhead с лимитом одновременных запросов
+    на каждый endpoint.
+    """
+
+    def __init__(
+        self,
+        url,
+        connect_timeout_s: float = DEFAULT_CONNECT_TIMEOUT_S,
+        read_timeout_s: float = DEFAULT_READ_TIMEOUT_S,
+        breaker: CircuitBreaker | None = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ):
         self.url = url
+        self.breaker = breaker or CircuitBreaker("registry")
+        self._bulkhead = Bulkhead(max_concurrency)
         self._client = httpx.Client(
             base_url=self.url,
-            timeout=30.0,
+            timeout=_timeout(connect_timeout_s, read_timeout_s),
         )
 
+    def _request(self, endpoint: str, method: str, path: str, **kwargs) -> httpx.Response:
+        # Слот bulkhead'а - до проверки breaker'а: отказ bulkhead'а не должен
+        # занимать пробный вызов HALF_OPEN
+        with self._bulkhead.slot(endpoint), self.breaker.attempt():
+            try:
+                resp = self._client.request(method, path, **kwargs)
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                raise
+            _record_outcome(self.breaker, resp)
+        return resp
+
+    def _call(self, call: _Call) -> Any:
+        return call.parse(self._request(call.endpoint, call.method, call.path, **call.kwargs))
+
     def get_user_permission_groups(self, user_id: uuid.UUID) -> list[dict]:
-        resp = self._client.get(
-            f"/internal/users/{user_id}/permission-groups"
-        )
-        resp.raise_for_status()
-        return resp.json()
+        return self._call(_user_permission_groups(user_id))
 
     def check_conflicts(
         self,
         user_current_groups: list[str],
         new_group_id: uuid.UUID,
     ) -> tuple[bool, str | None]:
-        resp = self._client.post(
-            "/internal/permission-groups/check-conflicts",
-            json={
-                "user_current_groups": user_current_groups,
-                "new_group_id": str(new_group_id),
-            },
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        return data["has_conflict"], data.get("reason")
+        return self._call(_check_conflicts(user_current_groups, new_group_id))
+
+    def get_conflict_matrix(self, version: str | None = None) -> dict | None:
+        """
+        Матрица конфликтов {"version": ..., "conflicts": [...], "changes": ...}.
+
+        Если матрица не изменилась с version, возвращает None; если изменилась -
+        changes со списком изменений после version (conflicts пуст).
+        """
+        return self._call(_conflict_matrix(version))
+
+    def get_user_permissions_snapshot(
+        self, after: dict | None = None, limit: int = 5000
+    ) -> dict:
+        """Страница снимка выданных прав: {"items": [...], "next_after": {...} | None}."""
+        return self._call(_permissions_snapshot(after, limit))
 
     def grant_permission_group(
         self, user_id: uuid.UUID, group_id: uuid.UUID
     ) -> None:
-        resp = self._client.post(
-            f"/internal/users/{user_id}/permission-groups/{group_id}/grant"
-        )
-        resp.raise_for_status()
+        self._call(_grant(user_id, group_id))
 
     def revoke_permission_group(
         self, user_id: uuid.UUID, group_id: uuid.UUID
     ) -> None:
-        resp = self._client.post(
-            f"/internal/users/{user_id}/permission-groups/{group_id}/revoke"
-        )
-        resp.raise_for_status()
+        self._call(_revoke(user_id, group_id))
+
+    def apply_access_change(
+        self, user_id: uuid.UUID, group_id: uuid.UUID, action: str
+    ) -> AccessChange:
+        """Проверка конфликтов и выдача / отзыв одним запросом."""
+        return self._call(_apply(user_id, group_id, action))
 
     def close(self):
         self._client.close()
+
+
+class AsyncRegistryClient:
+    """Асинхронный клиент для запросов в Registry (internal API only), те же endpoint'ы."""
+
+    def __init__(
+        self,
+        url,
+        connect_timeout_s: float = DEFAULT_CONNECT_TIMEOUT_S,
+        read_timeout_s: float = DEFAULT_READ_TIMEOUT_S,
+        breaker: CircuitBreaker | None = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ):
+        self.url = url
+        self.breaker = breaker or CircuitBreaker("registry")
+        self._bulkhead = AsyncBulkhead(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=self.url,
+            timeout=_timeout(connect_timeout_s, read_timeout_s),
+        )
+
+    async def _request(
+        self, endpoint: str, method: str, path: str, **kwargs
+    ) -> httpx.Response:
+        async with self._bulkhead.slot(endpoint):
+            with self.breaker.attempt():
+                try:
+                    resp = await self._client.request(method, path, **kwargs)
+                except httpx.TransportError:
+                    self.breaker.record_failure()
+                    raise
+                _record_outcome(self.breaker, resp)
+        return resp
+
+    async def _call(self, call: _Call) -> Any:
+        return call.parse(
+            await self._request(call.endpoint, call.method, call.path, **call.kwargs)
+        )
+
+    async def get_user_permission_groups(self, user_id: uuid.UUID) -> list[dict]:
+        return await self._call(_user_permission_groups(user_id))
+
+    async def check_conflicts(
+        self,
+        user_current_groups: list[str],
+        new_group_id: uuid.UUID,
+    ) -> tuple[bool, str | None]:
+        return await self._call(_check_conflicts(user_current_groups, new_group_id))
+
+    async def get_conflict_matrix(self, version: str | None = None) -> dict | None:
+        return await self._call(_conflict_matrix(version))
+
+    async def get_user_permissions_snapshot(
+        self, after: dict | None = None, limit: int = 5000
+    ) -> dict:
+        return await self._call(_permissions_snapshot(after, limit))
+
+    async def grant_permission_group(
+        self, user_id: uuid.UUID, group_id: uuid.UUID
+    ) -> None:
+        await self._call(_grant(user_id, group_id))
+
+    async def revoke_permission_group(
+        self, user_id: uuid.UUID, group_id: uuid.UUID
+    ) -> None:
+        await self._call(_revoke(user_id, group_id))
+
+    async def apply_access_change(
+        self, user_id: uuid.UUID, group_id: uuid.UUID, action: str
+    ) -> AccessChange:
+        return await self._call(_apply(user_id, group_id, action))
+
+    async def close(self):
+        await self._client.aclose()
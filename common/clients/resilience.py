@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from enum import Enum
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Запрос не отправлен: circuit breaker разомкнут."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit breaker {name} разомкнут, повтор через {retry_after:.1f} с")
+        self.retry_after = retry_after
+
+
+class BulkheadFullError(Exception):
+    """Запрос не отправлен: исчерпан лимит одновременных запросов к endpoint'у."""
+
+
+class CircuitState(str, Enum):
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для вызовов внешнего сервиса.
+
+    CLOSED -> OPEN после failure_threshold ошибок подряд. Через recovery_timeout_s
+    переходит в HALF_OPEN и пропускает до half_open_max_calls пробных вызовов:
+    успех замыкает цепь, ошибка снова размыкает. Пробный вызов, завершившийся
+    без результата (отмена, ошибка до отправки запроса), освобождает свой
+    слот - см. attempt(). Потокобезопасен.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout_s: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout_s = recovery_timeout_s
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        # Номер текущего периода HALF_OPEN: освобождение слота пробного
+        # вызова из прошлого периода ни на что не влияет
+        self._half_open_epoch = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> CircuitState:
+        if (
+            self._state is CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= self.recovery_timeout_s
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._half_open_calls = 0
+            self._half_open_epoch += 1
+        return self._state
+
+    def retry_after(self) -> float:
+        """Секунд до перехода в HALF_OPEN (0, если цепь не разомкнута)."""
+        with self._lock:
+            if self._current_state() is not CircuitState.OPEN:
+                return 0.0
+            return max(0.0, self.recovery_timeout_s - (time.monotonic() - self._opened_at))
+
+    def before_call(self) -> int | None:
+        """
+        Проверяет, можно ли выполнить вызов; иначе CircuitOpenError.
+
+        Для пробного вызова в HALF_OPEN возвращает номер периода - его нужно
+        передать в release_probe(), если результат вызова не будет записан.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state is CircuitState.CLOSED:
+                return None
+            if (
+                state is CircuitState.HALF_OPEN
+                and self._half_open_calls < self.half_open_max_calls
+            ):
+                self._half_open_calls += 1
+                return self._half_open_epoch
+            retry_after = max(
+                0.0, self.recovery_timeout_s - (time.monotonic() - self._opened_at)
+            )
+        raise CircuitOpenError(self.name, retry_after)
+
+    def release_probe(self, probe: int | None) -> None:
+        """
+        Освобождает слот пробного вызова, если цепь все еще в том же периоде
+        HALF_OPEN (результат вызова не записан).
+        """
+        if probe is None:
+            return
+        with self._lock:
+            if (
+                self._state is CircuitState.HALF_OPEN
+                and self._half_open_epoch == probe
+                and self._half_open_calls > 0
+            ):
+                self._half_open_calls -= 1
+
+    @contextmanager
+    def attempt(self):
+        """
+        before_call() для блока с вызовом: если блок завершился, не записав
+        результат (отмена, BulkheadFullError, любая другая ошибка), слот
+        пробного вызова освобождается и цепь не остается в HALF_OPEN навсегда.
+        """
+        probe = self.before_call()
+        try:
+            yield
+        finally:
+            self.release_probe(probe)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state is not CircuitState.CLOSED:
+                logger.info(f"Circuit breaker {self.name}: цепь замкнута")
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state is CircuitState.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                if self._state is not CircuitState.OPEN:
+                    logger.warning(
+                        f"Circuit breaker {self.name}: цепь разомкнута на {self.recovery_timeout_s} с"
+                    )
+                self._state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+
+
+class Bulkhead:
+    """Ограничение числа одновременных запросов отдельно для каждого endpoint'а."""
+
+    def __init__(self, max_concurrency: int, acquire_timeout_s: float = 1.0):
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout_s = acquire_timeout_s
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, endpoint: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            return self._semaphores.setdefault(
+                endpoint, threading.BoundedSemaphore(self.max_concurrency)
+            )
+
+    @contextmanager
+    def slot(self, endpoint: str):
+        semaphore = self._semaphore(endpoint)
+        if not semaphore.acquire(timeout=self.acquire_timeout_s):
+            raise BulkheadFullError(f"Лимит одновременных запросов к {endpoint} исчерпан")
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+class AsyncBulkhead:
+    """Bulkhead для asyncio-клиентов."""
+
+    def __init__(self, max_concurrency: int, acquire_timeout_s: float = 1.0):
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout_s = acquire_timeout_s
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def slot(self, endpoint: str):
+        semaphore = self._semaphores.setdefault(
+            endpoint, asyncio.Semaphore(self.max_concurrency)
+        )
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.acquire_timeout_s)
+        except asyncio.TimeoutError:
+            raise BulkheadFullError(f"Лимит одновременных запросов к {endpoint} исчерпан")
+        try:
+            yield
+        finally:
+            semaphore.release()
@@ -0,0 +1,6 @@
+from datetime import datetime, timezone
+
+
+def utcnow() -> datetime:
+    """Текущее время UTC без tzinfo: колонки DateTime хранят наивное UTC."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
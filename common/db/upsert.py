@@ -0,0 +1,10 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_insert(dialect_name: str):
+    """insert() с ON CONFLICT для диалекта БД (Postgres в проде, SQLite локально)."""
+    if dialect_name == "postgresql":
+        return postgresql.insert
+    if dialect_name == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"ON CONFLICT не поддерживается для {dialect_name}")
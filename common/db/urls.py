@@ -0,0 +1,14 @@
+# Синхронный драйвер -> асинхронный драйвер той же БД
+_ASYNC_DRIVERS = (
+    ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+    ("postgresql://", "postgresql+asyncpg://"),
+    ("sqlite://", "sqlite+aiosqlite://"),
+)
+
+
+def async_database_url(url: str) -> str:
+    """URL БД с асинхронным драйвером (asyncpg / aiosqlite)."""
+    for prefix, async_prefix in _ASYNC_DRIVERS:
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
@@ -0,0 +1,193 @@
+import hashlib
+import uuid
+from typing import Iterable
+
+
+# Direct exchange, через который заявки раскладываются по шардам
+ACCESS_REQUEST_EXCHANGE = "access_requests"
+
+# Базовое имя очереди заявок, шарды: access_request_created.0 .. .N-1
+ACCESS_REQUEST_QUEUE = "access_request_created"
+
+# Единая очередь заявок до шардирования (то же имя без номера шарда). При
+# обновлении оставшиеся в ней сообщения переносятся в шарды:
+# python -m worker.app.workers.redrive --from-legacy-queue
+LEGACY_ACCESS_REQUEST_QUEUE = ACCESS_REQUEST_QUEUE
+
+# Отложенные повторы: headers exchange раскладывает сообщения по очередям
+# с разным TTL (по заголовку x-retry-delay); по истечении TTL сообщение
+# возвращается через dead-letter в ACCESS_REQUEST_EXCHANGE с исходным ключом шарда
+ACCESS_REQUEST_RETRY_EXCHANGE = "access_requests.retry"
+RETRY_COUNT_HEADER = "x-retry-count"
+RETRY_DELAY_HEADER = "x-retry-delay"
+
+# Время публикации сообщения (unix time, мс) - для метрики ожидания в очереди
+PUBLISHED_AT_HEADER = "x-published-at"
+
+# Сообщения, исчерпавшие попытки (или некорректные), паркуются здесь
+ACCESS_REQUEST_DEAD_EXCHANGE = "access_requests.dead"
+ACCESS_REQUEST_DEAD_QUEUE = f"{ACCESS_REQUEST_QUEUE}.dead"
+# Сообщение возвращено из DLQ (redrive): счетчик повторов сброшен, а заявка
+# могла остаться в PROCESSING после исчерпанных попыток
+REDRIVEN_HEADER = "x-redriven"
+
+# Канал Postgres LISTEN/NOTIFY: worker сообщает user_id, чьи права изменились
+# (заявка одобрена), ARS сбрасывает кеш прав этого пользователя
+PERMISSIONS_CHANGED_CHANNEL = "ars_user_permissions_changed"
+
+# Канал LISTEN/NOTIFY смены статусов заявок: payload "STATUS|id,id,...";
+# ARS будит long-poll и SSE-подписчиков вместо опроса БД
+ACCESS_REQUEST_STATUS_CHANNEL = "ars_access_request_status"
+
+# Single active consumer: у каждого шарда одновременно один активный потребитель,
+# остальные подписчики - горячий резерв. Так заявки одного пользователя
+# обрабатываются строго по очереди. Отклоненные (nack без requeue) сообщения
+# уходят в очередь мертвых сообщений.
+SHARD_QUEUE_ARGUMENTS = {
+    "x-single-active-consumer": True,
+    "x-dead-letter-exchange": ACCESS_REQUEST_DEAD_EXCHANGE,
+}
+
+
+def shard_for_user(user_id: uuid.UUID | str, shards: int) -> int:
+    """Номер шарда пользователя. Стабилен между процессами и перезапусками."""
+    digest = hashlib.sha1(str(user_id).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shards
+
+
+def shard_queue_name(shard: int) -> str:
+    return f"{ACCESS_REQUEST_QUEUE}.{shard}"
+
+
+def retry_queue_name(delay_ms: int) -> str:
+    return f"{ACCESS_REQUEST_QUEUE}.retry.{delay_ms}ms"
+
+
+def retry_count(headers: dict | None) -> int:
+    """Сколько раз сообщение уже откладывалось на повтор."""
+    return int((headers or {}).get(RETRY_COUNT_HEADER, 0))
+
+
+def is_redelivery(redelivered: bool, headers: dict | None) -> bool:
+    """Сообщение уже обрабатывалось: повторная доставка, отложенный повтор или redrive."""
+    return bool(
+        redelivered
+        or retry_count(headers) > 0
+        or (headers or {}).get(REDRIVEN_HEADER)
+    )
+
+
+def _retry_queue_arguments(delay_ms: int) -> dict:
+    # Без x-dead-letter-routing-key сообщение сохраняет исходный ключ шарда
+    return {
+        "x-message-ttl": delay_ms,
+        "x-dead-letter-exchange": ACCESS_REQUEST_EXCHANGE,
+    }
+
+
+def _retry_binding_arguments(delay_ms: int) -> dict:
+    return {"x-match": "all", RETRY_DELAY_HEADER: str(delay_ms)}
+
+
+def declare_topology(channel, shards: int, retry_delays: Iterable[int] = ()) -> list[str]:
+    """
+    Объявляет топологию заявок на канале pika: очередь мертвых сообщений,
+    очереди отложенных повторов (для задержек retry_delays, мс), exchange
+    заявок и shards очередей шардов.
+
+    Общая для ARS (публикует, повторы не объявляет) и worker'а. Возвращает
+    имена очередей всех шардов.
+    """
+    channel.exchange_declare(
+        exchange=ACCESS_REQUEST_DEAD_EXCHANGE,
+        exchange_type="fanout",
+        durable=True,
+    )
+    channel.queue_declare(queue=ACCESS_REQUEST_DEAD_QUEUE, durable=True)
+    channel.queue_bind(
+        queue=ACCESS_REQUEST_DEAD_QUEUE,
+        exchange=ACCESS_REQUEST_DEAD_EXCHANGE,
+    )
+
+    channel.exchange_declare(
+        exchange=ACCESS_REQUEST_RETRY_EXCHANGE,
+        exchange_type="headers",
+        durable=True,
+    )
+    for delay_ms in retry_delays:
+        queue = retry_queue_name(delay_ms)
+        channel.queue_declare(
+            queue=queue,
+            durable=True,
+            arguments=_retry_queue_arguments(delay_ms),
+        )
+        channel.queue_bind(
+            queue=queue,
+            exchange=ACCESS_REQUEST_RETRY_EXCHANGE,
+            arguments=_retry_binding_arguments(delay_ms),
+        )
+
+    channel.exchange_declare(
+        exchange=ACCESS_REQUEST_EXCHANGE,
+        exchange_type="direct",
+        durable=True,
+    )
+    queues = []
+    for shard in range(shards):
+        queue = shard_queue_name(shard)
+        channel.queue_declare(
+            queue=queue,
+            durable=True,
+            arguments=SHARD_QUEUE_ARGUMENTS,
+        )
+        channel.queue_bind(
+            queue=queue,
+            exchange=ACCESS_REQUEST_EXCHANGE,
+            routing_key=queue,
+        )
+        queues.append(queue)
+    return queues
+
+
+async def declare_topology_async(channel, shards: int, retry_delays: Iterable[int] = ()) -> list:
+    """То же, что declare_topology, для канала aio-pika. Возвращает очереди всех шардов."""
+    dead_exchange = await channel.declare_exchange(
+        ACCESS_REQUEST_DEAD_EXCHANGE,
+        type="fanout",
+        durable=True,
+    )
+    dead_queue = await channel.declare_queue(ACCESS_REQUEST_DEAD_QUEUE, durable=True)
+    await dead_queue.bind(dead_exchange)
+
+    retry_exchange = await channel.declare_exchange(
+        ACCESS_REQUEST_RETRY_EXCHANGE,
+        type="headers",
+        durable=True,
+    )
+    for delay_ms in retry_delays:
+        retry_queue = await channel.declare_queue(
+            retry_queue_name(delay_ms),
+            durable=True,
+            arguments=_retry_queue_arguments(delay_ms),
+        )
+        await retry_queue.bind(
+            retry_exchange,
+            arguments=_retry_binding_arguments(delay_ms),
+        )
+
+    exchange = await channel.declare_exchange(
+        ACCESS_REQUEST_EXCHANGE,
+        type="direct",
+        durable=True,
+    )
+    queues = []
+    for shard in range(shards):
+        name = shard_queue_name(shard)
+        queue = await channel.declare_queue(
+            name,
+            durable=True,
+            arguments=SHARD_QUEUE_ARGUMENTS,
+        )
+        await queue.bind(exchange, routing_key=name)
+        queues.append(queue)
+    return queues
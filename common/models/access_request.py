@@ -1,7 +1,7 @@
 import uuid
-from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Enum, String
+from sqlalchemy import Column, DateTime, Enum, Index, String
+from common.clock import utcnow
 from common.db.base import Base
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -18,21 +18,29 @@ class AccessRequest(Base):
     __tablename__ = "access_requests"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
     permission_group_id = Column(UUID(as_uuid=True), nullable=False)
     action = Column(Enum(AccessAction), nullable=False)
     status = Column(
         Enum(AccessRequestStatus),
         nullable=False,
         default=AccessRequestStatus.PENDING,
-        index=True,
     )
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
     updated_at = Column(
         DateTime,
-        default=datetime.utcnow,
-        onupdate=datetime.utcnow,
+        default=utcnow,
+        onupdate=utcnow,
         nullable=False,
     )
     # Опционально: причина отклонения
     rejection_reason = Column(String, nullable=True)
+
+    __table_args__ = (
+        # История заявок пользователя: фильтр по user_id и keyset-пагинация
+        # по (created_at, id); заменяет одиночный индекс по user_id
+        Index("ix_access_requests_user_created_id", "user_id", "created_at", "id"),
+        # Глубина очереди для admission control: число PENDING-заявок и самая
+        # старая из них; заменяет одиночный индекс по status
+        Index("ix_access_requests_status_created", "status", "created_at"),
+    )
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, DateTime, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from common.clock import utcnow
+from common.db.base import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Idempotency-Key запроса на создание заявки.
+
+    Пишется в одной транзакции с заявкой; первичный ключ не дает
+    параллельным дублям создать вторую заявку. Ключи у каждого
+    вызывающего свои: одинаковые ключи разных клиентов не пересекаются.
+    Ключи старше окна хранения удаляются.
+    """
+    __tablename__ = "access_request_idempotency_keys"
+
+    # Вызывающий (X-Caller-Id или адрес клиента)
+    caller = Column(String, primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_id = Column(UUID(as_uuid=True), nullable=False)
+    # sha256 тела запроса: повтор ключа с другим телом - ошибка клиента
+    request_hash = Column(String(64), nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False, index=True)
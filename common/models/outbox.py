@@ -0,0 +1,26 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, Text
+from sqlalchemy.dialects.postgresql import UUID
+
+from common.clock import utcnow
+from common.db.base import Base
+
+
+class OutboxMessage(Base):
+    """
+    Сообщение, ожидающее публикации в RabbitMQ (transactional outbox).
+
+    Пишется в одной транзакции с заявкой; relay публикует сообщения
+    по возрастанию id и удаляет их после подтверждения брокером.
+    """
+    __tablename__ = "access_request_outbox"
+
+    id = Column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    request_id = Column(UUID(as_uuid=True), nullable=False)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    # Тело сообщения (JSON)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
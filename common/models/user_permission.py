@@ -0,0 +1,35 @@
+from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from common.clock import utcnow
+from common.db.base import Base
+
+
+class UserPermission(Base):
+    """
+    Проекция выданных прав пользователей (копия Registry для чтения в ARS).
+
+    Worker обновляет строку в одной транзакции с переводом заявки в APPROVED;
+    отозванное право остается строкой с active=False, чтобы сверка со
+    снимком Registry, начатая до отзыва, не вернула его обратно.
+    """
+    __tablename__ = "user_permissions"
+
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    group_id = Column(UUID(as_uuid=True), primary_key=True)
+    # Имя группы: из ответа Registry на .../apply или со снимком Registry
+    group_name = Column(String, nullable=True)
+    active = Column(Boolean, nullable=False, default=True)
+    updated_at = Column(DateTime, default=utcnow, nullable=False)
+
+
+class PermissionsProjectionState(Base):
+    """Состояние проекции прав: единственная строка с id=1."""
+    __tablename__ = "user_permissions_projection_state"
+
+    id = Column(Integer, primary_key=True)
+    # Начало последней завершенной сверки со снимком Registry (UTC);
+    # None - проекция еще не заполнена
+    reconciled_at = Column(DateTime, nullable=True)
+    # Аренда сверки: пока не истекла, другие экземпляры ARS ее не запускают
+    lease_until = Column(DateTime, nullable=True)
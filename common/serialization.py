@@ -0,0 +1,24 @@
+"""
+Быстрая сериализация ответов API (orjson).
+
+Обычный путь FastAPI для response_model: валидация результата pydantic-
+схемой, выгрузка в JSON-совместимые объекты и json.dumps. Для строк из
+своей БД валидация лишняя: endpoint'ы с включенным FAST_JSON собирают
+словари из строк и отдают FastJSONResponse - orjson пишет UUID, datetime
+и Enum напрямую в байты. Формат совпадает с выдачей pydantic.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
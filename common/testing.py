@@ -0,0 +1,80 @@
+"""
+Заглушки брокера и Registry для тестов и офлайн-бенчмарка (scripts/benchmark_pipeline.py).
+
+Сервисы работают in-process: outbox relay ARS публикует в очередь в памяти,
+worker получает сообщения вызовом колбэка со StubMethod / StubProperties и
+подтверждает их в StubChannel, Registry вызывается через ASGI-транспорт httpx.
+"""
+import queue
+import time
+
+import httpx
+
+from common.clients.registry_client import AsyncRegistryClient
+from common.messaging import PUBLISHED_AT_HEADER
+
+
+class InMemoryPublisher:
+    """Замена RabbitMQPublisher для outbox relay: сообщения складываются в одну FIFO-очередь."""
+
+    def __init__(self):
+        self.messages: queue.Queue = queue.Queue()
+
+    def publish_outbox_messages(self, messages: list) -> None:
+        for message in messages:
+            headers = {PUBLISHED_AT_HEADER: int(time.time() * 1000)}
+            self.messages.put((time.perf_counter(), headers, message.payload.encode("utf-8")))
+
+    def close(self):
+        pass
+
+
+class StubMethod:
+    """Basic.Deliver доставленного сообщения."""
+
+    def __init__(self, delivery_tag: int):
+        self.delivery_tag = delivery_tag
+        self.routing_key = "in-memory"
+        self.redelivered = False
+
+
+class StubProperties:
+    def __init__(self, headers: dict):
+        self.headers = headers
+
+
+class StubChannel:
+    """Канал-заглушка: считает подтверждения вместо отправки в брокер."""
+
+    def __init__(self):
+        self.acked = 0
+        self.nacked = 0
+        self.retried = 0
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acked += 1
+
+    def basic_nack(self, delivery_tag, requeue=True):
+        self.nacked += 1
+
+    def basic_publish(self, **kwargs):
+        self.retried += 1
+
+
+class StubConnection:
+    """Соединение-заглушка: таймеры пакетного режима не нужны, пакет сбрасывается вручную."""
+
+    def call_later(self, delay, callback):
+        return None
+
+    def remove_timeout(self, timer):
+        pass
+
+
+def in_process_registry_client(registry_app) -> AsyncRegistryClient:
+    """Клиент ARS к Registry: запросы идут в ASGI-приложение Registry in-process, без сети."""
+    client = AsyncRegistryClient("http://registry")
+    client._client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=registry_app), base_url="http://registry"
+    )
+    return client
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 
 from registry.app.api.deps import get_db
 from registry.app import models, schemas
+from registry.app.services.conflicts import record_conflict_changes
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -27,19 +28,19 @@ def create_permission_group(
     db.add(group)
     db.flush()
 
+    pairs = []
     for conflict_id in payload.conflicts_with:
+        pairs += [(group.id, conflict_id), (conflict_id, group.id)]
+    for group_id, conflicts_with_id in pairs:
         db.add(
             models.PermissionGroupConflict(
-                group_id=group.id,
-                conflicts_with_id=conflict_id,
-            )
-        )
-        db.add(
-            models.PermissionGroupConflict(
-                group_id=conflict_id,
-                conflicts_with_id=group.id,
+                group_id=group_id,
+                conflicts_with_id=conflicts_with_id,
             )
         )
+    if pairs:
+        # Новая версия матрицы: worker'ы получат только эти пары
+        record_conflict_changes(db, pairs)
 
     db.commit()
     db.refresh(group)
@@ -1,11 +1,16 @@
 import uuid
 from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session
 
 from registry.app.api.deps import get_db
 from registry.app import models, schemas
+from registry.app.core.config import settings
+from registry.app.services.conflicts import current_conflict_version
+from common.enums import AccessAction
+from common.serialization import FastJSONResponse
 
 router = APIRouter(prefix="/internal", tags=["internal"])
 
@@ -18,21 +23,77 @@ def get_user_permission_groups(
     user_id: uuid.UUID,
     db: Session = Depends(get_db),
 ):
-    rows = (
-        db.query(models.UserPermissionGroup)
-        .filter(
+    # Одним запросом с JOIN, без ленивой загрузки группы на каждую строку
+    rows = db.execute(
+        select(models.PermissionGroup.id, models.PermissionGroup.name)
+        .join(
+            models.UserPermissionGroup,
+            models.UserPermissionGroup.group_id == models.PermissionGroup.id,
+        )
+        .where(
             models.UserPermissionGroup.user_id == user_id,
             models.UserPermissionGroup.active.is_(True),
         )
-        .all()
-    )
+    ).all()
+    if settings.fast_json:
+        return FastJSONResponse(
+            [{"id": group_id, "name": name, "description": None} for group_id, name in rows]
+        )
     return [
-        schemas.PermissionGroupResponse(
-            id=row.group.id,
-            name=row.group.name,
+        schemas.PermissionGroupResponse(id=group_id, name=name)
+        for group_id, name in rows
+    ]
+
+
+@router.get(
+    "/user-permission-groups/snapshot",
+    response_model=schemas.UserPermissionSnapshotPage,
+)
+def get_user_permissions_snapshot(
+    after_user_id: uuid.UUID | None = None,
+    after_group_id: uuid.UUID | None = None,
+    limit: int = Query(5000, ge=1, le=settings.snapshot_max_page_size),
+    db: Session = Depends(get_db),
+):
+    """
+    Снимок всех выданных прав постранично - для проекции прав в ARS.
+
+    Keyset-пагинация по (user_id, group_id) по индексу uq_user_permission_group;
+    следующая страница - after_user_id / after_group_id из next_after.
+    """
+    query = (
+        select(
+            models.UserPermissionGroup.user_id,
+            models.UserPermissionGroup.group_id,
+            models.PermissionGroup.name,
+        )
+        .join(
+            models.PermissionGroup,
+            models.PermissionGroup.id == models.UserPermissionGroup.group_id,
         )
-        for row in rows
+        .where(models.UserPermissionGroup.active.is_(True))
+    )
+    if after_user_id is not None and after_group_id is not None:
+        query = query.where(
+            tuple_(models.UserPermissionGroup.user_id, models.UserPermissionGroup.group_id)
+            > (after_user_id, after_group_id)
+        )
+    rows = db.execute(
+        query.order_by(
+            models.UserPermissionGroup.user_id, models.UserPermissionGroup.group_id
+        ).limit(limit)
+    ).all()
+
+    next_after = None
+    if len(rows) == limit:
+        next_after = {"user_id": rows[-1].user_id, "group_id": rows[-1].group_id}
+    items = [
+        {"user_id": user_id, "group_id": group_id, "group_name": name}
+        for user_id, group_id, name in rows
     ]
+    if settings.fast_json:
+        return FastJSONResponse({"items": items, "next_after": next_after})
+    return schemas.UserPermissionSnapshotPage(items=items, next_after=next_after)
 
 
 @router.post(
@@ -64,12 +125,108 @@ def check_conflicts(
     return schemas.ConflictCheckResponse(has_conflict=False)
 
 
+@router.get(
+    "/permission-groups/conflicts",
+    response_model=schemas.ConflictMatrixResponse,
+)
+def get_conflict_matrix(
+    request: Request,
+    response: Response,
+    since: str | None = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Матрица конфликтов для кеширования на стороне worker'ов.
+
+    version (он же ETag) - номер, который увеличивает каждое изменение матрицы.
+    При совпадении If-None-Match возвращается 304 без тела, по одной строке
+    версии, не читая матрицу. since - версия кеша клиента: в ответе только
+    изменения после нее (changes); неизвестная версия - вся матрица.
+    """
+    current = current_conflict_version(db)
+    version = str(current)
+    etag = f'"{version}"'
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    since_version = _parse_version(since)
+    if since_version is not None and since_version <= current:
+        rows = db.execute(
+            select(
+                models.PermissionGroupConflictChange.group_id,
+                models.PermissionGroupConflictChange.conflicts_with_id,
+                models.PermissionGroupConflictChange.removed,
+            )
+            .where(models.PermissionGroupConflictChange.version > since_version)
+            .order_by(models.PermissionGroupConflictChange.id)
+        ).all()
+        changes = [
+            {"group_id": group_id, "conflicts_with_id": conflicts_with_id, "removed": removed}
+            for group_id, conflicts_with_id, removed in rows
+        ]
+        if settings.fast_json:
+            return FastJSONResponse(
+                {"version": version, "conflicts": [], "changes": changes},
+                headers={"ETag": etag},
+            )
+        return schemas.ConflictMatrixResponse(
+            version=version,
+            changes=[schemas.ConflictChange(**change) for change in changes],
+        )
+
+    rows = (
+        db.query(
+            models.PermissionGroupConflict.group_id,
+            models.PermissionGroupConflict.conflicts_with_id,
+        )
+        .order_by(
+            models.PermissionGroupConflict.group_id,
+            models.PermissionGroupConflict.conflicts_with_id,
+        )
+        .all()
+    )
+    if settings.fast_json:
+        return FastJSONResponse(
+            {
+                "version": version,
+                "conflicts": [
+                    {"group_id": group_id, "conflicts_with_id": conflicts_with_id}
+                    for group_id, conflicts_with_id in rows
+                ],
+                "changes": None,
+            },
+            headers={"ETag": etag},
+        )
+    return schemas.ConflictMatrixResponse(
+        version=version,
+        conflicts=[
+            schemas.ConflictPair(group_id=group_id, conflicts_with_id=conflicts_with_id)
+            for group_id, conflicts_with_id in rows
+        ],
+    )
+
+
+def _parse_version(version: str | None) -> int | None:
+    """Версия матрицы из since; None - не задана или в старом формате (хеш матрицы)."""
+    if version is None:
+        return None
+    try:
+        return int(version)
+    except ValueError:
+        return None
+
+
 @router.post("/users/{user_id}/permission-groups/{group_id}/grant")
 def grant_group(
     user_id: uuid.UUID,
     group_id: uuid.UUID,
     db: Session = Depends(get_db),
 ):
+    if db.get(models.PermissionGroup, group_id) is None:
+        raise HTTPException(status_code=404, detail="Группа прав не найдена")
+
     row = (
         db.query(models.UserPermissionGroup)
         .filter_by(user_id=user_id, group_id=group_id)
@@ -107,3 +264,91 @@ def revoke_group(
         db.commit()
 
     return {"success": True}
+
+
+def _lock_user(db: Session, user_id: uuid.UUID) -> None:
+    """
+    Блокирует изменения прав пользователя до конца транзакции.
+
+    Advisory-lock берется и для пользователя без строк в user_permission_groups,
+    которые еще нечем заблокировать через SELECT ... FOR UPDATE.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(func.hashtextextended(str(user_id), 0))))
+
+
+@router.post(
+    "/users/{user_id}/permission-groups/{group_id}/apply",
+    response_model=schemas.AccessChangeResponse,
+)
+def apply_access_change(
+    user_id: uuid.UUID,
+    group_id: uuid.UUID,
+    payload: schemas.AccessChangeRequest,
+    db: Session = Depends(get_db),
+):
+    """
+    Проверяет конфликты и выдает / отзывает группу в одной транзакции.
+
+    Заменяет последовательность get permission-groups -> check-conflicts -> grant
+    и закрывает окно между проверкой и выдачей: параллельные изменения прав
+    того же пользователя ждут завершения транзакции.
+    """
+    _lock_user(db, user_id)
+
+    rows = (
+        db.query(models.UserPermissionGroup)
+        .filter(models.UserPermissionGroup.user_id == user_id)
+        .with_for_update()
+        .all()
+    )
+    row = next((r for r in rows if r.group_id == group_id), None)
+
+    if payload.action is AccessAction.REVOKE:
+        if row:
+            row.active = False
+        db.commit()
+        return schemas.AccessChangeResponse(applied=True)
+
+    active_group_ids = [r.group_id for r in rows if r.active]
+    conflict = None
+    if active_group_ids:
+        conflict = (
+            db.query(models.PermissionGroupConflict)
+            .filter(
+                models.PermissionGroupConflict.group_id.in_(active_group_ids),
+                models.PermissionGroupConflict.conflicts_with_id == group_id,
+            )
+            .first()
+        )
+
+    if conflict:
+        db.rollback()
+        return schemas.AccessChangeResponse(
+            applied=False,
+            reason="Permission group conflict",
+        )
+
+    # Несуществующая группа - ошибка заявки, а не сбой Registry: без проверки
+    # вставка упала бы на внешнем ключе с 500, и worker повторял бы ее до DLQ
+    group = db.get(models.PermissionGroup, group_id)
+    if group is None:
+        db.rollback()
+        return schemas.AccessChangeResponse(
+            applied=False,
+            reason="Permission group not found",
+        )
+    group_name = group.name
+
+    if row:
+        row.active = True
+    else:
+        db.add(
+            models.UserPermissionGroup(
+                user_id=user_id,
+                group_id=group_id,
+            )
+        )
+
+    db.commit()
+    return schemas.AccessChangeResponse(applied=True, group_name=group_name)
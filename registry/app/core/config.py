@@ -5,6 +5,12 @@ class Settings(BaseSettings):
     database_url: str
     app_name: str = "Registry Service"
 
+    # Ответы списков без валидации response_model: строки БД -> orjson
+    fast_json: bool = False
+
+    # Максимальная страница снимка выданных прав (/internal/user-permission-groups/snapshot)
+    snapshot_max_page_size: int = 10000
+
     class Config:
         env_file = ".env"
 
@@ -1,14 +1,17 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
-from registry.app.core.db import engine
+from registry.app.core.db import SessionLocal, engine
 from registry.app.models import Base
 from registry.app.api import admin, internal
+from registry.app.services.conflicts import ensure_conflict_state
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        ensure_conflict_state(db)
     yield
 
 
@@ -1,10 +1,10 @@
 import uuid
-from datetime import datetime
 
 from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Integer,
     String,
     UniqueConstraint,
     Boolean,
@@ -12,6 +12,8 @@ from sqlalchemy import (
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import declarative_base, relationship
 
+from common.clock import utcnow
+
 
 Base = declarative_base()
 
@@ -22,7 +24,7 @@ class PermissionGroup(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, unique=True, nullable=False)
     description = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
 
     conflicts = relationship(
         "PermissionGroupConflict",
@@ -77,6 +79,33 @@ class PermissionGroupConflict(Base):
     )
 
 
+class ConflictMatrixState(Base):
+    """
+    Версия матрицы конфликтов: единственная строка с id=1.
+
+    Каждое изменение матрицы увеличивает version в своей транзакции; блокировка
+    строки выстраивает изменения по очереди, поэтому в журнале нет версий,
+    которые закоммитятся позже более новых.
+    """
+    __tablename__ = "conflict_matrix_state"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class PermissionGroupConflictChange(Base):
+    """Журнал изменений матрицы конфликтов: по нему worker'ы получают дельту с их версии."""
+    __tablename__ = "permission_group_conflict_changes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    version = Column(Integer, nullable=False, index=True)
+    group_id = Column(UUID(as_uuid=True), nullable=False)
+    conflicts_with_id = Column(UUID(as_uuid=True), nullable=False)
+    # False - конфликт добавлен, True - удален
+    removed = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+
+
 class UserPermissionGroup(Base):
     __tablename__ = "user_permission_groups"
 
@@ -90,7 +119,7 @@ class UserPermissionGroup(Base):
         nullable=False,
     )
 
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
     active = Column(Boolean, default=True, nullable=False)
 
     group = relationship("PermissionGroup")
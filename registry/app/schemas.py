@@ -1,6 +1,8 @@
 import uuid
 from pydantic import BaseModel
 
+from common.enums import AccessAction
+
 
 class PermissionGroupCreate(BaseModel):
     id: uuid.UUID | None = None
@@ -28,7 +30,55 @@ class ConflictCheckResponse(BaseModel):
     reason: str | None = None
 
 
+class ConflictPair(BaseModel):
+    group_id: uuid.UUID
+    conflicts_with_id: uuid.UUID
+
+
+class ConflictChange(ConflictPair):
+    # False - конфликт добавлен, True - удален
+    removed: bool = False
+
+
+class ConflictMatrixResponse(BaseModel):
+    """
+    Матрица конфликтов версии version: вся (conflicts) или, если changes не None,
+    только изменения после версии клиента в порядке версий.
+    """
+    version: str
+    conflicts: list[ConflictPair] = []
+    changes: list[ConflictChange] | None = None
+
+
 class PermissionGroupAssignmentResponse(BaseModel):
     success: bool
     user_id: uuid.UUID
     group_id: uuid.UUID
+
+
+class AccessChangeRequest(BaseModel):
+    action: AccessAction
+
+
+class AccessChangeResponse(BaseModel):
+    applied: bool
+    reason: str | None = None
+    # Имя выданной группы: worker записывает его в проекцию прав ARS
+    group_name: str | None = None
+
+
+class UserPermissionSnapshotItem(BaseModel):
+    user_id: uuid.UUID
+    group_id: uuid.UUID
+    group_name: str
+
+
+class SnapshotCursor(BaseModel):
+    user_id: uuid.UUID
+    group_id: uuid.UUID
+
+
+class UserPermissionSnapshotPage(BaseModel):
+    """Страница снимка выданных прав; next_after - курсор следующей (None - последняя)."""
+    items: list[UserPermissionSnapshotItem]
+    next_after: SnapshotCursor | None = None
@@ -0,0 +1,62 @@
+import uuid
+from typing import Iterable
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from registry.app import models
+
+
+def current_conflict_version(db: Session) -> int:
+    """Текущая версия матрицы конфликтов (0 - изменений еще не было)."""
+    version = db.scalar(
+        select(models.ConflictMatrixState.version).where(models.ConflictMatrixState.id == 1)
+    )
+    return version or 0
+
+
+def ensure_conflict_state(db: Session) -> None:
+    """Создает строку версии матрицы при старте Registry, чтобы изменения ее только обновляли."""
+    if db.get(models.ConflictMatrixState, 1) is not None:
+        return
+    db.add(models.ConflictMatrixState(id=1, version=0))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Строку одновременно создал другой экземпляр Registry
+        db.rollback()
+
+
+def record_conflict_changes(
+    db: Session,
+    pairs: Iterable[tuple[uuid.UUID, uuid.UUID]],
+    removed: bool = False,
+) -> int:
+    """
+    Записывает изменения матрицы в журнал под новой версией и возвращает ее.
+
+    Строка версии остается заблокированной до конца транзакции: параллельные
+    изменения матрицы ждут друг друга.
+    """
+    version = db.scalar(
+        update(models.ConflictMatrixState)
+        .where(models.ConflictMatrixState.id == 1)
+        .values(version=models.ConflictMatrixState.version + 1)
+        .returning(models.ConflictMatrixState.version)
+    )
+    if version is None:
+        # Строку версии не создали при старте (ensure_conflict_state)
+        version = 1
+        db.add(models.ConflictMatrixState(id=1, version=version))
+
+    for group_id, conflicts_with_id in pairs:
+        db.add(
+            models.PermissionGroupConflictChange(
+                version=version,
+                group_id=group_id,
+                conflicts_with_id=conflicts_with_id,
+                removed=removed,
+            )
+        )
+    return version
@@ -0,0 +1,335 @@
+"""
+Офлайн-бенчмарк цепочки ARS -> очередь -> Worker -> Registry.
+
+Docker не нужен: ARS и Registry работают in-process (FastAPI через
+httpx-транспорт TestClient), outbox relay ARS публикует в очередь в памяти, БД -
+SQLite-файл (или Postgres через --database-url). Отчет - p50/p95/p99
+и пропускная способность по стадиям.
+
+    python scripts/benchmark_pipeline.py --users 100000 --groups 2000 --requests 5000
+    python scripts/benchmark_pipeline.py --batch-size 50 --json result.json
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.testing import (  # noqa: E402
+    InMemoryPublisher,
+    StubChannel,
+    StubConnection,
+    StubMethod,
+    StubProperties,
+    in_process_registry_client,
+)
+
+
+# =============================
+# CONFIG
+# =============================
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк обработки заявок")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--groups", type=int, default=2_000)
+    parser.add_argument(
+        "--conflict-density",
+        type=float,
+        default=0.001,
+        help="Доля пар групп, которые конфликтуют",
+    )
+    parser.add_argument(
+        "--grants-per-user", type=int, default=2, help="Уже выданных групп на пользователя"
+    )
+    parser.add_argument("--requests", type=int, default=2_000, help="Число заявок")
+    parser.add_argument(
+        "--revoke-ratio", type=float, default=0.2, help="Доля заявок на отзыв"
+    )
+    parser.add_argument("--batch-size", type=int, default=1, help="BATCH_SIZE воркера")
+    parser.add_argument(
+        "--legacy-registry-calls",
+        action="store_true",
+        help="Цепочка запросов с матрицей конфликтов вместо .../apply",
+    )
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="БД для ARS и Registry (по умолчанию - временный SQLite-файл)",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", default=None, help="Сохранить отчет в JSON-файл")
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Настройки сервисов читаются из окружения при импорте - задаем их заранее."""
+    database_url = args.database_url or (
+        f"sqlite:///{Path(tempfile.mkdtemp(prefix='ars-bench-')) / 'bench.db'}"
+    )
+    os.environ.update(
+        {
+            "DATABASE_URL": database_url,
+            "RABBITMQ_HOST": "in-memory",
+            "RABBITMQ_PORT": "5672",
+            "RABBITMQ_USER": "guest",
+            "RABBITMQ_PASSWORD": "guest",
+            "RABBITMQ_VHOST": "/",
+            "REGISTRY_SERVICE_URL": "http://registry",
+            "METRICS_PORT": "0",
+            "BATCH_SIZE": str(args.batch_size),
+            "USE_APPLY_ENDPOINT": str(not args.legacy_registry_calls).lower(),
+        }
+    )
+
+
+# =============================
+# SEED
+# =============================
+
+def seed(args: argparse.Namespace, rng: random.Random):
+    """Создает группы, конфликты и уже выданные права синтетической популяции."""
+    from sqlalchemy import insert
+
+    from common.db.base import Base as ArsBase
+    from common.models import access_request, idempotency, outbox, user_permission  # noqa: F401 - регистрируют таблицы
+    from registry.app.core.db import engine
+    from registry.app.models import Base as RegistryBase
+    from registry.app.models import (
+        PermissionGroup,
+        PermissionGroupConflict,
+        UserPermissionGroup,
+    )
+
+    ArsBase.metadata.drop_all(engine)
+    RegistryBase.metadata.drop_all(engine)
+    ArsBase.metadata.create_all(engine)
+    RegistryBase.metadata.create_all(engine)
+
+    users = [uuid.uuid4() for _ in range(args.users)]
+    groups = [uuid.uuid4() for _ in range(args.groups)]
+
+    pairs = args.groups * (args.groups - 1) // 2
+    conflict_count = min(pairs, int(pairs * args.conflict_density))
+    conflicts = set()
+    while len(conflicts) < conflict_count:
+        left, right = rng.sample(groups, 2)
+        conflicts.add((left, right))
+
+    started = time.perf_counter()
+    chunk = 10_000
+    with engine.begin() as conn:
+        conn.execute(
+            insert(PermissionGroup),
+            [{"id": group_id, "name": f"group-{i}"} for i, group_id in enumerate(groups)],
+        )
+        if conflicts:
+            conn.execute(
+                insert(PermissionGroupConflict),
+                [
+                    {"id": uuid.uuid4(), "group_id": left, "conflicts_with_id": right}
+                    for left, right in conflicts
+                ],
+            )
+        grants = []
+        for user_id in users:
+            for group_id in rng.sample(groups, min(args.grants_per_user, len(groups))):
+                grants.append({"id": uuid.uuid4(), "user_id": user_id, "group_id": group_id})
+            if len(grants) >= chunk:
+                conn.execute(insert(UserPermissionGroup), grants)
+                grants = []
+        if grants:
+            conn.execute(insert(UserPermissionGroup), grants)
+
+    print(
+        f"[BENCH] Популяция: {len(users)} пользователей, {len(groups)} групп, "
+        f"{len(conflicts)} конфликтов, {len(users) * args.grants_per_user} выданных прав "
+        f"({time.perf_counter() - started:.1f} с)"
+    )
+    return users, groups
+
+
+# =============================
+# PIPELINE
+# =============================
+
+# Интервалы этих стадий перекрываются (заявки ждут одновременно), поэтому
+# count / сумма задержек - не пропускная способность; для них она не считается
+OVERLAPPING_STAGES = {"end_to_end", "queue_wait"}
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_benchmark(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    users, groups = seed(args, rng)
+
+    from fastapi.testclient import TestClient
+
+    from ars.app import main as ars_main
+    from ars.app.core import rabbitmq as ars_rabbitmq
+    from ars.app.main import app as ars_app
+    from registry.app.main import app as registry_app
+    from worker.app.core import metrics
+    from worker.app.core.config import settings as worker_settings
+    from worker.app.workers.access_request_worker import AccessRequestWorker
+
+    # Построчные логи обработки заявок искажают замеры
+    logging.getLogger().setLevel(logging.WARNING)
+
+    samples: dict[str, list[float]] = defaultdict(list)
+    metrics.add_stage_observer(lambda stage, elapsed: samples[f"worker.{stage}"].append(elapsed))
+
+    publisher = InMemoryPublisher()
+    ars_rabbitmq._publisher = publisher
+    # Сверка проекции прав и проверки ARS тоже ходят в Registry in-process
+    ars_main.create_registry_client = lambda: in_process_registry_client(registry_app)
+
+    worker = AccessRequestWorker()
+    worker.channel = StubChannel()
+    worker.connection = StubConnection()
+
+    with TestClient(registry_app, base_url="http://registry") as registry, TestClient(
+        ars_app
+    ) as ars:
+        # Registry отвечает in-process через httpx-транспорт TestClient
+        worker.registry._client.close()
+        worker.registry._client = registry
+
+        def produce():
+            for _ in range(args.requests):
+                action = "REVOKE" if rng.random() < args.revoke_ratio else "GRANT"
+                started = time.perf_counter()
+                resp = ars.post(
+                    "/access-requests",
+                    json={
+                        "user_id": str(rng.choice(users)),
+                        "permission_group_id": str(rng.choice(groups)),
+                        "action": action,
+                    },
+                )
+                samples["ars.create"].append(time.perf_counter() - started)
+                resp.raise_for_status()
+
+        producer = threading.Thread(target=produce, name="producer")
+        started = time.perf_counter()
+        producer.start()
+
+        # Сообщения пакета: время публикации для сквозной задержки
+        pending: list[float] = []
+        delivery_tag = 0
+        consumed = 0
+        while consumed < args.requests:
+            try:
+                published_at, headers, body = publisher.messages.get(timeout=0.05)
+            except queue.Empty:
+                if pending:
+                    worker._flush_batch()
+                    finished = time.perf_counter()
+                    samples["end_to_end"].extend(finished - p for p in pending)
+                    pending = []
+                continue
+
+            consumed += 1
+            delivery_tag += 1
+            samples["queue_wait"].append(time.perf_counter() - published_at)
+            method, properties = StubMethod(delivery_tag), StubProperties(headers)
+
+            if worker_settings.batch_size > 1:
+                pending.append(published_at)
+                worker._on_batch_message_callback(worker.channel, method, properties, body)
+                if not worker._batch:
+                    finished = time.perf_counter()
+                    samples["end_to_end"].extend(finished - p for p in pending)
+                    pending = []
+            else:
+                worker._on_message_callback(worker.channel, method, properties, body)
+                samples["end_to_end"].append(time.perf_counter() - published_at)
+
+        if pending:
+            worker._flush_batch()
+            finished = time.perf_counter()
+            samples["end_to_end"].extend(finished - p for p in pending)
+
+        producer.join()
+        elapsed = time.perf_counter() - started
+
+    return report(args, samples, elapsed, worker.channel)
+
+
+def report(args, samples: dict[str, list[float]], elapsed: float, channel: StubChannel) -> dict:
+    from sqlalchemy import func, select
+
+    from common.models.access_request import AccessRequest
+    from registry.app.core.db import SessionLocal
+
+    with SessionLocal() as db:
+        statuses = dict(
+            db.execute(
+                select(AccessRequest.status, func.count()).group_by(AccessRequest.status)
+            ).all()
+        )
+
+    result = {
+        "config": vars(args),
+        "elapsed_s": elapsed,
+        "throughput_rps": args.requests / elapsed,
+        "statuses": {status.value: count for status, count in statuses.items()},
+        "acks": channel.acked,
+        "dropped": channel.nacked,
+        "retried": channel.retried,
+        "stages": {},
+    }
+
+    print(
+        f"\n[BENCH] {args.requests} заявок за {elapsed:.2f} с: "
+        f"{result['throughput_rps']:.0f} заявок/с, статусы: {result['statuses']}"
+    )
+    print(f"{'stage':<24}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}")
+    for stage in sorted(samples):
+        values = samples[stage]
+        total = sum(values)
+        stats = {
+            "count": len(values),
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "mean_ms": statistics.fmean(values) * 1000,
+            # Пропускная способность стадии при последовательном выполнении;
+            # общая пропускная способность за время прогона - throughput_rps
+            "rps": (
+                None
+                if stage in OVERLAPPING_STAGES
+                else len(values) / total if total else 0.0
+            ),
+        }
+        result["stages"][stage] = stats
+        rps = "-" if stats["rps"] is None else f"{stats['rps']:.0f}"
+        print(
+            f"{stage:<24}{stats['count']:>8}{stats['p50_ms']:>10.2f}"
+            f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{rps:>10}"
+        )
+    return result
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_environment(args)
+    result = run_benchmark(args)
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2, default=str))
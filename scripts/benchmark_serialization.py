@@ -0,0 +1,163 @@
+"""
+Бенчмарк сериализации ответов-списков: response_model против FAST_JSON.
+
+Путь response_model повторяет то, что делает FastAPI: валидация списка
+pydantic-схемой, выгрузка в JSON-совместимые объекты, json.dumps.
+Быстрый путь - словари из строк БД и orjson (common.serialization).
+Сравниваются списки AccessRequestResponse (ARS) и PermissionGroupResponse
+(Registry); заодно проверяется, что оба пути дают одинаковый JSON.
+
+    python scripts/benchmark_serialization.py
+    python scripts/benchmark_serialization.py --sizes 1000 10000 --repeat 50 --json result.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Бенчмарк сериализации ответов")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=30, help="Замеров на каждый путь")
+    parser.add_argument("--json", default=None, help="Сохранить отчет в JSON-файл")
+    return parser.parse_args()
+
+
+def configure_environment() -> None:
+    """Настройки сервисов читаются из окружения при импорте схем."""
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    for name in ("RABBITMQ_HOST", "RABBITMQ_PORT", "RABBITMQ_USER", "RABBITMQ_PASSWORD"):
+        os.environ.setdefault(name, "0" if name == "RABBITMQ_PORT" else "unused")
+    os.environ.setdefault("RABBITMQ_VHOST", "/")
+    os.environ.setdefault("REGISTRY_SERVICE_URL", "http://registry")
+
+
+def response_model_path(schema) -> Callable[[Any], bytes]:
+    """Как FastAPI: validate -> serialize(mode="json") -> JSONResponse.render."""
+    from pydantic import TypeAdapter
+
+    adapter = TypeAdapter(list[schema])
+
+    def render(rows) -> bytes:
+        value = adapter.validate_python(rows, from_attributes=True)
+        content = adapter.dump_python(value, mode="json")
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+
+    return render
+
+
+def make_access_requests(count: int) -> list:
+    from common.enums import AccessAction, AccessRequestStatus
+    from common.models.access_request import AccessRequest
+
+    started = datetime(2026, 1, 1)
+    user_id = uuid.uuid4()
+    return [
+        AccessRequest(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            permission_group_id=uuid.uuid4(),
+            action=AccessAction.GRANT if i % 3 else AccessAction.REVOKE,
+            status=AccessRequestStatus.REJECTED if i % 5 == 0 else AccessRequestStatus.APPROVED,
+            created_at=started + timedelta(seconds=i, microseconds=i * 7),
+            updated_at=started + timedelta(seconds=i + 1),
+            rejection_reason="Permission group conflict" if i % 5 == 0 else None,
+        )
+        for i in range(count)
+    ]
+
+
+def make_permission_groups(count: int) -> list[tuple[uuid.UUID, str]]:
+    return [(uuid.uuid4(), f"group-{i}") for i in range(count)]
+
+
+def measure(render: Callable[[], bytes], repeat: int) -> list[float]:
+    render()  # прогрев
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def run(args: argparse.Namespace) -> dict:
+    from ars.app.schemas.access_request import AccessRequestResponse, access_request_row
+    from common.serialization import dumps
+    from registry.app.schemas import PermissionGroupResponse
+
+    ars_model = response_model_path(AccessRequestResponse)
+    registry_model = response_model_path(PermissionGroupResponse)
+
+    cases = []
+    for size in args.sizes:
+        requests = make_access_requests(size)
+        groups = make_permission_groups(size)
+        group_rows = [{"id": group_id, "name": name} for group_id, name in groups]
+        cases.append(
+            (
+                "ars.access_requests",
+                size,
+                lambda requests=requests: ars_model(requests),
+                lambda requests=requests: dumps([access_request_row(req) for req in requests]),
+            )
+        )
+        cases.append(
+            (
+                "registry.permission_groups",
+                size,
+                lambda group_rows=group_rows: registry_model(group_rows),
+                lambda groups=groups: dumps(
+                    [
+                        {"id": group_id, "name": name, "description": None}
+                        for group_id, name in groups
+                    ]
+                ),
+            )
+        )
+
+    result = {"config": vars(args), "cases": []}
+    print(
+        f"{'case':<28}{'items':>8}{'model ms':>11}{'fast ms':>10}{'speedup':>9}"
+        f"{'KiB':>8}{'same':>6}"
+    )
+    for name, size, model, fast in cases:
+        model_body, fast_body = model(), fast()
+        same = json.loads(model_body) == json.loads(fast_body)
+        model_ms = statistics.median(measure(model, args.repeat)) * 1000
+        fast_ms = statistics.median(measure(fast, args.repeat)) * 1000
+        case = {
+            "case": name,
+            "items": size,
+            "response_model_ms": model_ms,
+            "fast_json_ms": fast_ms,
+            "speedup": model_ms / fast_ms,
+            "body_bytes": len(fast_body),
+            "same_json": same,
+        }
+        result["cases"].append(case)
+        print(
+            f"{name:<28}{size:>8}{model_ms:>11.2f}{fast_ms:>10.2f}{case['speedup']:>8.1f}x"
+            f"{len(fast_body) / 1024:>8.0f}{'yes' if same else 'NO':>6}"
+        )
+    return result
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_environment()
+    result = run(args)
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2))
+    sys.exit(0 if all(case["same_json"] for case in result["cases"]) else 1)
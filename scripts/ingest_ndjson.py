@@ -0,0 +1,119 @@
+"""
+Загрузка заявок из NDJSON-файла через POST /access-requests/stream.
+
+Каждая строка файла - заявка в формате AccessRequestCreate:
+    {"user_id": "...", "permission_group_id": "...", "action": "GRANT"}
+
+    python scripts/ingest_ndjson.py requests.ndjson --ars-url http://localhost:8000
+    python scripts/ingest_ndjson.py requests.ndjson --errors errors.ndjson
+
+Файл читается потоково и отправляется частями по --lines-per-request строк:
+HTTP-клиент читает ответ только после отправки всего тела, а сервер пишет
+результаты по мере сохранения пакетов - до чтения они копятся в буферах.
+Части ограничивают этот объем, память не зависит от размера файла.
+
+Строки, не принятые admission control (в результате есть retry_after),
+тоже попадают в --errors: их можно загрузить повторно позже.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import IO, Iterator, Optional
+
+import httpx
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Потоковая загрузка заявок из NDJSON")
+    parser.add_argument("path", help="NDJSON-файл ('-' - stdin)")
+    parser.add_argument("--ars-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--lines-per-request", type=int, default=5000, help="Строк файла в одном запросе"
+    )
+    parser.add_argument(
+        "--errors", default=None, help="Записать строки с ошибками в NDJSON-файл"
+    )
+    parser.add_argument("--timeout", type=float, default=300.0)
+    return parser.parse_args()
+
+
+def _iter_part(first_line: bytes, source: IO[bytes], limit: int) -> Iterator[bytes]:
+    """Отдает first_line и еще до limit - 1 строк файла, не читая файл целиком."""
+    line = first_line
+    for _ in range(limit):
+        if not line:
+            return
+        # Последняя строка файла может быть без перевода строки
+        yield line if line.endswith(b"\n") else line + b"\n"
+        if _ < limit - 1:
+            line = source.readline()
+
+
+def ingest(
+    source: IO[bytes],
+    ars_url: str,
+    lines_per_request: int,
+    errors_out: Optional[IO[str]],
+    timeout: float,
+) -> tuple[int, int]:
+    created = failed = refused = 0
+    line_offset = 0
+    started = time.perf_counter()
+
+    with httpx.Client(base_url=ars_url, timeout=timeout) as client:
+        while first_line := source.readline():
+            part_lines = 0
+
+            def part():
+                nonlocal part_lines
+                for line in _iter_part(first_line, source, lines_per_request):
+                    part_lines += 1
+                    yield line
+
+            with client.stream(
+                "POST",
+                "/access-requests/stream",
+                content=part(),
+                headers={"Content-Type": "application/x-ndjson"},
+            ) as resp:
+                resp.raise_for_status()
+                for raw in resp.iter_lines():
+                    if not raw:
+                        continue
+                    result = json.loads(raw)
+                    if "id" in result:
+                        created += 1
+                        continue
+                    failed += 1
+                    if "retry_after" in result:
+                        refused += 1
+                    result["line"] += line_offset
+                    if errors_out is not None:
+                        errors_out.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+            line_offset += part_lines
+            elapsed = time.perf_counter() - started
+            print(
+                f"[INGEST] строк: {line_offset}, создано: {created}, ошибок: {failed} "
+                f"(из них не принято admission control: {refused}) "
+                f"({created / elapsed:.0f} заявок/с)",
+                file=sys.stderr,
+            )
+
+    return created, failed
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    source = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    errors_out = open(args.errors, "w") if args.errors else None
+    try:
+        created, failed = ingest(
+            source, args.ars_url, args.lines_per_request, errors_out, args.timeout
+        )
+    finally:
+        source.close()
+        if errors_out is not None:
+            errors_out.close()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,185 @@
+"""
+Нагрузочная проверка publisher'а ARS на живом RabbitMQ.
+
+Режим publisher (по умолчанию): --threads потоков параллельно публикуют по
+--messages сообщений через общий RabbitMQPublisher во временный exchange,
+затем все сообщения вычитываются и проверяются: тело не повреждено
+(контрольная сумма), нет потерь и дублей, порядок внутри потока сохранен.
+
+Режим http: --threads параллельных клиентов отправляют POST /access-requests
+в запущенный ARS, все ответы должны быть 201.
+
+    python scripts/stress_publisher.py --threads 200 --messages 50
+    python scripts/stress_publisher.py --mode http --ars-url http://localhost:8000 --threads 300
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочная проверка publisher'а")
+    parser.add_argument("--mode", choices=("publisher", "http"), default="publisher")
+    parser.add_argument("--threads", type=int, default=200, help="Параллельных потоков")
+    parser.add_argument("--messages", type=int, default=50, help="Сообщений на поток")
+    parser.add_argument("--pool-size", type=int, default=None, help="Соединений в пуле")
+    parser.add_argument("--ars-url", default="http://localhost:8000")
+    return parser.parse_args()
+
+
+def _checksum(payload: str) -> str:
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# =============================
+# PUBLISHER
+# =============================
+
+def run_publisher_stress(args: argparse.Namespace) -> bool:
+    import pika
+
+    from ars.app.core.config import settings
+    from ars.app.core.rabbitmq import RabbitMQPublisher
+
+    run_id = uuid.uuid4().hex[:8]
+    exchange = f"ars.stress.{run_id}"
+    queue = f"ars.stress.{run_id}"
+
+    connection = pika.BlockingConnection(pika.URLParameters(settings.rabbitmq_url))
+    channel = connection.channel()
+    channel.exchange_declare(exchange=exchange, exchange_type="direct", auto_delete=True)
+    channel.queue_declare(queue=queue, durable=False, auto_delete=False)
+    channel.queue_bind(queue=queue, exchange=exchange, routing_key=queue)
+
+    publisher = RabbitMQPublisher(pool_size=args.pool_size)
+    errors: list[str] = []
+    errors_lock = threading.Lock()
+    start_barrier = threading.Barrier(args.threads)
+
+    def publish(thread_index: int):
+        start_barrier.wait()
+        futures = []
+        for seq in range(args.messages):
+            payload = json.dumps(
+                {"thread": thread_index, "seq": seq, "data": uuid.uuid4().hex * 4}
+            )
+            body = json.dumps({"payload": payload, "checksum": _checksum(payload)})
+            futures.append(
+                publisher.publish(exchange, queue, body, {}, shard=thread_index)
+            )
+        for future in futures:
+            try:
+                future.result(timeout=settings.publisher_confirm_timeout_s)
+            except Exception as e:
+                with errors_lock:
+                    errors.append(f"поток {thread_index}: {e}")
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=publish, args=(index,)) for index in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    publisher.close()
+
+    expected = args.threads * args.messages
+    print(
+        f"[STRESS] Опубликовано {expected} сообщений из {args.threads} потоков за {elapsed:.2f} с "
+        f"({expected / elapsed:.0f} сообщений/с), ошибок подтверждения: {len(errors)}"
+    )
+    for error in errors[:10]:
+        print(f"[STRESS]   {error}")
+
+    # Проверка: целостность тел, потери, дубли, порядок внутри потока
+    seen: Counter = Counter()
+    last_seq: dict[int, int] = defaultdict(lambda: -1)
+    corrupted = out_of_order = 0
+    deadline = time.monotonic() + 30
+    while sum(seen.values()) + corrupted < expected and time.monotonic() < deadline:
+        method, _, body = channel.basic_get(queue=queue, auto_ack=True)
+        if method is None:
+            time.sleep(0.1)
+            continue
+        try:
+            message = json.loads(body)
+            if _checksum(message["payload"]) != message["checksum"]:
+                raise ValueError("checksum")
+            payload = json.loads(message["payload"])
+        except (ValueError, KeyError, TypeError):
+            corrupted += 1
+            continue
+        key = (payload["thread"], payload["seq"])
+        seen[key] += 1
+        if payload["seq"] <= last_seq[payload["thread"]]:
+            out_of_order += 1
+        last_seq[payload["thread"]] = payload["seq"]
+
+    channel.queue_delete(queue=queue)
+    connection.close()
+
+    missing = expected - len(seen)
+    duplicates = sum(count - 1 for count in seen.values() if count > 1)
+    print(
+        f"[STRESS] Получено: {sum(seen.values())}, повреждено: {corrupted}, потеряно: {missing}, "
+        f"дублей: {duplicates}, нарушений порядка: {out_of_order}"
+    )
+    return not (errors or corrupted or missing or out_of_order)
+
+
+# =============================
+# HTTP
+# =============================
+
+def run_http_stress(args: argparse.Namespace) -> bool:
+    import httpx
+
+    statuses: Counter = Counter()
+    statuses_lock = threading.Lock()
+
+    def post(_):
+        with httpx.Client(base_url=args.ars_url, timeout=30) as client:
+            for _ in range(args.messages):
+                try:
+                    status = client.post(
+                        "/access-requests",
+                        json={
+                            "user_id": str(uuid.uuid4()),
+                            "permission_group_id": str(uuid.uuid4()),
+                            "action": "GRANT",
+                        },
+                    ).status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                with statuses_lock:
+                    statuses[status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(post, range(args.threads)))
+    elapsed = time.perf_counter() - started
+
+    total = args.threads * args.messages
+    print(
+        f"[STRESS] {total} POST из {args.threads} клиентов за {elapsed:.2f} с "
+        f"({total / elapsed:.0f} запросов/с), ответы: {dict(statuses)}"
+    )
+    return statuses[201] == total
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    ok = run_publisher_stress(args) if args.mode == "publisher" else run_http_stress(args)
+    print("[STRESS] OK" if ok else "[STRESS] FAILED")
+    sys.exit(0 if ok else 1)
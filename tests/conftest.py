@@ -0,0 +1,97 @@
+"""
+Общие настройки тестов.
+
+Настройки сервисов читаются из окружения при импорте, поэтому окружение
+задается до импорта модулей ARS, Worker'а и Registry. БД - временный
+SQLite-файл; таблицы пересоздаются для каждого теста (фикстура db_tables).
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_DB_PATH = Path(tempfile.mkdtemp(prefix="ars-tests-")) / "tests.db"
+
+os.environ.update(
+    {
+        "DATABASE_URL": f"sqlite:///{_DB_PATH}",
+        "RABBITMQ_HOST": "in-memory",
+        "RABBITMQ_PORT": "5672",
+        "RABBITMQ_USER": "guest",
+        "RABBITMQ_PASSWORD": "guest",
+        "RABBITMQ_VHOST": "/",
+        "REGISTRY_SERVICE_URL": "http://registry",
+        "METRICS_PORT": "0",
+    }
+)
+
+
+@pytest.fixture
+def db_tables():
+    """Пустые таблицы ARS и Registry в общей тестовой БД."""
+    from common.db.base import Base as ArsBase
+    from common.models import access_request, idempotency, outbox, user_permission  # noqa: F401 - регистрируют таблицы
+    from registry.app.core.db import engine
+    from registry.app.models import Base as RegistryBase
+
+    ArsBase.metadata.drop_all(engine)
+    RegistryBase.metadata.drop_all(engine)
+    ArsBase.metadata.create_all(engine)
+    RegistryBase.metadata.create_all(engine)
+    yield engine
+
+
+@pytest.fixture
+def registry(db_tables):
+    """Registry in-process: TestClient поверх ASGI-приложения."""
+    from fastapi.testclient import TestClient
+
+    from registry.app.main import app
+
+    with TestClient(app, base_url="http://registry") as client:
+        yield client
+
+
+@pytest.fixture
+def worker(registry):
+    """Синхронный воркер без брокера: заглушки канала из common.testing, Registry in-process."""
+    from common.testing import StubChannel, StubConnection
+    from worker.app.workers.access_request_worker import AccessRequestWorker
+
+    worker = AccessRequestWorker()
+    worker.channel = StubChannel()
+    worker.connection = StubConnection()
+    worker.registry._client.close()
+    worker.registry._client = registry
+    yield worker
+
+
+@pytest.fixture
+def publisher(monkeypatch):
+    """Очередь в памяти вместо RabbitMQ для outbox relay ARS."""
+    from ars.app.core import rabbitmq
+    from common.testing import InMemoryPublisher
+
+    publisher = InMemoryPublisher()
+    monkeypatch.setattr(rabbitmq, "_publisher", publisher)
+    return publisher
+
+
+@pytest.fixture
+def ars(registry, publisher, monkeypatch):
+    """ARS in-process; сообщения outbox складываются в publisher, Registry in-process."""
+    from fastapi.testclient import TestClient
+
+    from ars.app import main
+    from common.testing import in_process_registry_client
+    from registry.app.main import app as registry_app
+
+    monkeypatch.setattr(
+        main, "create_registry_client", lambda: in_process_registry_client(registry_app)
+    )
+    with TestClient(main.app) as client:
+        yield client
@@ -0,0 +1,156 @@
+import asyncio
+import math
+import time
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from ars.app.core.config import settings
+from ars.app.core.db import SessionLocal
+from ars.app.services.admission import (
+    STATUS_DEGRADED,
+    STATUS_OK,
+    STATUS_OVERLOADED,
+    STATUS_UNKNOWN,
+    AdmissionController,
+    AdmissionRejectedError,
+    PipelineSnapshot,
+    TokenBuckets,
+)
+from common.clock import utcnow
+from common.enums import AccessAction, AccessRequestStatus
+from common.models.access_request import AccessRequest
+
+
+def controller(policy: str, pending: int) -> AdmissionController:
+    admission = AdmissionController()
+    admission.policy = policy
+    admission.snapshot = PipelineSnapshot(
+        pending_requests=pending,
+        oldest_pending_age_s=0.0,
+        stale_pending=0,
+        outbox_backlog=0,
+        sampled_at=utcnow(),
+        sampled_monotonic=time.monotonic(),
+    )
+    return admission
+
+
+DEGRADED = settings.admission_degraded_pending
+OVERLOADED = settings.admission_overloaded_pending
+
+
+def test_status_by_thresholds():
+    assert controller("reject", 0).status() == STATUS_OK
+    assert controller("reject", DEGRADED).status() == STATUS_DEGRADED
+    assert controller("reject", OVERLOADED).status() == STATUS_OVERLOADED
+    assert AdmissionController().status() == STATUS_UNKNOWN
+
+
+def test_stale_snapshot_admits():
+    admission = controller("reject", OVERLOADED)
+    admission.snapshot = admission.snapshot._replace(
+        sampled_monotonic=time.monotonic() - 10 * settings.admission_sample_interval_s
+    )
+
+    assert admission.status() == STATUS_UNKNOWN
+    admission.admit("team-a")
+
+
+@pytest.mark.parametrize("policy", ["reject", "token_bucket"])
+def test_overloaded_rejects_all_but_priority(policy):
+    admission = controller(policy, OVERLOADED)
+
+    with pytest.raises(AdmissionRejectedError) as e:
+        admission.admit("team-a")
+    assert e.value.retry_after == settings.admission_retry_after_s
+    admission.admit("team-a", priority=True)
+
+
+def test_priority_policy_admits_only_priority_when_degraded(monkeypatch):
+    monkeypatch.setattr(settings, "admission_priority_callers", ["oncall"])
+    admission = controller("priority", DEGRADED)
+
+    with pytest.raises(AdmissionRejectedError):
+        admission.admit("team-a")
+    admission.admit("team-a", priority=True)
+    admission.admit("oncall")
+
+
+def test_token_bucket_limits_caller_when_degraded():
+    admission = controller("token_bucket", DEGRADED)
+    admission.buckets = TokenBuckets(rate=1.0, burst=3.0, max_callers=10)
+
+    admission.admit("team-a", cost=3)
+    with pytest.raises(AdmissionRejectedError) as e:
+        admission.admit("team-a", cost=2)
+    assert 1.0 < e.value.retry_after <= 2.0
+    # Ведра у вызывающих разные
+    admission.admit("team-b", cost=3)
+    # Пакет больше запаса не пройдет никогда
+    with pytest.raises(AdmissionRejectedError):
+        admission.admit("team-c", cost=4)
+
+
+def test_token_bucket_refills_and_evicts():
+    buckets = TokenBuckets(rate=1000.0, burst=2.0, max_callers=2)
+
+    assert buckets.take("a", 2) == 0
+    assert buckets.take("a", 2) > 0
+    time.sleep(0.01)
+    assert buckets.take("a", 2) == 0
+    assert math.isinf(buckets.take("b", 3))
+    buckets.take("c")
+    assert len(buckets) == 2
+
+
+def add_pending(age_s: float, count: int = 1) -> None:
+    with SessionLocal() as db:
+        for _ in range(count):
+            db.add(
+                AccessRequest(
+                    user_id=uuid.uuid4(),
+                    permission_group_id=uuid.uuid4(),
+                    action=AccessAction.GRANT,
+                    status=AccessRequestStatus.PENDING,
+                    created_at=utcnow() - timedelta(seconds=age_s),
+                )
+            )
+        db.commit()
+
+
+def sampled(policy: str = "reject") -> AdmissionController:
+    admission = AdmissionController()
+    admission.policy = policy
+    asyncio.run(admission.sample())
+    return admission
+
+
+def test_default_policy_is_off():
+    assert AdmissionController().policy == "off"
+
+
+def test_stuck_requests_beyond_horizon_are_ignored(db_tables):
+    # Заявки, застрявшие до обновления или в DLQ
+    add_pending(settings.admission_pending_horizon_s + 60, count=3)
+    add_pending(0)
+
+    admission = sampled()
+
+    assert admission.snapshot.pending_requests == 1
+    assert admission.snapshot.stale_pending == 3
+    assert admission.status() == STATUS_OK
+    admission.admit("team-a")
+
+
+def test_single_old_request_does_not_overload(db_tables):
+    age = settings.admission_overloaded_age_s + 60
+    add_pending(age)
+    add_pending(0, count=settings.admission_age_rank)
+
+    assert sampled().status() == STATUS_OK
+
+    # Отстает вся очередь, а не одна заявка
+    add_pending(age, count=settings.admission_age_rank)
+    assert sampled().status() == STATUS_OVERLOADED
@@ -0,0 +1,25 @@
+import uuid
+
+
+def item(action="GRANT") -> dict:
+    return {
+        "user_id": str(uuid.uuid4()),
+        "permission_group_id": str(uuid.uuid4()),
+        "action": action,
+    }
+
+
+def test_invalid_items_do_not_fail_the_batch(ars):
+    resp = ars.post(
+        "/access-requests/batch",
+        json={"items": [item(), "not an object", {"action": "GRANT"}, None, item("REVOKE")]},
+    )
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert (body["created"], body["failed"]) == (2, 3)
+    results = body["results"]
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert results[0]["id"] and results[4]["id"]
+    assert all(results[index]["error"] for index in (1, 2, 3))
+    assert "user_id" in results[2]["error"]
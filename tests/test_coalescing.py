@@ -0,0 +1,69 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from common.enums import AccessAction
+from worker.app.services.coalescing import coalesce_requests
+
+
+USER_ID = uuid.uuid4()
+GROUP_ID = uuid.uuid4()
+
+
+class Request(NamedTuple):
+    user_id: uuid.UUID
+    permission_group_id: uuid.UUID
+    action: AccessAction
+    created_at: datetime
+
+
+CREATED_AT = datetime(2026, 1, 1)
+
+
+def requests(*actions, group_id=GROUP_ID) -> list[tuple[uuid.UUID, Request]]:
+    return [
+        (uuid.uuid4(), Request(USER_ID, group_id, action, CREATED_AT + timedelta(seconds=i)))
+        for i, action in enumerate(actions)
+    ]
+
+
+def test_repeated_grants_collapse_into_last():
+    batch = requests(AccessAction.GRANT, AccessAction.GRANT, AccessAction.GRANT)
+
+    coalesced = coalesce_requests(batch)
+
+    assert coalesced.to_apply == [batch[2]]
+    assert coalesced.duplicates == {batch[2][0]: [batch[0][0], batch[1][0]]}
+    assert coalesced.superseded == {}
+
+
+def test_later_revoke_supersedes_grant():
+    batch = requests(AccessAction.GRANT, AccessAction.REVOKE)
+
+    coalesced = coalesce_requests(batch)
+
+    assert coalesced.to_apply == [batch[1]]
+    assert coalesced.superseded == {batch[1][0]: [batch[0][0]]}
+
+
+def test_different_groups_are_kept_in_order():
+    batch = [
+        *requests(AccessAction.GRANT),
+        *requests(AccessAction.REVOKE, group_id=uuid.uuid4()),
+        *requests(AccessAction.GRANT, group_id=uuid.uuid4()),
+    ]
+
+    coalesced = coalesce_requests(batch)
+
+    assert coalesced.to_apply == batch
+    assert coalesced.duplicates == coalesced.superseded == {}
+
+
+def test_survivor_is_newest_by_created_at_not_delivery_order():
+    grant, revoke = requests(AccessAction.GRANT, AccessAction.REVOKE)
+
+    # Повтор более ранней GRANT пришел после REVOKE
+    coalesced = coalesce_requests([revoke, grant])
+
+    assert coalesced.to_apply == [revoke]
+    assert coalesced.superseded == {revoke[0]: [grant[0]]}
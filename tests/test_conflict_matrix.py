@@ -0,0 +1,109 @@
+import pytest
+
+from registry.app.core.config import settings
+from worker.app.services.conflicts import ConflictMatrix
+
+
+@pytest.fixture(params=[False, True], ids=["pydantic", "fast_json"])
+def fast_json(request, monkeypatch):
+    monkeypatch.setattr(settings, "fast_json", request.param)
+
+
+def create_group(registry, name: str, conflicts_with: tuple[str, ...] = ()) -> str:
+    resp = registry.post(
+        "/admin/permission-groups",
+        json={"name": name, "conflicts_with": list(conflicts_with)},
+    )
+    resp.raise_for_status()
+    return resp.json()["id"]
+
+
+def pairs(items) -> set[tuple[str, str]]:
+    return {(item["group_id"], item["conflicts_with_id"]) for item in items}
+
+
+def test_matrix_versions_and_deltas(registry, fast_json):
+    readers = create_group(registry, "readers")
+    writers = create_group(registry, "writers", conflicts_with=(readers,))
+
+    full = registry.get("/internal/permission-groups/conflicts")
+    assert full.status_code == 200
+    assert full.headers["ETag"] == '"1"'
+    assert full.json()["version"] == "1"
+    assert full.json()["changes"] is None
+    assert pairs(full.json()["conflicts"]) == {(writers, readers), (readers, writers)}
+
+    not_modified = registry.get(
+        "/internal/permission-groups/conflicts", headers={"If-None-Match": '"1"'}
+    )
+    assert not_modified.status_code == 304
+
+    admins = create_group(registry, "admins", conflicts_with=(readers,))
+    delta = registry.get(
+        "/internal/permission-groups/conflicts",
+        params={"since": "1"},
+        headers={"If-None-Match": '"1"'},
+    )
+    assert delta.status_code == 200
+    assert delta.json()["version"] == "2"
+    assert delta.json()["conflicts"] == []
+    assert pairs(delta.json()["changes"]) == {(admins, readers), (readers, admins)}
+    assert not any(change["removed"] for change in delta.json()["changes"])
+
+
+def test_unknown_version_returns_full_matrix(registry):
+    readers = create_group(registry, "readers")
+    create_group(registry, "writers", conflicts_with=(readers,))
+
+    # Версия в прежнем формате - хеш матрицы
+    resp = registry.get(
+        "/internal/permission-groups/conflicts",
+        params={"since": "3f786850e387550fdab836ed7e6dc881de23001b"},
+    )
+
+    assert resp.json()["changes"] is None
+    assert len(resp.json()["conflicts"]) == 2
+
+
+def test_worker_cache_applies_deltas(worker, registry, monkeypatch):
+    matrix = worker.conflict_matrix
+    readers = create_group(registry, "readers")
+    writers = create_group(registry, "writers", conflicts_with=(readers,))
+
+    worker._refresh_conflict_matrix()
+    assert matrix.version == "1"
+    assert matrix.conflicts_of(readers) == {writers}
+
+    admins = create_group(registry, "admins", conflicts_with=(readers,))
+    responses = []
+    apply = matrix.apply
+    monkeypatch.setattr(matrix, "apply", lambda data: responses.append(data) or apply(data))
+    monkeypatch.setattr(matrix, "_checked_at", float("-inf"))
+
+    worker._refresh_conflict_matrix()
+
+    assert len(responses[0]["changes"]) == 2
+    assert matrix.version == "2"
+    assert matrix.conflicts_of(readers) == {writers, admins}
+    assert matrix.conflicts_of(admins) == {readers}
+
+
+def test_removed_conflicts_are_dropped():
+    matrix = ConflictMatrix(refresh_interval_s=5)
+    matrix.apply(
+        {"version": "1", "conflicts": [{"group_id": "a", "conflicts_with_id": "b"}]}
+    )
+
+    matrix.apply(
+        {
+            "version": "2",
+            "conflicts": [],
+            "changes": [
+                {"group_id": "a", "conflicts_with_id": "b", "removed": True},
+                {"group_id": "c", "conflicts_with_id": "b", "removed": False},
+            ],
+        }
+    )
+
+    assert matrix.conflicts_of("b") == {"c"}
+    assert matrix.version == "2"
@@ -0,0 +1,16 @@
+import pytest
+
+from common.db.urls import async_database_url
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("postgresql://u:p@db/ars", "postgresql+asyncpg://u:p@db/ars"),
+        ("postgresql+psycopg2://u:p@db/ars", "postgresql+asyncpg://u:p@db/ars"),
+        ("sqlite:///tmp/ars.db", "sqlite+aiosqlite:///tmp/ars.db"),
+        ("postgresql+asyncpg://u:p@db/ars", "postgresql+asyncpg://u:p@db/ars"),
+    ],
+)
+def test_async_database_url(url, expected):
+    assert async_database_url(url) == expected
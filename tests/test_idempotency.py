@@ -0,0 +1,72 @@
+import uuid
+
+from ars.app.core.db import SessionLocal
+from ars.app.services.admission import STATUS_OVERLOADED, get_admission_controller
+from common.models.access_request import AccessRequest
+
+
+def body(action="GRANT") -> dict:
+    return {
+        "user_id": str(uuid.uuid4()),
+        "permission_group_id": str(uuid.uuid4()),
+        "action": action,
+    }
+
+
+def create(ars, data, key="key-1", caller="team-a"):
+    return ars.post(
+        "/access-requests",
+        json=data,
+        headers={"Idempotency-Key": key, "X-Caller-Id": caller},
+    )
+
+
+def request_count() -> int:
+    with SessionLocal() as db:
+        return db.query(AccessRequest).count()
+
+
+def test_replay_returns_the_same_request(ars):
+    data = body()
+
+    first = create(ars, data)
+    replay = create(ars, data)
+
+    assert first.status_code == replay.status_code == 201
+    assert replay.json()["id"] == first.json()["id"]
+    assert "Idempotent-Replayed" not in first.headers
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert request_count() == 1
+
+
+def test_key_reused_with_other_body(ars):
+    assert create(ars, body()).status_code == 201
+    assert create(ars, body()).status_code == 422
+
+
+def test_keys_are_scoped_by_caller(ars):
+    first = create(ars, body(), caller="team-a")
+    other = create(ars, body(), caller="team-b")
+
+    assert first.status_code == other.status_code == 201
+    assert other.json()["id"] != first.json()["id"]
+    assert request_count() == 2
+
+
+def test_replay_bypasses_admission(ars, monkeypatch):
+    data = body()
+    first = create(ars, data)
+
+    admission = get_admission_controller()
+    monkeypatch.setattr(admission, "policy", "reject")
+    monkeypatch.setattr(admission, "status", lambda: STATUS_OVERLOADED)
+
+    # Повтор уже принятой заявки отвечает ей же, новая заявка получает 429
+    replay = create(ars, data)
+    assert replay.status_code == 201
+    assert replay.json()["id"] == first.json()["id"]
+
+    rejected = create(ars, body(), key="key-2")
+    assert rejected.status_code == 429
+    assert "Retry-After" in rejected.headers
+    assert request_count() == 1
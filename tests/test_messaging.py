@@ -0,0 +1,50 @@
+import uuid
+
+from common.messaging import (
+    ACCESS_REQUEST_DEAD_QUEUE,
+    SHARD_QUEUE_ARGUMENTS,
+    declare_topology,
+    retry_queue_name,
+    shard_for_user,
+    shard_queue_name,
+)
+
+
+class RecordingChannel:
+    """Канал pika, который только запоминает объявления."""
+
+    def __init__(self):
+        self.queues: dict[str, dict | None] = {}
+        self.bindings: list[tuple[str, str, str | None]] = []
+
+    def exchange_declare(self, exchange, exchange_type, durable):
+        pass
+
+    def queue_declare(self, queue, durable, arguments=None):
+        self.queues[queue] = arguments
+
+    def queue_bind(self, queue, exchange, routing_key=None, arguments=None):
+        self.bindings.append((queue, exchange, routing_key))
+
+
+def test_shard_is_stable_and_in_range():
+    user_id = uuid.UUID("6f1c1f0e-7d4c-4f43-9d4a-0d2b8f1c3a55")
+    assert shard_for_user(user_id, 8) == shard_for_user(str(user_id), 8)
+    assert {shard_for_user(uuid.uuid4(), 8) for _ in range(500)} == set(range(8))
+
+
+def test_declare_topology_declares_shards_retries_and_dlq():
+    channel = RecordingChannel()
+    queues = declare_topology(channel, shards=4, retry_delays=[1000, 5000])
+
+    assert queues == [shard_queue_name(shard) for shard in range(4)]
+    for queue in queues:
+        assert channel.queues[queue] == SHARD_QUEUE_ARGUMENTS
+    assert channel.queues[retry_queue_name(1000)]["x-message-ttl"] == 1000
+    assert ACCESS_REQUEST_DEAD_QUEUE in channel.queues
+
+
+def test_publisher_topology_has_no_retry_queues():
+    channel = RecordingChannel()
+    declare_topology(channel, shards=2)
+    assert not any(".retry." in queue for queue in channel.queues)
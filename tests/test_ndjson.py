@@ -0,0 +1,91 @@
+import asyncio
+import json
+import uuid
+
+from ars.app.core.config import settings
+from ars.app.core.db import SessionLocal
+from ars.app.services.admission import AdmissionRejectedError, get_admission_controller
+from ars.app.services.ndjson import _iter_lines
+from common.models.access_request import AccessRequest
+
+
+def line(action="GRANT") -> str:
+    return json.dumps(
+        {
+            "user_id": str(uuid.uuid4()),
+            "permission_group_id": str(uuid.uuid4()),
+            "action": action,
+        }
+    )
+
+
+def split_lines(chunks: list[bytes]) -> list[tuple[int, bytes | None]]:
+    async def source():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [item async for item in _iter_lines(source())]
+
+    return asyncio.run(collect())
+
+
+def ingest(ars, lines: list[str]) -> list[dict]:
+    resp = ars.post(
+        "/access-requests/stream",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    return [json.loads(raw) for raw in resp.text.splitlines()]
+
+
+def request_count() -> int:
+    with SessionLocal() as db:
+        return db.query(AccessRequest).count()
+
+
+def test_lines_split_across_chunks():
+    assert split_lines([b'{"a"', b": 1}\n\n{", b'"b": 2}']) == [
+        (1, b'{"a": 1}'),
+        (2, b""),
+        (3, b'{"b": 2}'),
+    ]
+
+
+def test_long_line_is_skipped_without_buffering(monkeypatch):
+    monkeypatch.setattr(settings, "ndjson_max_line_bytes", 8)
+
+    assert split_lines([b"0123456789", b"0123456789\nok\n"]) == [(1, None), (2, b"ok")]
+
+
+def test_results_per_line_in_batches(ars, monkeypatch):
+    monkeypatch.setattr(settings, "ndjson_batch_size", 2)
+
+    results = ingest(ars, [line(), "not json", line(), "", line("REVOKE")])
+
+    assert [result["line"] for result in results] == [1, 2, 3, 5]
+    assert "id" in results[0] and "id" in results[2] and "id" in results[3]
+    assert "error" in results[1]
+    assert request_count() == 3
+
+
+def test_admission_is_charged_per_batch(ars, monkeypatch):
+    monkeypatch.setattr(settings, "ndjson_batch_size", 2)
+    admission = get_admission_controller()
+    charged = []
+
+    def admit(caller, cost=1, priority=False):
+        if charged:
+            raise AdmissionRejectedError("Конвейер заявок overloaded", 2.5)
+        charged.append(cost)
+
+    monkeypatch.setattr(admission, "admit", admit)
+
+    results = ingest(ars, [line() for _ in range(5)])
+
+    # Первый пакет принят, второй отклонен, остаток тела получает ту же ошибку
+    assert charged == [2]
+    assert ["id" in result for result in results] == [True, True, False, False, False]
+    assert all(result["retry_after"] == 3 for result in results[2:])
+    assert request_count() == 2
@@ -0,0 +1,25 @@
+import uuid
+
+from ars.app.core.db import SessionLocal
+from ars.app.services.outbox import OutboxRelay
+from common.models.outbox import OutboxMessage
+
+
+def test_relay_publishes_in_order_and_deletes(db_tables, publisher, monkeypatch):
+    monkeypatch.setattr("ars.app.services.outbox.settings.outbox_batch_size", 2)
+    with SessionLocal() as db:
+        db.add_all(
+            OutboxMessage(request_id=uuid.uuid4(), user_id=uuid.uuid4(), payload=str(i))
+            for i in range(3)
+        )
+        db.commit()
+
+    relay = OutboxRelay()
+    assert relay.relay_batch() == 2
+    assert relay.relay_batch() == 1
+    assert relay.relay_batch() == 0
+
+    published = [publisher.messages.get_nowait()[2] for _ in range(3)]
+    assert published == [b"0", b"1", b"2"]
+    with SessionLocal() as db:
+        assert db.query(OutboxMessage).count() == 0
@@ -0,0 +1,211 @@
+import json
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+import pika
+import pytest
+
+from ars.app.core.rabbitmq import PublishError, RabbitMQPublisher
+
+
+THREADS = 200
+MESSAGES = 20
+POOL_SIZE = 4
+
+
+def is_nacked(thread_index: int, seq: int) -> bool:
+    """Сообщения, которые брокер-заглушка отклоняет (nack)."""
+    return (thread_index * MESSAGES + seq) % 7 == 3
+
+
+class _IOLoop:
+    """I/O-цикл SelectConnection: колбэки выполняются по одному в потоке start()."""
+
+    def __init__(self):
+        self._callbacks: queue.Queue = queue.Queue()
+        self._stopped = False
+        self.thread: threading.Thread | None = None
+
+    def add_callback_threadsafe(self, callback):
+        self._callbacks.put(callback)
+
+    def start(self):
+        self.thread = threading.current_thread()
+        while not self._stopped:
+            self._callbacks.get()()
+
+    def stop(self):
+        self._stopped = True
+
+
+class _FakeChannel:
+    """Канал в режиме confirms: пишет фреймы публикаций и подтверждает их по порядку."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.is_open = True
+        self.frames: list[tuple[str, bytes]] = []
+        self._publishing = False
+        self._outstanding: list[tuple[int, bool]] = []
+        self._delivery_tag = 0
+        self._on_confirm = None
+
+    def add_on_close_callback(self, callback):
+        pass
+
+    def confirm_delivery(self, ack_nack_callback, callback):
+        self._on_confirm = ack_nack_callback
+        self.connection.ioloop.add_callback_threadsafe(lambda: callback(None))
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        assert threading.current_thread() is self.connection.ioloop.thread, (
+            "публикация не из I/O-потока соединения"
+        )
+        assert not self._publishing, "публикации на канале перемешались"
+        self._publishing = True
+        try:
+            # Метод, заголовок и тело - отдельные фреймы; переключение потоков между
+            # ними выявило бы одновременную запись в канал
+            for kind in ("method", "header", "body"):
+                self.frames.append((kind, body))
+                time.sleep(0)
+        finally:
+            self._publishing = False
+
+        self._delivery_tag += 1
+        message = json.loads(body)
+        self._outstanding.append(
+            (self._delivery_tag, is_nacked(message["thread"], message["seq"]))
+        )
+        self.connection.ioloop.add_callback_threadsafe(self._confirm)
+
+    def _confirm(self):
+        """Подтверждает накопленное: серии ack - одним multiple=True, nack - поштучно."""
+        outstanding, self._outstanding = self._outstanding, []
+        last_ack = None
+        for tag, nack in outstanding:
+            if not nack:
+                last_ack = tag
+                continue
+            if last_ack is not None:
+                self._send(pika.spec.Basic.Ack(delivery_tag=last_ack, multiple=True))
+                last_ack = None
+            self._send(pika.spec.Basic.Nack(delivery_tag=tag, multiple=False))
+        if last_ack is not None:
+            self._send(pika.spec.Basic.Ack(delivery_tag=last_ack, multiple=True))
+
+    def _send(self, method):
+        self._on_confirm(SimpleNamespace(method=method))
+
+
+class _FakeSelectConnection:
+    instances: list["_FakeSelectConnection"] = []
+
+    def __init__(self, parameters, on_open_callback, on_open_error_callback, on_close_callback):
+        self.ioloop = _IOLoop()
+        self.is_open = True
+        self.is_closed = False
+        self.channels: list[_FakeChannel] = []
+        self._on_close = on_close_callback
+        self.ioloop.add_callback_threadsafe(lambda: on_open_callback(self))
+        _FakeSelectConnection.instances.append(self)
+
+    def channel(self, on_open_callback):
+        channel = _FakeChannel(self)
+        self.channels.append(channel)
+        self.ioloop.add_callback_threadsafe(lambda: on_open_callback(channel))
+
+    def close(self):
+        self.is_open = False
+        self.is_closed = True
+        self._on_close(self, "closed by client")
+
+
+class _FakeBlockingConnection:
+    """Соединение для объявления топологии: все вызовы канала ничего не делают."""
+
+    def __init__(self, parameters):
+        pass
+
+    def channel(self):
+        return SimpleNamespace(
+            exchange_declare=lambda *args, **kwargs: None,
+            queue_declare=lambda *args, **kwargs: None,
+            queue_bind=lambda *args, **kwargs: None,
+        )
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_broker(monkeypatch):
+    _FakeSelectConnection.instances = []
+    monkeypatch.setattr(pika, "SelectConnection", _FakeSelectConnection)
+    monkeypatch.setattr(pika, "BlockingConnection", _FakeBlockingConnection)
+    return _FakeSelectConnection.instances
+
+
+def test_concurrent_publishes_are_not_interleaved_lost_or_misconfirmed(fake_broker):
+    publisher = RabbitMQPublisher(pool_size=POOL_SIZE)
+    barrier = threading.Barrier(THREADS)
+    errors: list[str] = []
+
+    def publish(thread_index: int):
+        barrier.wait()
+        futures = [
+            publisher.publish(
+                "ex",
+                "rk",
+                json.dumps({"thread": thread_index, "seq": seq}),
+                {},
+                shard=thread_index,
+            )
+            for seq in range(MESSAGES)
+        ]
+        for seq, future in enumerate(futures):
+            try:
+                future.result(timeout=30)
+                outcome = "ack"
+            except PublishError:
+                outcome = "nack"
+            expected = "nack" if is_nacked(thread_index, seq) else "ack"
+            if outcome != expected:
+                errors.append(f"{thread_index}/{seq}: {outcome}, ожидался {expected}")
+
+    threads = [threading.Thread(target=publish, args=(index,)) for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+    publisher.close()
+
+    assert errors == []
+    assert len(fake_broker) == POOL_SIZE
+
+    published: Counter = Counter()
+    order: dict[int, list[int]] = defaultdict(list)
+    for connection_index, connection in enumerate(fake_broker):
+        (channel,) = connection.channels
+        frames = channel.frames
+        # Фреймы идут тройками одного сообщения
+        assert len(frames) % 3 == 0
+        for offset in range(0, len(frames), 3):
+            kinds = [kind for kind, _ in frames[offset:offset + 3]]
+            bodies = {body for _, body in frames[offset:offset + 3]}
+            assert kinds == ["method", "header", "body"]
+            assert len(bodies) == 1
+            message = json.loads(bodies.pop())
+            # Шард всегда публикуется через одно соединение
+            assert message["thread"] % POOL_SIZE == connection_index
+            published[(message["thread"], message["seq"])] += 1
+            order[message["thread"]].append(message["seq"])
+
+    # Ни потерь, ни дублей, порядок внутри потока сохранен
+    assert published == Counter(
+        {(thread, seq): 1 for thread in range(THREADS) for seq in range(MESSAGES)}
+    )
+    assert all(seqs == list(range(MESSAGES)) for seqs in order.values())
@@ -0,0 +1,30 @@
+from common.messaging import (
+    PUBLISHED_AT_HEADER,
+    REDRIVEN_HEADER,
+    RETRY_COUNT_HEADER,
+    RETRY_DELAY_HEADER,
+    is_redelivery,
+)
+from worker.app.workers.redrive import _redrive_headers
+
+
+def test_redrive_resets_retries_and_marks_message():
+    headers = _redrive_headers(
+        {
+            RETRY_COUNT_HEADER: 5,
+            RETRY_DELAY_HEADER: "60000",
+            PUBLISHED_AT_HEADER: 1,
+            "x-death": [{"queue": "access_request_created.3"}],
+            "x-first-death-reason": "rejected",
+            "trace-id": "abc",
+        }
+    )
+
+    assert headers == {"trace-id": "abc", REDRIVEN_HEADER: 1}
+    assert is_redelivery(False, headers)
+
+
+def test_is_redelivery():
+    assert not is_redelivery(False, None)
+    assert is_redelivery(True, None)
+    assert is_redelivery(False, {RETRY_COUNT_HEADER: 1})
@@ -0,0 +1,71 @@
+import uuid
+
+
+USER_ID = uuid.UUID("6f1c1f0e-7d4c-4f43-9d4a-0d2b8f1c3a55")
+
+
+def create_group(registry, name: str, conflicts_with: tuple[str, ...] = ()) -> str:
+    resp = registry.post(
+        "/admin/permission-groups",
+        json={"name": name, "conflicts_with": list(conflicts_with)},
+    )
+    resp.raise_for_status()
+    return resp.json()["id"]
+
+
+def apply(registry, group_id, action: str = "GRANT") -> dict:
+    resp = registry.post(
+        f"/internal/users/{USER_ID}/permission-groups/{group_id}/apply",
+        json={"action": action},
+    )
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def active_groups(registry) -> set[str]:
+    resp = registry.get(f"/internal/users/{USER_ID}/permission-groups")
+    resp.raise_for_status()
+    return {group["id"] for group in resp.json()}
+
+
+def test_apply_grant_and_revoke(registry):
+    group_id = create_group(registry, "readers")
+
+    assert apply(registry, group_id) == {
+        "applied": True,
+        "reason": None,
+        "group_name": "readers",
+    }
+    assert active_groups(registry) == {group_id}
+
+    assert apply(registry, group_id, "REVOKE")["applied"] is True
+    assert active_groups(registry) == set()
+
+
+def test_apply_rejects_conflicting_group(registry):
+    readers = create_group(registry, "readers")
+    writers = create_group(registry, "writers", conflicts_with=(readers,))
+
+    assert apply(registry, readers)["applied"] is True
+    assert apply(registry, writers) == {
+        "applied": False,
+        "reason": "Permission group conflict",
+        "group_name": None,
+    }
+    assert active_groups(registry) == {readers}
+
+
+def test_apply_rejects_unknown_group(registry):
+    assert apply(registry, uuid.uuid4()) == {
+        "applied": False,
+        "reason": "Permission group not found",
+        "group_name": None,
+    }
+    assert active_groups(registry) == set()
+
+
+def test_grant_unknown_group_is_not_found(registry):
+    resp = registry.post(
+        f"/internal/users/{USER_ID}/permission-groups/{uuid.uuid4()}/grant"
+    )
+    assert resp.status_code == 404
@@ -0,0 +1,74 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+
+from common.clients.registry_client import AsyncRegistryClient, RegistryClient
+
+
+USER_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+GROUP_ID = uuid.UUID("00000000-0000-0000-0000-000000000002")
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    path = request.url.path
+    if path.endswith("/apply"):
+        return httpx.Response(200, json={"applied": False, "reason": "conflict"})
+    if path == "/internal/permission-groups/conflicts":
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={"version": "v1", "conflicts": []})
+    if path == "/internal/user-permission-groups/snapshot":
+        return httpx.Response(200, json={"items": [], "next_after": None, "params": dict(request.url.params)})
+    if path.endswith("/grant"):
+        return httpx.Response(404, json={"detail": "not found"})
+    return httpx.Response(200, json=[{"id": str(GROUP_ID), "name": "g"}])
+
+
+def sync_client() -> RegistryClient:
+    client = RegistryClient("http://registry")
+    client._client = httpx.Client(base_url="http://registry", transport=httpx.MockTransport(handler))
+    return client
+
+
+class SyncFacade:
+    """Асинхронный клиент с синхронным интерфейсом: те же проверки для обоих клиентов."""
+
+    def __init__(self):
+        self.client = AsyncRegistryClient("http://registry")
+        self.client._client = httpx.AsyncClient(
+            base_url="http://registry", transport=httpx.MockTransport(handler)
+        )
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        return lambda *args, **kwargs: asyncio.run(method(*args, **kwargs))
+
+
+@pytest.fixture(params=["sync", "async"])
+def client(request):
+    return sync_client() if request.param == "sync" else SyncFacade()
+
+
+def test_parses_responses(client):
+    assert client.get_user_permission_groups(USER_ID) == [{"id": str(GROUP_ID), "name": "g"}]
+    assert client.apply_access_change(USER_ID, GROUP_ID, "GRANT") == (False, "conflict", None)
+    assert client.get_conflict_matrix() == {"version": "v1", "conflicts": []}
+    assert client.get_conflict_matrix("v1") is None
+
+
+def test_snapshot_passes_cursor(client):
+    page = client.get_user_permissions_snapshot(
+        {"user_id": str(USER_ID), "group_id": str(GROUP_ID)}, limit=10
+    )
+    assert page["params"] == {
+        "limit": "10",
+        "after_user_id": str(USER_ID),
+        "after_group_id": str(GROUP_ID),
+    }
+
+
+def test_client_errors_raise(client):
+    with pytest.raises(httpx.HTTPStatusError):
+        client.grant_permission_group(USER_ID, GROUP_ID)
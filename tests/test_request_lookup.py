@@ -0,0 +1,38 @@
+import uuid
+
+from ars.app.core.db import SessionLocal
+from common.enums import AccessAction, AccessRequestStatus
+from common.models.access_request import AccessRequest
+
+
+def create_request(status: AccessRequestStatus) -> uuid.UUID:
+    with SessionLocal() as db:
+        request = AccessRequest(
+            user_id=uuid.uuid4(),
+            permission_group_id=uuid.uuid4(),
+            action=AccessAction.GRANT,
+            status=status,
+        )
+        db.add(request)
+        db.commit()
+        return request.id
+
+
+def test_final_status_is_privately_cacheable(ars):
+    request_id = create_request(AccessRequestStatus.APPROVED)
+
+    resp = ars.get(f"/access-requests/{request_id}")
+    assert resp.status_code == 200
+    cache_control = resp.headers["Cache-Control"]
+    assert cache_control.startswith("private,") and "immutable" in cache_control
+
+    resp = ars.get(f"/access-requests/{request_id}", headers={"If-None-Match": resp.headers["ETag"]})
+    assert resp.status_code == 304
+
+
+def test_pending_status_is_revalidated(ars):
+    request_id = create_request(AccessRequestStatus.PENDING)
+
+    resp = ars.get(f"/access-requests/{request_id}")
+    assert resp.status_code == 200
+    assert resp.headers["Cache-Control"] == "no-cache"
@@ -0,0 +1,150 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from common.clients.registry_client import AsyncRegistryClient, RegistryClient
+from common.clients.resilience import (
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+)
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_threshold_and_half_opens_after_recovery():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout_s=0.05)
+    open_breaker(breaker)
+    assert breaker.state is CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    assert breaker.state is CircuitState.HALF_OPEN
+    breaker.before_call()
+    # Пробный вызов один: остальные отклоняются до его результата
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout_s=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+
+
+def test_probe_without_outcome_releases_slot():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout_s=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+
+    with pytest.raises(RuntimeError):
+        with breaker.attempt():
+            raise RuntimeError("ошибка до отправки запроса")
+
+    # Слот освобожден: следующий пробный вызов проходит
+    with breaker.attempt():
+        breaker.record_success()
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_stale_probe_release_does_not_free_new_period_slot():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout_s=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+    stale = breaker.before_call()
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+
+    breaker.release_probe(stale)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("registry", failure_threshold=1, recovery_timeout_s=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+    return breaker
+
+
+def test_sync_client_non_transport_error_releases_probe():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise ValueError("неожиданная ошибка")
+
+    breaker = _half_open_breaker()
+    client = RegistryClient("http://registry", breaker=breaker)
+    client._client = httpx.Client(base_url="http://registry", transport=httpx.MockTransport(handler))
+    with pytest.raises(ValueError):
+        client.get_user_permission_groups("00000000-0000-0000-0000-000000000000")
+    assert breaker.state is CircuitState.HALF_OPEN
+    breaker.before_call()
+
+
+def test_async_client_cancelled_probe_releases_slot():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(10)
+        return httpx.Response(200, json=[])
+
+    async def main():
+        breaker = _half_open_breaker()
+        client = AsyncRegistryClient("http://registry", breaker=breaker)
+        client._client = httpx.AsyncClient(
+            base_url="http://registry", transport=httpx.MockTransport(handler)
+        )
+        task = asyncio.create_task(
+            client.get_user_permission_groups("00000000-0000-0000-0000-000000000000")
+        )
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert breaker.state is CircuitState.HALF_OPEN
+        breaker.before_call()
+
+    asyncio.run(main())
+
+
+def test_async_bulkhead_rejection_does_not_take_probe():
+    async def main():
+        gate = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await gate.wait()
+            return httpx.Response(200, json=[])
+
+        breaker = CircuitBreaker("registry")
+        client = AsyncRegistryClient("http://registry", breaker=breaker, max_concurrency=1)
+        client._bulkhead.acquire_timeout_s = 0.01
+        client._client = httpx.AsyncClient(
+            base_url="http://registry", transport=httpx.MockTransport(handler)
+        )
+        user_id = "00000000-0000-0000-0000-000000000000"
+        first = asyncio.create_task(client.get_user_permission_groups(user_id))
+        await asyncio.sleep(0.01)
+
+        # Цепь переходит в HALF_OPEN, пока единственный слот bulkhead'а занят
+        open_breaker(breaker)
+        breaker.recovery_timeout_s = 0.0
+        with pytest.raises(BulkheadFullError):
+            await client.get_user_permission_groups(user_id)
+        # Отказ bulkhead'а не занял пробный вызов
+        breaker.release_probe(breaker.before_call())
+        gate.set()
+        await first
+        assert breaker.state is CircuitState.CLOSED
+
+    asyncio.run(main())
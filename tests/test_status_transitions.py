@@ -0,0 +1,95 @@
+import uuid
+
+from common.enums import AccessAction, AccessRequestStatus
+from common.models.access_request import AccessRequest
+from common.models.user_permission import UserPermission
+from worker.app.core.db import SessionLocal
+from worker.app.services.requests import (
+    processing_allowed_from,
+    transition_request_status,
+    transition_requests_status,
+)
+
+
+USER_ID = uuid.UUID("6f1c1f0e-7d4c-4f43-9d4a-0d2b8f1c3a55")
+
+
+def create_request(status=AccessRequestStatus.PENDING, action=AccessAction.GRANT):
+    with SessionLocal() as db:
+        request = AccessRequest(
+            user_id=USER_ID,
+            permission_group_id=uuid.uuid4(),
+            action=action,
+            status=status,
+        )
+        db.add(request)
+        db.commit()
+        return request.id
+
+
+def test_claim_returns_request_once(db_tables):
+    request_id = create_request()
+
+    with SessionLocal() as db:
+        row = transition_request_status(db, request_id, AccessRequestStatus.PROCESSING)
+        assert (row.id, row.user_id, row.action) == (request_id, USER_ID, AccessAction.GRANT)
+        # Дубль сообщения проигрывает CAS
+        assert transition_request_status(db, request_id, AccessRequestStatus.PROCESSING) is None
+        db.commit()
+
+
+def test_redelivery_reclaims_processing_request(db_tables):
+    request_id = create_request(AccessRequestStatus.PROCESSING)
+
+    with SessionLocal() as db:
+        row = transition_request_status(
+            db,
+            request_id,
+            AccessRequestStatus.PROCESSING,
+            allowed_from=processing_allowed_from(redelivered=True),
+        )
+        assert row is not None
+
+
+def test_final_status_is_not_overwritten(db_tables):
+    request_id = create_request(AccessRequestStatus.APPROVED)
+
+    with SessionLocal() as db:
+        for allowed_from in (None, processing_allowed_from(redelivered=True)):
+            assert (
+                transition_request_status(
+                    db, request_id, AccessRequestStatus.PROCESSING, allowed_from=allowed_from
+                )
+                is None
+            )
+        assert (
+            transition_request_status(
+                db, request_id, AccessRequestStatus.REJECTED, "late"
+            )
+            is None
+        )
+        db.commit()
+        assert db.get(AccessRequest, request_id).status is AccessRequestStatus.APPROVED
+
+
+def test_batch_transition_updates_status_and_projection(db_tables):
+    grant_id = create_request(AccessRequestStatus.PROCESSING)
+    revoke_id = create_request(AccessRequestStatus.PROCESSING, AccessAction.REVOKE)
+    pending_id = create_request()
+
+    with SessionLocal() as db:
+        rows = transition_requests_status(
+            db, [grant_id, revoke_id, pending_id], AccessRequestStatus.APPROVED
+        )
+        db.commit()
+
+        assert set(rows) == {grant_id, revoke_id}
+        assert db.get(AccessRequest, pending_id).status is AccessRequestStatus.PENDING
+        projection = {
+            permission.group_id: permission.active
+            for permission in db.query(UserPermission).filter_by(user_id=USER_ID)
+        }
+        assert projection == {
+            rows[grant_id].permission_group_id: True,
+            rows[revoke_id].permission_group_id: False,
+        }
@@ -0,0 +1,35 @@
+import pytest
+
+from worker.app.core.config import settings
+from worker.app.workers import supervisor
+from worker.app.workers.supervisor import ConsumerSupervisor, assign_shards
+
+
+def test_shards_are_split_without_overlap():
+    shards = list(range(8))
+
+    assigned = [assign_shards(shards, index, 3) for index in range(3)]
+
+    assert assigned == [[0, 3, 6], [1, 4, 7], [2, 5]]
+
+
+def test_consumers_of_all_processes_cover_every_shard_once(monkeypatch):
+    monkeypatch.setattr(settings, "queue_shards", 8)
+    monkeypatch.setattr(settings, "shard_ids", "")
+
+    shards = [
+        consumer_shards
+        for process_index in range(2)
+        for consumer_shards in ConsumerSupervisor(
+            2, "/tmp/health", process_index=process_index, processes=2
+        ).shards
+    ]
+
+    assert shards == [[0, 4], [1, 5], [2, 6], [3, 7]]
+
+
+def test_more_consumers_than_shards_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "shard_ids", "0,1,2")
+
+    with pytest.raises(ValueError):
+        supervisor.run(consumers=2, processes=2)
@@ -0,0 +1,95 @@
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from ars.app.core.config import settings
+from ars.app.core.db import SessionLocal
+from common.enums import AccessAction, AccessRequestStatus
+from common.models.access_request import AccessRequest
+
+
+USER_ID = uuid.UUID("6f1c1f0e-7d4c-4f43-9d4a-0d2b8f1c3a55")
+
+
+@pytest.fixture(params=[False, True], ids=["pydantic", "fast_json"])
+def fast_json(request, monkeypatch):
+    monkeypatch.setattr(settings, "fast_json", request.param)
+
+
+@pytest.fixture
+def history(db_tables) -> list[uuid.UUID]:
+    """Пять заявок пользователя; id в ожидаемом порядке выдачи (от новых к старым)."""
+    started = datetime(2026, 1, 1)
+    requests = [
+        AccessRequest(
+            id=uuid.uuid4(),
+            user_id=USER_ID,
+            permission_group_id=uuid.uuid4(),
+            action=AccessAction.REVOKE if index % 2 else AccessAction.GRANT,
+            status=AccessRequestStatus.APPROVED,
+            # Две пары заявок с одинаковым временем: порядок внутри пары - по id
+            created_at=started + timedelta(seconds=index // 2),
+        )
+        for index in range(5)
+    ]
+    ordered = sorted(requests, key=lambda r: (r.created_at, r.id.hex), reverse=True)
+    expected = [request.id for request in ordered]
+    with SessionLocal() as db:
+        db.add_all(requests)
+        # Заявка другого пользователя в историю не попадает
+        db.add(
+            AccessRequest(
+                user_id=uuid.uuid4(),
+                permission_group_id=uuid.uuid4(),
+                action=AccessAction.GRANT,
+            )
+        )
+        db.commit()
+    return expected
+
+
+def test_pages_follow_next_cursor(ars, history, fast_json):
+    seen = []
+    url = f"/access-requests/user/{USER_ID}?limit=2"
+    pages = 0
+    while url:
+        resp = ars.get(url)
+        assert resp.status_code == 200
+        page = resp.json()
+        assert isinstance(page, list) and len(page) <= 2
+        seen.extend(uuid.UUID(item["id"]) for item in page)
+        pages += 1
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor is None:
+            assert "Link" not in resp.headers
+            break
+        link = resp.headers["Link"]
+        assert link.endswith('; rel="next"')
+        next_url = httpx.URL(link[1:link.index(">")])
+        assert next_url.params["cursor"] == cursor
+        url = next_url
+
+    assert pages == 3
+    assert seen == history
+
+
+def test_filters(ars, history):
+    resp = ars.get(f"/access-requests/user/{USER_ID}", params={"action": "REVOKE"})
+
+    assert resp.status_code == 200
+    assert "X-Next-Cursor" not in resp.headers
+    assert {item["action"] for item in resp.json()} == {"REVOKE"}
+    assert len(resp.json()) == 2
+
+    resp = ars.get(
+        f"/access-requests/user/{USER_ID}",
+        params={"created_from": "2026-01-01T00:00:01", "created_to": "2026-01-01T00:00:02"},
+    )
+    assert [uuid.UUID(item["id"]) for item in resp.json()] == history[1:3]
+
+
+def test_invalid_cursor(ars, history):
+    resp = ars.get(f"/access-requests/user/{USER_ID}", params={"cursor": "garbage"})
+    assert resp.status_code == 400
@@ -0,0 +1,255 @@
+import json
+import uuid
+
+from datetime import timedelta
+
+import httpx
+import pytest
+
+from common.clients.resilience import CircuitOpenError
+from common.clock import utcnow
+from common.enums import AccessAction, AccessRequestStatus
+from common.messaging import REDRIVEN_HEADER, RETRY_COUNT_HEADER
+from common.models.access_request import AccessRequest
+from common.models.user_permission import UserPermission
+from common.testing import StubMethod, StubProperties
+from worker.app.core.config import settings
+from worker.app.core.db import SessionLocal
+from worker.app.services.requests import SUPERSEDED_REASON
+
+
+USER_ID = uuid.UUID("6f1c1f0e-7d4c-4f43-9d4a-0d2b8f1c3a55")
+
+
+def create_request(
+    group_id,
+    action=AccessAction.GRANT,
+    status=AccessRequestStatus.PENDING,
+    created_at=None,
+):
+    with SessionLocal() as db:
+        request = AccessRequest(
+            user_id=USER_ID,
+            permission_group_id=group_id,
+            action=action,
+            status=status,
+            created_at=created_at or utcnow(),
+        )
+        db.add(request)
+        db.commit()
+        return request.id
+
+
+def get_request(request_id) -> AccessRequest:
+    with SessionLocal() as db:
+        return db.get(AccessRequest, request_id)
+
+
+def create_group(registry, name=None) -> uuid.UUID:
+    resp = registry.post(
+        "/admin/permission-groups", json={"name": name or f"group-{uuid.uuid4()}"}
+    )
+    resp.raise_for_status()
+    return uuid.UUID(resp.json()["id"])
+
+
+def message(request_id, delivery_tag=1, headers=None, redelivered=False):
+    method = StubMethod(delivery_tag)
+    method.redelivered = redelivered
+    body = json.dumps({"request_id": str(request_id), "user_id": str(USER_ID)}).encode()
+    return method, StubProperties(headers or {}), body
+
+
+def deliver(worker, request_id, **kwargs):
+    worker._on_message_callback(worker.channel, *message(request_id, **kwargs))
+
+
+def user_groups(registry) -> set[uuid.UUID]:
+    resp = registry.get(f"/internal/users/{USER_ID}/permission-groups")
+    resp.raise_for_status()
+    return {uuid.UUID(group["id"]) for group in resp.json()}
+
+
+def test_grant_of_unknown_group_is_rejected(worker):
+    request_id = create_request(uuid.uuid4())
+
+    deliver(worker, request_id)
+
+    request = get_request(request_id)
+    assert request.status is AccessRequestStatus.REJECTED
+    assert request.rejection_reason == "Permission group not found"
+    assert worker.channel.acked == 1
+    assert worker.channel.retried == 0
+
+
+def test_duplicate_message_is_acked_without_processing(worker, registry):
+    request_id = create_request(create_group(registry))
+
+    deliver(worker, request_id, delivery_tag=1)
+    deliver(worker, request_id, delivery_tag=2)
+
+    assert get_request(request_id).status is AccessRequestStatus.APPROVED
+    assert worker.channel.acked == 2
+
+
+def test_grant_projection_carries_group_name(worker, registry):
+    group_id = create_group(registry, "readers")
+    request_id = create_request(group_id)
+
+    deliver(worker, request_id)
+
+    assert get_request(request_id).status is AccessRequestStatus.APPROVED
+    with SessionLocal() as db:
+        permission = db.get(UserPermission, (USER_ID, group_id))
+    assert permission.active is True
+    assert permission.group_name == "readers"
+
+
+def test_processing_request_is_taken_only_on_redelivery(worker, registry):
+    group_id = create_group(registry)
+    request_id = create_request(group_id, status=AccessRequestStatus.PROCESSING)
+
+    # Первая доставка не забирает заявку, которую уже обрабатывает другой воркер
+    deliver(worker, request_id)
+    assert get_request(request_id).status is AccessRequestStatus.PROCESSING
+
+    # Redrive сбрасывает счетчик повторов, но оставляет маркер
+    deliver(worker, request_id, headers={REDRIVEN_HEADER: 1})
+    assert get_request(request_id).status is AccessRequestStatus.APPROVED
+    assert user_groups(registry) == {group_id}
+
+
+def test_registry_failure_schedules_retry(worker, registry, monkeypatch):
+    request_id = create_request(create_group(registry))
+
+    def unavailable(*args):
+        raise httpx.ConnectError("registry is down")
+
+    monkeypatch.setattr(worker.registry, "apply_access_change", unavailable)
+    deliver(worker, request_id)
+
+    assert worker.channel.retried == 1
+    assert get_request(request_id).status is AccessRequestStatus.PROCESSING
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        httpx.ConnectError("registry is down"),
+        httpx.HTTPStatusError(
+            "unavailable",
+            request=httpx.Request("POST", "http://registry"),
+            response=httpx.Response(503),
+        ),
+        CircuitOpenError("registry", retry_after=5.0),
+    ],
+)
+def test_legacy_registry_failure_schedules_retry(worker, registry, monkeypatch, error):
+    monkeypatch.setattr(settings, "use_apply_endpoint", False)
+    request_id = create_request(create_group(registry))
+
+    def unavailable(*args):
+        raise error
+
+    monkeypatch.setattr(worker.registry, "grant_permission_group", unavailable)
+    deliver(worker, request_id)
+
+    assert worker.channel.retried == 1
+    assert get_request(request_id).status is AccessRequestStatus.PROCESSING
+
+
+def test_legacy_registry_client_error_rejects(worker, registry, monkeypatch):
+    monkeypatch.setattr(settings, "use_apply_endpoint", False)
+    request_id = create_request(create_group(registry))
+
+    def bad_request(*args):
+        raise httpx.HTTPStatusError(
+            "bad request",
+            request=httpx.Request("POST", "http://registry"),
+            response=httpx.Response(400),
+        )
+
+    monkeypatch.setattr(worker.registry, "grant_permission_group", bad_request)
+    deliver(worker, request_id)
+
+    assert worker.channel.retried == 0
+    assert get_request(request_id).status is AccessRequestStatus.REJECTED
+
+
+def test_retried_grant_does_not_override_later_revoke(worker, registry):
+    group_id = create_group(registry)
+    created_at = utcnow()
+    grant_id = create_request(group_id, created_at=created_at)
+    revoke_id = create_request(
+        group_id, AccessAction.REVOKE, created_at=created_at + timedelta(seconds=1)
+    )
+
+    # GRANT ушел на отложенный повтор, REVOKE обработан раньше него
+    with SessionLocal() as db:
+        db.get(AccessRequest, grant_id).status = AccessRequestStatus.PROCESSING
+        db.commit()
+    deliver(worker, revoke_id, delivery_tag=1)
+    deliver(worker, grant_id, delivery_tag=2, headers={RETRY_COUNT_HEADER: 1})
+
+    grant = get_request(grant_id)
+    assert grant.status is AccessRequestStatus.REJECTED
+    assert grant.rejection_reason == SUPERSEDED_REASON
+    assert get_request(revoke_id).status is AccessRequestStatus.APPROVED
+    assert user_groups(registry) == set()
+
+
+def test_batch_rejects_superseded_retry(worker, registry):
+    group_id = create_group(registry)
+    created_at = utcnow()
+    grant_id = create_request(
+        group_id, status=AccessRequestStatus.PROCESSING, created_at=created_at
+    )
+    create_request(
+        group_id,
+        AccessAction.REVOKE,
+        status=AccessRequestStatus.APPROVED,
+        created_at=created_at + timedelta(seconds=1),
+    )
+    other_id = create_request(create_group(registry))
+
+    results = worker._process_batch(
+        [
+            message(grant_id, delivery_tag=1, redelivered=True),
+            message(other_id, delivery_tag=2),
+        ]
+    )
+
+    assert results == {1: (True, False), 2: (True, False)}
+    grant = get_request(grant_id)
+    assert grant.status is AccessRequestStatus.REJECTED
+    assert grant.rejection_reason == SUPERSEDED_REASON
+    assert get_request(other_id).status is AccessRequestStatus.APPROVED
+
+
+def test_batch_retried_grant_does_not_override_later_revoke(worker, registry):
+    group_id = create_group(registry)
+    registry.post(
+        f"/internal/users/{USER_ID}/permission-groups/{group_id}/grant"
+    ).raise_for_status()
+    created_at = utcnow()
+    grant_id = create_request(
+        group_id, status=AccessRequestStatus.PROCESSING, created_at=created_at
+    )
+    revoke_id = create_request(
+        group_id, AccessAction.REVOKE, created_at=created_at + timedelta(seconds=1)
+    )
+
+    # Повтор GRANT пришел в одном пакете после более поздней REVOKE
+    results = worker._process_batch(
+        [
+            message(revoke_id, delivery_tag=1),
+            message(grant_id, delivery_tag=2, redelivered=True),
+        ]
+    )
+
+    assert results == {1: (True, False), 2: (True, False)}
+    grant = get_request(grant_id)
+    assert grant.status is AccessRequestStatus.REJECTED
+    assert grant.rejection_reason == f"Заменена заявкой {revoke_id}"
+    assert get_request(revoke_id).status is AccessRequestStatus.APPROVED
+    assert user_groups(registry) == set()
@@ -1,5 +1,7 @@
 from pydantic_settings import BaseSettings
 
+from common.db.urls import async_database_url
+
 
 class Settings(BaseSettings):
     database_url: str
@@ -12,6 +14,51 @@ class Settings(BaseSettings):
 
     registry_service_url: str
 
+    # Таймауты, circuit breaker и bulkhead для запросов в Registry
+    registry_connect_timeout_s: float = 2.0
+    registry_read_timeout_s: float = 10.0
+    registry_breaker_failure_threshold: int = 5
+    registry_breaker_recovery_s: float = 30.0
+    registry_max_concurrency: int = 10
+
+    # Пул соединений с БД на процесс; supervisor подгоняет pool_size под число консьюмеров
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+
+    # Файл состояния supervisor'а (для healthcheck) и допустимый возраст записи, сек
+    health_file: str = "/tmp/ars-worker-health.json"
+    health_max_age_s: float = 30.0
+
+    # Шардирование очереди: queue_shards должно совпадать с ARS.
+    # shard_ids - какие шарды слушает этот воркер ("0,1,2"), пусто - все.
+    queue_shards: int = 8
+    shard_ids: str = ""
+
+    # Пакетный режим: batch_size=1 - обработка по одному сообщению
+    batch_size: int = 1
+    batch_timeout_ms: int = 200
+    # Схлопывать повторные и взаимоотменяющие заявки внутри пакета
+    coalesce_batches: bool = True
+
+    # Проверка конфликтов и выдача / отзыв одним запросом к Registry (.../apply).
+    # False - прежняя цепочка запросов с локальной матрицей конфликтов.
+    use_apply_endpoint: bool = True
+
+    # Задержки повторов при ошибках (мс) и число повторов до парковки в DLQ.
+    # Если повторов больше, чем задержек, используется последняя задержка.
+    retry_delays_ms: str = "1000,10000,60000"
+    max_retries: int = 5
+
+    # Как часто перепроверять версию матрицы конфликтов в Registry, сек
+    conflict_matrix_refresh_s: float = 5.0
+
+    # Asyncio-режим: сколько заявок обрабатывается одновременно
+    max_in_flight: int = 32
+    shutdown_timeout_s: float = 30.0
+
+    # Порт HTTP-endpoint'а метрик Prometheus (/metrics), 0 - не запускать
+    metrics_port: int = 9100
+
     class Config:
         env_file = ".env"
 
@@ -22,5 +69,20 @@ class Settings(BaseSettings):
             f"@{self.rabbitmq_host}:{self.rabbitmq_port}{self.rabbitmq_vhost}"
         )
 
+    @property
+    def consumed_shards(self) -> list[int]:
+        if not self.shard_ids.strip():
+            return list(range(self.queue_shards))
+        return [int(shard) for shard in self.shard_ids.split(",") if shard.strip()]
+
+    @property
+    def retry_delays(self) -> list[int]:
+        return [int(delay) for delay in self.retry_delays_ms.split(",") if delay.strip()]
+
+    @property
+    def async_database_url(self) -> str:
+        """URL БД с асинхронным драйвером (asyncpg / aiosqlite)."""
+        return async_database_url(self.database_url)
+
 
 settings = Settings()
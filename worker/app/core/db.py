@@ -1,7 +1,63 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker
 
 from worker.app.core.config import settings
 
-engine = create_engine(settings.database_url)
+engine = create_engine(
+    settings.database_url,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+)
 SessionLocal = sessionmaker(bind=engine)
+
+# Асинхронный движок для asyncio-воркера: создается при первом обращении,
+# синхронные процессы его не открывают
+_async_engine: AsyncEngine | None = None
+_async_sessionmaker: async_sessionmaker[AsyncSession] | None = None
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            settings.async_database_url,
+            pool_size=settings.max_in_flight,
+        )
+        _async_sessionmaker = async_sessionmaker(bind=_async_engine, expire_on_commit=False)
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    get_async_engine()
+    return _async_sessionmaker()
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_sessionmaker = None
+
+
+def configure_pool(pool_size: int) -> None:
+    """
+    Пересоздает синхронный движок с пулом на pool_size соединений.
+
+    Используется supervisor'ом: все консьюмеры процесса делят один пул,
+    по соединению на консьюмера плюс settings.db_max_overflow запасных.
+    """
+    global engine
+    engine.dispose()
+    engine = create_engine(
+        settings.database_url,
+        pool_size=pool_size,
+        max_overflow=settings.db_max_overflow,
+    )
+    SessionLocal.configure(bind=engine)
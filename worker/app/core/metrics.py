@@ -0,0 +1,134 @@
+"""
+Метрики Worker'а в формате Prometheus.
+
+Endpoint /metrics поднимается на settings.metrics_port. В режиме
+нескольких процессов (--processes) метрики детей агрегируются через
+multiprocess-режим prometheus_client: нужна переменная окружения
+PROMETHEUS_MULTIPROC_DIR (пустой каталог), endpoint поднимает родитель.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    multiprocess,
+    start_http_server,
+)
+
+from common.messaging import PUBLISHED_AT_HEADER, retry_count
+
+
+logger = logging.getLogger(__name__)
+
+_MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# Стадии обработки заявки
+STAGE_CLAIM = "claim"  # CAS -> PROCESSING и commit
+STAGE_CONFLICT_CHECK = "conflict_check"  # проверка конфликтов (без apply-endpoint'а)
+STAGE_REGISTRY = "registry"  # выдача / отзыв в Registry
+STAGE_FINALIZE = "finalize"  # CAS -> APPROVED / REJECTED и commit
+STAGE_TOTAL = "total"  # сообщение (или пакет) целиком
+
+# Итоги обработки сообщений
+OUTCOME_APPROVED = "approved"
+OUTCOME_REJECTED = "rejected"
+OUTCOME_REQUEUED = "requeued"  # отложенный повтор
+OUTCOME_DROPPED = "dropped"  # отброшено в DLQ
+OUTCOME_DUPLICATE = "duplicate"  # заявка уже финализирована или в обработке
+
+_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+_QUEUE_WAIT_BUCKETS = (
+    0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "ars_worker_stage_seconds",
+    "Длительность стадий обработки заявки",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "ars_worker_queue_wait_seconds",
+    "Время от публикации сообщения в ARS до начала обработки",
+    buckets=_QUEUE_WAIT_BUCKETS,
+)
+MESSAGES_TOTAL = Counter(
+    "ars_worker_messages_total",
+    "Обработанные сообщения по итогам",
+    ["outcome"],
+)
+IN_FLIGHT = Gauge(
+    "ars_worker_in_flight",
+    "Сообщения, находящиеся в обработке",
+    multiprocess_mode="livesum",
+)
+
+
+# Дополнительные получатели замеров стадий (например, бенчмарк с перцентилями)
+_stage_observers: list[Callable[[str, float], None]] = []
+
+
+def add_stage_observer(observer: Callable[[str, float], None]) -> None:
+    _stage_observers.append(observer)
+
+
+@contextmanager
+def stage(name: str):
+    """Замеряет длительность стадии."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        for observer in _stage_observers:
+            observer(name, elapsed)
+
+
+def count(outcome: str, amount: int = 1) -> None:
+    if amount:
+        MESSAGES_TOTAL.labels(outcome).inc(amount)
+
+
+def observe_queue_wait(headers: Optional[dict]) -> None:
+    """
+    Время ожидания в очереди по заголовку x-published-at.
+
+    Отложенные повторы не учитываются: их ожидание - это задержка повтора.
+    """
+    headers = headers or {}
+    published_at_ms = headers.get(PUBLISHED_AT_HEADER)
+    if published_at_ms is None or retry_count(headers) > 0:
+        return
+    QUEUE_WAIT_SECONDS.observe(max(0.0, time.time() - int(published_at_ms) / 1000))
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get(_MULTIPROC_DIR_ENV))
+
+
+def mark_process_dead(pid: int) -> None:
+    """Удаляет live-метрики завершившегося процесса (multiprocess-режим)."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
+
+
+def start_metrics_server(port: int) -> None:
+    """Поднимает /metrics в фоновом потоке; port=0 - метрики не публикуются."""
+    if port <= 0:
+        return
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(port, registry=registry)
+    else:
+        start_http_server(port)
+    logger.info(f"Метрики Prometheus доступны на :{port}/metrics")
@@ -6,10 +6,52 @@ import pika
 from pika.exceptions import AMQPConnectionError, AMQPChannelError
 
 from worker.app.core.config import settings
+from common.messaging import (
+    RETRY_COUNT_HEADER,
+    RETRY_DELAY_HEADER,
+    declare_topology as _declare_topology,
+    declare_topology_async as _declare_topology_async,
+    retry_count,
+)
 
 logger = logging.getLogger(__name__)
 
-ACCESS_REQUEST_QUEUE = "access_request_created"
+
+def next_retry_delay(headers: dict | None) -> int | None:
+    """Задержка следующего повтора, мс. None - попытки исчерпаны, сообщение в DLQ."""
+    attempt = retry_count(headers)
+    delays = settings.retry_delays
+    if attempt >= settings.max_retries or not delays:
+        return None
+    return delays[min(attempt, len(delays) - 1)]
+
+
+def retry_headers(headers: dict | None, delay_ms: int) -> dict:
+    """Заголовки копии сообщения, отправляемой на отложенный повтор."""
+    return {
+        **(headers or {}),
+        RETRY_COUNT_HEADER: retry_count(headers) + 1,
+        RETRY_DELAY_HEADER: str(delay_ms),
+    }
+
+
+def declare_topology(channel, shards: list[int] | None = None) -> list[str]:
+    """
+    Объявляет топологию заявок; возвращает имена очередей шардов этого воркера:
+    shards или, если не заданы, settings.consumed_shards.
+    """
+    queues = _declare_topology(channel, settings.queue_shards, settings.retry_delays)
+    if shards is None:
+        shards = settings.consumed_shards
+    return [queues[shard] for shard in shards]
+
+
+async def declare_topology_async(channel, shards: list[int] | None = None) -> list:
+    """То же, что declare_topology, для канала aio-pika. Возвращает очереди шардов."""
+    queues = await _declare_topology_async(channel, settings.queue_shards, settings.retry_delays)
+    if shards is None:
+        shards = settings.consumed_shards
+    return [queues[shard] for shard in shards]
 
 
 class RabbitMQPublisher:
@@ -25,7 +67,7 @@ class RabbitMQPublisher:
                 parameters = pika.URLParameters(settings.rabbitmq_url)
                 self._connection = pika.BlockingConnection(parameters)
                 self._channel = self._connection.channel()
-                self._channel.queue_declare(queue=ACCESS_REQUEST_QUEUE, durable=True)
+                declare_topology(self._channel)
                 logger.info("Подключение к RabbitMQ установлено")
             except (AMQPConnectionError, AMQPChannelError) as e:
                 logger.error(f"Ошибка подключения к RabbitMQ: {e}")
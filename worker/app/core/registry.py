@@ -0,0 +1,31 @@
+from common.clients.registry_client import AsyncRegistryClient, RegistryClient
+from common.clients.resilience import CircuitBreaker
+from worker.app.core.config import settings
+
+# Общий для всех консьюмеров процесса: если Registry недоступен,
+# останавливаются все, а не каждый по отдельности
+registry_breaker = CircuitBreaker(
+    "registry",
+    failure_threshold=settings.registry_breaker_failure_threshold,
+    recovery_timeout_s=settings.registry_breaker_recovery_s,
+)
+
+
+def make_registry_client() -> RegistryClient:
+    return RegistryClient(
+        settings.registry_service_url,
+        connect_timeout_s=settings.registry_connect_timeout_s,
+        read_timeout_s=settings.registry_read_timeout_s,
+        breaker=registry_breaker,
+        max_concurrency=settings.registry_max_concurrency,
+    )
+
+
+def make_async_registry_client() -> AsyncRegistryClient:
+    return AsyncRegistryClient(
+        settings.registry_service_url,
+        connect_timeout_s=settings.registry_connect_timeout_s,
+        read_timeout_s=settings.registry_read_timeout_s,
+        breaker=registry_breaker,
+        max_concurrency=settings.registry_max_concurrency,
+    )
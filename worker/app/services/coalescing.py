@@ -0,0 +1,50 @@
+import uuid
+from typing import Any, NamedTuple
+
+from common.enums import AccessAction
+
+
+class CoalescedBatch(NamedTuple):
+    # Заявки, которые нужно применить в Registry, в исходном порядке
+    to_apply: list[tuple[uuid.UUID, Any]]
+    # Более ранние (по created_at) заявки с тем же действием: id оставшейся
+    # заявки -> id дублей. Получают тот же итоговый статус, что и оставшаяся заявка.
+    duplicates: dict[uuid.UUID, list[uuid.UUID]]
+    # Более ранние (по created_at) заявки с противоположным действием: id
+    # оставшейся заявки -> id заявок, которые она отменяет.
+    superseded: dict[uuid.UUID, list[uuid.UUID]]
+
+
+def coalesce_requests(requests: list[tuple[uuid.UUID, Any]]) -> CoalescedBatch:
+    """
+    Схлопывает заявки пакета по (user_id, permission_group_id).
+
+    Итоговое намерение определяет последняя по (created_at, id) заявка:
+    GRANT, GRANT -> один GRANT; GRANT, REVOKE -> только REVOKE. Порядок
+    доставки для этого не годится: повтор более ранней заявки (retry, redrive)
+    может прийти в одном пакете после более поздней.
+    """
+    last: dict[tuple[uuid.UUID, uuid.UUID], tuple[uuid.UUID, Any]] = {}
+    for request_id, request in requests:
+        key = (request.user_id, request.permission_group_id)
+        current = last.get(key)
+        if current is None or (request.created_at, request_id) > (
+            current[1].created_at,
+            current[0],
+        ):
+            last[key] = (request_id, request)
+
+    to_apply = []
+    duplicates: dict[uuid.UUID, list[uuid.UUID]] = {}
+    superseded: dict[uuid.UUID, list[uuid.UUID]] = {}
+
+    for request_id, request in requests:
+        survivor_id, survivor = last[(request.user_id, request.permission_group_id)]
+        if survivor_id == request_id:
+            to_apply.append((request_id, request))
+        elif AccessAction(request.action) is AccessAction(survivor.action):
+            duplicates.setdefault(survivor_id, []).append(request_id)
+        else:
+            superseded.setdefault(survivor_id, []).append(request_id)
+
+    return CoalescedBatch(to_apply, duplicates, superseded)
@@ -0,0 +1,78 @@
+import logging
+import time
+import uuid
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class ConflictMatrix:
+    """
+    Кеш матрицы конфликтов групп прав в памяти воркера.
+
+    Загружается из Registry при старте и обновляется условным запросом
+    (If-None-Match, since) не чаще раза в refresh_interval_s: Registry отвечает
+    304 или только изменениями после версии кеша. Проверка конфликта -
+    пересечение множеств без похода в Registry.
+    """
+
+    def __init__(self, refresh_interval_s: float):
+        self.refresh_interval_s = refresh_interval_s
+        self.version: str | None = None
+        self._conflicts: dict[str, set[str]] = {}
+        self._checked_at = float("-inf")
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.refresh_interval_s
+
+    def apply(self, data: dict | None) -> None:
+        """Применяет ответ Registry; None - матрица не изменилась."""
+        self._checked_at = time.monotonic()
+        if data is None:
+            return
+
+        # Как и в Registry: новая группа конфликтует с текущей группой g,
+        # если есть запись (group_id=g, conflicts_with_id=новая)
+        changes = data.get("changes")
+        if changes is None:
+            conflicts: dict[str, set[str]] = defaultdict(set)
+            for pair in data["conflicts"]:
+                conflicts[str(pair["conflicts_with_id"])].add(str(pair["group_id"]))
+            self._conflicts = dict(conflicts)
+            logger.info(
+                f"Матрица конфликтов загружена: версия {data['version']}, "
+                f"{len(data['conflicts'])} записей"
+            )
+        else:
+            # Изменения идут в порядке версий; повторное применение ничего не меняет
+            for change in changes:
+                key = str(change["conflicts_with_id"])
+                group_id = str(change["group_id"])
+                if not change.get("removed"):
+                    self._conflicts.setdefault(key, set()).add(group_id)
+                    continue
+                conflicting = self._conflicts.get(key)
+                if conflicting is not None:
+                    conflicting.discard(group_id)
+                    if not conflicting:
+                        del self._conflicts[key]
+            logger.info(
+                f"Матрица конфликтов обновлена: версия {data['version']}, "
+                f"{len(changes)} изменений"
+            )
+        self.version = data["version"]
+
+    def conflicts_of(self, group_id: uuid.UUID | str) -> set[str]:
+        """Группы, наличие которых у пользователя запрещает выдачу group_id."""
+        return self._conflicts.get(str(group_id), set())
+
+    def has_conflict(
+        self, current_group_ids: list[uuid.UUID | str], new_group_id: uuid.UUID | str
+    ) -> bool:
+        conflicting = self.conflicts_of(new_group_id)
+        return any(str(group_id) in conflicting for group_id in current_group_ids)
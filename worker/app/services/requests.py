@@ -1,29 +1,229 @@
 import logging
+import uuid
+from typing import Iterable, Mapping
 
+from sqlalchemy import Row, func, select, update
 from sqlalchemy.orm import Session
 
+from common.clock import utcnow
+from common.db.upsert import dialect_insert
+from common.enums import AccessAction
+from common.messaging import ACCESS_REQUEST_STATUS_CHANNEL, PERMISSIONS_CHANGED_CHANNEL
 from common.models.access_request import AccessRequest, AccessRequestStatus
+from common.models.user_permission import UserPermission
 
 logger = logging.getLogger(__name__)
 
 
+# Из каких статусов допустим переход в целевой статус.
+# PROCESSING -> PROCESSING разрешается только для повторной доставки
+# (воркер упал, не дойдя до финального статуса), см. redelivered.
+ALLOWED_TRANSITIONS: dict[AccessRequestStatus, tuple[AccessRequestStatus, ...]] = {
+    AccessRequestStatus.PROCESSING: (AccessRequestStatus.PENDING,),
+    AccessRequestStatus.APPROVED: (AccessRequestStatus.PROCESSING,),
+    AccessRequestStatus.REJECTED: (AccessRequestStatus.PROCESSING,),
+}
+
+
+def processing_allowed_from(redelivered: bool) -> tuple[AccessRequestStatus, ...]:
+    """Исходные статусы для перехода в PROCESSING с учетом повторной доставки."""
+    if redelivered:
+        return AccessRequestStatus.PENDING, AccessRequestStatus.PROCESSING
+    return ALLOWED_TRANSITIONS[AccessRequestStatus.PROCESSING]
+
+
+# Причина отклонения заявки, обогнанной более поздней одобренной заявкой
+SUPERSEDED_REASON = "Заменена более поздней заявкой"
+
+
+def superseded_requests(db: Session, rows: Iterable[Row]) -> set[uuid.UUID]:
+    """
+    Заявки, после которых уже одобрена более поздняя заявка на ту же пару
+    (user_id, permission_group_id).
+
+    Отложенный повтор и redrive возвращают сообщение в шард после следующих
+    заявок пользователя: примененная поверх них старая заявка перевернула бы
+    итоговое состояние прав (GRANT после более позднего REVOKE).
+    """
+    superseded = set()
+    for row in rows:
+        newer = db.scalar(
+            select(AccessRequest.id)
+            .where(
+                AccessRequest.user_id == row.user_id,
+                AccessRequest.permission_group_id == row.permission_group_id,
+                AccessRequest.status == AccessRequestStatus.APPROVED,
+                AccessRequest.created_at > row.created_at,
+            )
+            .limit(1)
+        )
+        if newer is not None:
+            superseded.add(row.id)
+    return superseded
+
+
 def get_access_request(db: Session, request_id: str) -> AccessRequest | None:
     return db.query(AccessRequest).filter(AccessRequest.id == request_id).one_or_none()
 
 
-def update_request_status(
+def transition_requests_status(
     db: Session,
-    request_id: str,
+    request_ids: Iterable[uuid.UUID],
     status: AccessRequestStatus,
     rejection_reason: str | None = None,
-) -> AccessRequest:
-    req = get_access_request(db, request_id)
-    if not req:
-        raise ValueError(f"Заявка {request_id} не найдена")
+    allowed_from: Iterable[AccessRequestStatus] | None = None,
+    group_names: Mapping[uuid.UUID, str] | None = None,
+) -> dict[uuid.UUID, Row]:
+    """
+    Compare-and-set перевод статуса пачки заявок одним UPDATE:
 
-    req.status = status
+        UPDATE access_requests SET status = :status
+        WHERE id IN (:ids) AND status IN (:allowed_from)
+        RETURNING id, user_id, permission_group_id, action, created_at
+
+    Возвращает строки заявок, для которых переход выполнен. Заявки, которых
+    нет в результате, проиграли CAS: их нет в БД или статус уже другой
+    (например, дубль сообщения). Коммит - на стороне вызывающего.
+
+    При переходе в APPROVED в той же транзакции обновляется проекция прав
+    user_permissions; group_names - известные имена групп (из ответов Registry).
+    """
+    request_ids = list(request_ids)
+    if not request_ids:
+        return {}
+
+    if allowed_from is None:
+        allowed_from = ALLOWED_TRANSITIONS[status]
+
+    values = {"status": status}
     if rejection_reason:
-        req.rejection_reason = rejection_reason
+        values["rejection_reason"] = rejection_reason
+
+    rows = db.execute(
+        update(AccessRequest)
+        .where(
+            AccessRequest.id.in_(request_ids),
+            AccessRequest.status.in_(list(allowed_from)),
+        )
+        .values(**values)
+        .returning(
+            AccessRequest.id,
+            AccessRequest.user_id,
+            AccessRequest.permission_group_id,
+            AccessRequest.action,
+            AccessRequest.created_at,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    logger.info(
+        f"Статус {len(rows)} из {len(request_ids)} заявок обновлен на {status}"
+    )
+    notify_status_changed(db, status, [row.id for row in rows])
+    if status == AccessRequestStatus.APPROVED:
+        # RETURNING не сохраняет порядок: применяем в порядке request_ids
+        order = {request_id: index for index, request_id in enumerate(request_ids)}
+        apply_to_permissions_projection(
+            db, sorted(rows, key=lambda row: order[row.id]), group_names
+        )
+        notify_permissions_changed(db, {row.user_id for row in rows})
+    return {row.id: row for row in rows}
+
+
+def apply_to_permissions_projection(
+    db: Session,
+    rows: Iterable[Row],
+    group_names: Mapping[uuid.UUID, str] | None = None,
+) -> None:
+    """
+    Применяет одобренные заявки к проекции прав одним upsert'ом.
+
+    GRANT -> active=True, REVOKE -> active=False; для одной пары
+    (user_id, permission_group_id) выигрывает последняя заявка. Имя группы
+    берется из group_names; неизвестное имя не затирает записанное
+    (его заполнит сверка со снимком Registry).
+    """
+    group_names = group_names or {}
+    now = utcnow()
+    latest = {
+        (row.user_id, row.permission_group_id): AccessAction(row.action) is AccessAction.GRANT
+        for row in rows
+    }
+    if not latest:
+        return
+
+    insert = dialect_insert(db.get_bind().dialect.name)
+    stmt = insert(UserPermission).values(
+        [
+            {
+                "user_id": user_id,
+                "group_id": group_id,
+                "group_name": group_names.get(group_id),
+                "active": active,
+                "updated_at": now,
+            }
+            for (user_id, group_id), active in latest.items()
+        ]
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[UserPermission.user_id, UserPermission.group_id],
+            set_={
+                "active": stmt.excluded.active,
+                "updated_at": stmt.excluded.updated_at,
+                "group_name": func.coalesce(stmt.excluded.group_name, UserPermission.group_name),
+            },
+        )
+    )
+
+
+# NOTIFY payload ограничен 8000 байт: ~200 id заявок в одном уведомлении
+_NOTIFY_IDS_PER_PAYLOAD = 200
+
+
+def _notify(db: Session, channel: str, payloads: Iterable[str]) -> None:
+    """
+    Postgres NOTIFY в текущей транзакции: слушатели получат уведомления
+    только после commit'а. Вне Postgres не отправляется - ARS в этом
+    случае обходится без уведомлений (TTL кеша, опрос БД).
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for payload in payloads:
+        db.execute(select(func.pg_notify(channel, payload)))
+
+
+def notify_status_changed(
+    db: Session, status: AccessRequestStatus, request_ids: list[uuid.UUID]
+) -> None:
+    """Будит ожидающих статуса заявок в ARS (long-poll, SSE): "STATUS|id,id,..."."""
+    payloads = [
+        f"{status.value}|"
+        + ",".join(str(request_id) for request_id in request_ids[start:start + _NOTIFY_IDS_PER_PAYLOAD])
+        for start in range(0, len(request_ids), _NOTIFY_IDS_PER_PAYLOAD)
+    ]
+    _notify(db, ACCESS_REQUEST_STATUS_CHANNEL, payloads)
+
+
+def notify_permissions_changed(db: Session, user_ids: Iterable[uuid.UUID]) -> None:
+    """Сбрасывает кеш прав пользователей в ARS."""
+    _notify(db, PERMISSIONS_CHANGED_CHANNEL, (str(user_id) for user_id in user_ids))
+
+
+def transition_request_status(
+    db: Session,
+    request_id: uuid.UUID,
+    status: AccessRequestStatus,
+    rejection_reason: str | None = None,
+    allowed_from: Iterable[AccessRequestStatus] | None = None,
+    group_names: Mapping[uuid.UUID, str] | None = None,
+) -> Row | None:
+    """
+    Compare-and-set перевод статуса одной заявки.
 
-    logger.info(f"Статус заявки {request_id} обновлен на {status}")
-    return req
+    None - CAS проигран: заявки нет или она не в допустимом исходном статусе.
+    """
+    rows = transition_requests_status(
+        db, [request_id], status, rejection_reason, allowed_from, group_names
+    )
+    return rows.get(request_id)
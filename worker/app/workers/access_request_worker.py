@@ -1,20 +1,34 @@
+import argparse
 import json
 import logging
 import signal
+import sys
 import uuid
+from collections import defaultdict
 from typing import Optional, Any
 
+import httpx
 import pika
 from pika.adapters.blocking_connection import BlockingChannel
-from sqlalchemy.orm import Session
 
+from worker.app.core import metrics
 from worker.app.core.config import settings
 from worker.app.core.db import SessionLocal
-from worker.app.core.rabbitmq import ACCESS_REQUEST_QUEUE
+from worker.app.core.rabbitmq import declare_topology, next_retry_delay, retry_headers
+from worker.app.core.registry import make_registry_client, registry_breaker
 from common.enums import AccessAction
+from common.messaging import ACCESS_REQUEST_RETRY_EXCHANGE, is_redelivery, retry_count
 from common.models.access_request import AccessRequestStatus
-from common.clients.registry_client import RegistryClient
-from worker.app.services.requests import get_access_request, update_request_status
+from common.clients.resilience import CircuitState
+from worker.app.services.coalescing import CoalescedBatch, coalesce_requests
+from worker.app.services.conflicts import ConflictMatrix
+from worker.app.services.requests import (
+    SUPERSEDED_REASON,
+    processing_allowed_from,
+    superseded_requests,
+    transition_request_status,
+    transition_requests_status,
+)
 
 
 logging.basicConfig(
@@ -25,36 +39,114 @@ logger = logging.getLogger(__name__)
 
 
 class AccessRequestWorker:
-    def __init__(self):
-        self.registry = RegistryClient(settings.registry_service_url)
+    def __init__(self, shards: list[int] | None = None):
+        # Шарды этого консьюмера; None - settings.consumed_shards
+        self.shards = shards
+        self.registry = make_registry_client()
+        self.conflict_matrix = ConflictMatrix(settings.conflict_matrix_refresh_s)
+        # Имена групп из ответов Registry - для проекции прав ARS
+        self.group_names: dict[uuid.UUID, str] = {}
         self.connection: Optional[pika.BlockingConnection] = None
         self.channel: Optional[BlockingChannel] = None
+        self.queues: list[str] = []
+        self._consumer_tags: list[str] = []
+        self._paused = False
         self._stop_requested = False
 
+        # Буфер пакетного режима: (method, properties, body)
+        self._batch: list[tuple[Any, Any, bytes]] = []
+        self._batch_timer: Any = None
+
+    @property
+    def batch_mode(self) -> bool:
+        return settings.batch_size > 1
+
     def _connect(self) -> None:
         """Установка соединения с RabbitMQ."""
         self.registry.close()
-        self.registry = RegistryClient(settings.registry_service_url)
+        self.registry = make_registry_client()
 
         params = pika.URLParameters(settings.rabbitmq_url)
         self.connection = pika.BlockingConnection(params)
         self.channel = self.connection.channel()
         
-        # Durable=True гарантирует сохранность очереди при перезагрузке RabbitMQ
-        self.channel.queue_declare(queue=ACCESS_REQUEST_QUEUE, durable=True)
-        # Prefetch=1 для равномерного распределения задач
-        self.channel.basic_qos(prefetch_count=1)
+        # Durable-очереди шардов; на каждом шарде активен один потребитель,
+        # поэтому заявки одного пользователя не обрабатываются параллельно
+        self.queues = declare_topology(self.channel, self.shards)
+        # Prefetch=1 для равномерного распределения задач,
+        # в пакетном режиме - по размеру пакета
+        self.channel.basic_qos(prefetch_count=settings.batch_size)
+        self._batch = []
+        self._batch_timer = None
+        self._consumer_tags = []
+        self._paused = False
         
         logger.info("Успешное подключение к RabbitMQ")
 
-    def _update_status(self, db: Session, request_id: uuid.UUID, status: AccessRequestStatus, reason: Optional[str] = None):
-        """Вспомогательный метод для обновления статуса в БД."""
+    def _refresh_conflict_matrix(self):
+        """Обновляет матрицу конфликтов, если истек интервал проверки."""
+        if not self.conflict_matrix.is_stale:
+            return
         try:
-            update_request_status(db, str(request_id), status, rejection_reason=reason)
-            db.commit()
+            self.conflict_matrix.apply(
+                self.registry.get_conflict_matrix(self.conflict_matrix.version)
+            )
         except Exception as e:
-            db.rollback()
-            logger.error(f"Ошибка обновления статуса {request_id} на {status}: {e}")
+            logger.warning(f"Не удалось обновить матрицу конфликтов: {e}")
+
+    def _check_conflicts(self, request: Any) -> tuple[bool, Optional[str]]:
+        """
+        Проверяет конфликт по локальной матрице.
+
+        Текущие группы пользователя запрашиваются, только если новая группа
+        вообще с чем-то конфликтует. Без загруженной матрицы - проверка в Registry.
+        """
+        self._refresh_conflict_matrix()
+
+        if not self.conflict_matrix.loaded:
+            current_groups = self.registry.get_user_permission_groups(
+                request.user_id
+            )
+            group_ids = [g["id"] for g in current_groups]
+            return self.registry.check_conflicts(
+                group_ids,
+                request.permission_group_id,
+            )
+
+        if not self.conflict_matrix.conflicts_of(request.permission_group_id):
+            return False, None
+
+        current_groups = self.registry.get_user_permission_groups(
+            request.user_id
+        )
+        if self.conflict_matrix.has_conflict(
+            [g["id"] for g in current_groups],
+            request.permission_group_id,
+        ):
+            return True, "Permission group conflict"
+        return False, None
+
+    def _apply_access_change(self, request: Any) -> tuple[bool, Optional[str]]:
+        """
+        Проверка конфликтов и GRANT / REVOKE одним запросом к Registry.
+
+        Недоступность Registry (сеть, 5xx) пробрасывается, чтобы сообщение
+        вернулось в очередь; ответы 4xx отклоняют заявку.
+        """
+        try:
+            result = self.registry.apply_access_change(
+                request.user_id,
+                request.permission_group_id,
+                request.action.value,
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                raise
+            logger.error(f"Ошибка Registry API: {e}")
+            return False, "Ошибка внешней системы (Registry API)"
+        if result.group_name:
+            self.group_names[request.permission_group_id] = result.group_name
+        return result.applied, result.reason
 
     def _process_access_request(
         self,
@@ -64,45 +156,99 @@ class AccessRequestWorker:
         Обрабатывает заявку на доступ:
         - проверяет конфликты
         - выполняет GRANT / REVOKE через Registry
+
+        Как и в _apply_access_change, недоступность Registry (сеть, 5xx,
+        открытый breaker) пробрасывается для повтора; ответы 4xx отклоняют заявку.
         """
 
-        if request.action is AccessAction.GRANT:
-            current_groups = self.registry.get_user_permission_groups(
-                request.user_id
-            )
-            group_ids = [g["id"] for g in current_groups]
+        if settings.use_apply_endpoint:
+            with metrics.stage(metrics.STAGE_REGISTRY):
+                return self._apply_access_change(request)
 
-            has_conflict, reason = self.registry.check_conflicts(
-                group_ids,
-                request.permission_group_id,
-            )
+        if request.action is AccessAction.GRANT:
+            with metrics.stage(metrics.STAGE_CONFLICT_CHECK):
+                has_conflict, reason = self._check_conflicts(request)
             if has_conflict:
                 return False, reason or "Конфликт прав доступа"
 
         try:
-            if request.action is AccessAction.GRANT:
-                self.registry.grant_permission_group(
-                    request.user_id,
-                    request.permission_group_id,
-                )
-            else:
-                self.registry.revoke_permission_group(
-                    request.user_id,
-                    request.permission_group_id,
-                )
-        except Exception as e:
+            with metrics.stage(metrics.STAGE_REGISTRY):
+                if request.action is AccessAction.GRANT:
+                    self.registry.grant_permission_group(
+                        request.user_id,
+                        request.permission_group_id,
+                    )
+                else:
+                    self.registry.revoke_permission_group(
+                        request.user_id,
+                        request.permission_group_id,
+                    )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                raise
             logger.error(f"Ошибка Registry API: {e}")
             return False, "Ошибка внешней системы (Registry API)"
 
         return True, None
 
 
+    @staticmethod
+    def _is_redelivery(method: Any, properties: Any) -> bool:
+        """Сообщение уже обрабатывалось: повторная доставка, отложенный повтор или redrive."""
+        return is_redelivery(method.redelivered, properties.headers)
+
+    def _retry_later(self, method: Any, properties: Any, body: bytes):
+        """
+        Откладывает повторную обработку сообщения вместо немедленного requeue.
+
+        Копия уходит в очередь повторов с нарастающим TTL и по его истечении
+        возвращается в тот же шард. После settings.max_retries попыток
+        сообщение отклоняется и паркуется в очереди мертвых сообщений.
+        """
+        delay_ms = next_retry_delay(properties.headers)
+        if delay_ms is None:
+            logger.error(
+                f"Попытки исчерпаны ({retry_count(properties.headers)}), сообщение перемещено в DLQ"
+            )
+            self.channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            metrics.count(metrics.OUTCOME_DROPPED)
+            return
+
+        self.channel.basic_publish(
+            exchange=ACCESS_REQUEST_RETRY_EXCHANGE,
+            routing_key=method.routing_key,
+            body=body,
+            properties=pika.BasicProperties(
+                delivery_mode=2,
+                headers=retry_headers(properties.headers, delay_ms),
+            ),
+        )
+        self.channel.basic_ack(delivery_tag=method.delivery_tag)
+        metrics.count(metrics.OUTCOME_REQUEUED)
+        logger.info(f"Повтор обработки через {delay_ms} мс")
+
     def _on_message_callback(
         self,
         ch: BlockingChannel,
         method: Any,
         properties: Any,
         body: bytes,
+    ):
+        metrics.observe_queue_wait(properties.headers)
+        metrics.IN_FLIGHT.inc()
+        try:
+            with metrics.stage(metrics.STAGE_TOTAL):
+                self._handle_message(ch, method, properties, body)
+        finally:
+            metrics.IN_FLIGHT.dec()
+        self._check_breaker()
+
+    def _handle_message(
+        self,
+        ch: BlockingChannel,
+        method: Any,
+        properties: Any,
+        body: bytes,
     ):
         request_id_str = "unknown"
 
@@ -113,66 +259,345 @@ class AccessRequestWorker:
 
             logger.info(f"[request_id={request_id_str}] получено сообщение")
 
+            redelivered = self._is_redelivery(method, properties)
             with SessionLocal() as db:
-                request = get_access_request(db, request_id_str)
-
-                if not request:
-                    logger.warning(
-                        f"[request_id={request_id_str}] заявка не найдена, ACK"
+                # CAS PENDING -> PROCESSING сразу возвращает данные заявки,
+                # отдельный SELECT не нужен
+                with metrics.stage(metrics.STAGE_CLAIM):
+                    request = transition_request_status(
+                        db,
+                        request_id,
+                        AccessRequestStatus.PROCESSING,
+                        allowed_from=processing_allowed_from(redelivered),
                     )
-                    ch.basic_ack(delivery_tag=method.delivery_tag)
-                    return
+                    db.commit()
 
-                if request.status in (
-                    AccessRequestStatus.APPROVED,
-                    AccessRequestStatus.REJECTED,
-                ):
+                if request is None:
                     logger.info(
-                        f"[request_id={request_id_str}] заявка уже финализирована ({request.status}), пропуск"
+                        f"[request_id={request_id_str}] заявка не найдена, уже финализирована "
+                        f"или обрабатывается (дубль сообщения), ACK"
                     )
                     ch.basic_ack(delivery_tag=method.delivery_tag)
+                    metrics.count(metrics.OUTCOME_DUPLICATE)
                     return
 
-                self._update_status(
-                    db,
-                    request_id,
-                    AccessRequestStatus.PROCESSING,
-                )
-
-                success, error_reason = self._process_access_request(request)
-
-                if success:
-                    self._update_status(
-                        db,
-                        request_id,
-                        AccessRequestStatus.APPROVED,
+                # Повтор мог прийти после более поздней заявки на ту же группу
+                if redelivered and superseded_requests(db, [request]):
+                    success, error_reason = False, SUPERSEDED_REASON
+                else:
+                    success, error_reason = self._process_access_request(request)
+
+                with metrics.stage(metrics.STAGE_FINALIZE):
+                    if success:
+                        finalized = transition_request_status(
+                            db,
+                            request_id,
+                            AccessRequestStatus.APPROVED,
+                            group_names=self.group_names,
+                        )
+                    else:
+                        finalized = transition_request_status(
+                            db,
+                            request_id,
+                            AccessRequestStatus.REJECTED,
+                            error_reason,
+                        )
+                    db.commit()
+
+                if finalized is None:
+                    logger.warning(
+                        f"[request_id={request_id_str}] статус изменен параллельно, результат не записан"
                     )
+                    metrics.count(metrics.OUTCOME_DUPLICATE)
+                elif success:
                     logger.info(
                         f"[request_id={request_id_str}] заявка одобрена"
                     )
+                    metrics.count(metrics.OUTCOME_APPROVED)
                 else:
-                    self._update_status(
-                        db,
-                        request_id,
-                        AccessRequestStatus.REJECTED,
-                        error_reason,
-                    )
                     logger.info(
                         f"[request_id={request_id_str}] заявка отклонена: {error_reason}"
                     )
+                    metrics.count(metrics.OUTCOME_REJECTED)
 
             ch.basic_ack(delivery_tag=method.delivery_tag)
 
         except json.JSONDecodeError:
             logger.error("Некорректный JSON, сообщение отброшено")
             ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            metrics.count(metrics.OUTCOME_DROPPED)
 
         except Exception as e:
             logger.exception(
                 f"[request_id={request_id_str}] ошибка обработки: {e}"
             )
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            self._retry_later(method, properties, body)
+
+
+    def _on_batch_message_callback(
+        self,
+        ch: BlockingChannel,
+        method: Any,
+        properties: Any,
+        body: bytes,
+    ):
+        """Копит сообщения до batch_size штук или batch_timeout_ms."""
+        metrics.observe_queue_wait(properties.headers)
+        self._batch.append((method, properties, body))
+
+        if len(self._batch) >= settings.batch_size:
+            self._flush_batch()
+        elif self._batch_timer is None:
+            self._batch_timer = self.connection.call_later(
+                settings.batch_timeout_ms / 1000,
+                self._on_batch_timeout,
+            )
+
+    def _on_batch_timeout(self):
+        self._batch_timer = None
+        self._flush_batch()
+
+    def _flush_batch(self):
+        """Обрабатывает накопленный пакет и подтверждает сообщения."""
+        if self._batch_timer is not None:
+            self.connection.remove_timeout(self._batch_timer)
+            self._batch_timer = None
+
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+
+        metrics.IN_FLIGHT.inc(len(batch))
+        try:
+            with metrics.stage(metrics.STAGE_TOTAL):
+                # delivery_tag -> (ack, retry)
+                results = self._process_batch(batch)
+                self._settle_batch(
+                    results,
+                    {method.delivery_tag: (method, properties, body) for method, properties, body in batch},
+                )
+        finally:
+            metrics.IN_FLIGHT.dec(len(batch))
+        self._check_breaker()
 
+    def _process_batch(
+        self,
+        batch: list[tuple[Any, Any, bytes]],
+    ) -> dict[int, tuple[bool, bool]]:
+        """
+        Обрабатывает пакет сообщений:
+        - переводит заявки в PROCESSING одним CAS UPDATE ... RETURNING
+        - записывает итоговые статусы пачками
+        - ошибка одной заявки не влияет на остальные
+        """
+        results: dict[int, tuple[bool, bool]] = {}
+        tags_by_request: dict[uuid.UUID, list[int]] = defaultdict(list)
+        redelivered_ids: set[uuid.UUID] = set()
+
+        for method, properties, body in batch:
+            delivery_tag = method.delivery_tag
+            try:
+                payload = json.loads(body.decode("utf-8"))
+                request_id = uuid.UUID(payload["request_id"])
+            except (json.JSONDecodeError, KeyError, ValueError, TypeError):
+                logger.error("Некорректное сообщение, сообщение отброшено")
+                results[delivery_tag] = (False, False)
+                continue
+            tags_by_request[request_id].append(delivery_tag)
+            if self._is_redelivery(method, properties):
+                redelivered_ids.add(request_id)
+
+        if not tags_by_request:
+            return results
+
+        try:
+            with SessionLocal() as db:
+                with metrics.stage(metrics.STAGE_CLAIM):
+                    requests = transition_requests_status(
+                        db,
+                        [rid for rid in tags_by_request if rid not in redelivered_ids],
+                        AccessRequestStatus.PROCESSING,
+                    )
+                    requests.update(
+                        transition_requests_status(
+                            db,
+                            redelivered_ids,
+                            AccessRequestStatus.PROCESSING,
+                            allowed_from=processing_allowed_from(redelivered=True),
+                        )
+                    )
+                    # Повторы, обогнанные более поздними одобренными заявками
+                    superseded = superseded_requests(
+                        db, [requests[rid] for rid in redelivered_ids if rid in requests]
+                    )
+                    db.commit()
+
+                approved: list[uuid.UUID] = []
+                rejected: dict[str, list[uuid.UUID]] = defaultdict(list)
+                failed: list[uuid.UUID] = []
+
+                to_process = []
+                for request_id, tags in tags_by_request.items():
+                    request = requests.get(request_id)
+                    if request_id in superseded:
+                        rejected[SUPERSEDED_REASON].append(request_id)
+                        for tag in tags:
+                            results[tag] = (True, False)
+                        continue
+                    if request is not None:
+                        to_process.append((request_id, request))
+                        continue
+                    logger.info(
+                        f"[request_id={request_id}] заявка не найдена, уже финализирована "
+                        f"или обрабатывается (дубль сообщения), ACK"
+                    )
+                    for tag in tags:
+                        results[tag] = (True, False)
+
+                if settings.coalesce_batches:
+                    coalesced = coalesce_requests(to_process)
+                else:
+                    coalesced = CoalescedBatch(to_process, {}, {})
+
+                for survivor_id, request_ids in coalesced.superseded.items():
+                    rejected[f"Заменена заявкой {survivor_id}"].extend(request_ids)
+                    logger.info(
+                        f"[request_id={survivor_id}] отменяет более ранние заявки {request_ids}"
+                    )
+
+                for request_id, request in coalesced.to_apply:
+                    request_id_str = str(request_id)
+                    # Дубли получают тот же итоговый статус
+                    group = [request_id, *coalesced.duplicates.get(request_id, [])]
+                    try:
+                        success, error_reason = self._process_access_request(request)
+                    except Exception as e:
+                        logger.exception(
+                            f"[request_id={request_id_str}] ошибка обработки: {e}"
+                        )
+                        failed.extend(group)
+                        continue
+
+                    if success:
+                        approved.extend(group)
+                        logger.info(f"[request_id={request_id_str}] заявка одобрена")
+                    else:
+                        rejected[error_reason].extend(group)
+                        logger.info(
+                            f"[request_id={request_id_str}] заявка отклонена: {error_reason}"
+                        )
+
+                with metrics.stage(metrics.STAGE_FINALIZE):
+                    transition_requests_status(
+                        db, approved, AccessRequestStatus.APPROVED, group_names=self.group_names
+                    )
+                    for reason, request_ids in rejected.items():
+                        transition_requests_status(
+                            db, request_ids, AccessRequestStatus.REJECTED, reason
+                        )
+                    db.commit()
+
+        except Exception as e:
+            logger.exception(f"Ошибка обработки пакета: {e}")
+            for tags in tags_by_request.values():
+                for tag in tags:
+                    results.setdefault(tag, (False, True))
+            return results
+
+        def messages_of(request_ids) -> int:
+            return sum(len(tags_by_request[request_id]) for request_id in request_ids)
+
+        metrics.count(metrics.OUTCOME_APPROVED, messages_of(approved))
+        metrics.count(
+            metrics.OUTCOME_REJECTED,
+            sum(messages_of(request_ids) for request_ids in rejected.values()),
+        )
+        metrics.count(
+            metrics.OUTCOME_DUPLICATE,
+            messages_of(rid for rid in tags_by_request if rid not in requests),
+        )
+
+        for request_id in failed:
+            for tag in tags_by_request[request_id]:
+                results[tag] = (False, True)
+        for request_id, _ in to_process:
+            for tag in tags_by_request[request_id]:
+                results.setdefault(tag, (True, False))
+
+        return results
+
+    def _settle_batch(
+        self,
+        results: dict[int, tuple[bool, bool]],
+        messages: dict[int, tuple[Any, Any, bytes]],
+    ):
+        """
+        Подтверждает пакет: непрерывный префикс успешных сообщений -
+        одним basic_ack(multiple=True), остальные - поштучно.
+        """
+        tags = sorted(results)
+        prefix_end = 0
+        while prefix_end < len(tags) and results[tags[prefix_end]][0]:
+            prefix_end += 1
+
+        if prefix_end:
+            self.channel.basic_ack(delivery_tag=tags[prefix_end - 1], multiple=True)
+
+        for tag in tags[prefix_end:]:
+            ack, retry = results[tag]
+            if ack:
+                self.channel.basic_ack(delivery_tag=tag)
+            elif retry:
+                self._retry_later(*messages[tag])
+            else:
+                self.channel.basic_nack(delivery_tag=tag, requeue=False)
+                metrics.count(metrics.OUTCOME_DROPPED)
+
+    def _start_consuming(self):
+        self._consumer_tags = [
+            self.channel.basic_consume(
+                queue=queue,
+                on_message_callback=(
+                    self._on_batch_message_callback
+                    if self.batch_mode
+                    else self._on_message_callback
+                ),
+            )
+            for queue in self.queues
+        ]
+
+    def _check_breaker(self):
+        """Если цепь к Registry разомкнута - приостанавливает получение сообщений."""
+        if self._paused or registry_breaker.state is not CircuitState.OPEN:
+            return
+        self._paused = True
+        # Не отменяем подписку изнутри callback'а сообщения
+        self.connection.call_later(0, self._pause_consuming)
+
+    def _pause_consuming(self):
+        """
+        Отменяет подписки, чтобы не забирать сообщения, которые нельзя обработать.
+
+        Накопленный пакет обрабатывается (и уходит на отложенный повтор),
+        полученные, но не переданные в callback сообщения pika возвращает в очередь.
+        """
+        self._flush_batch()
+        for consumer_tag in self._consumer_tags:
+            self.channel.basic_cancel(consumer_tag)
+        self._consumer_tags = []
+
+        delay = max(registry_breaker.retry_after(), 1.0)
+        logger.warning(
+            f"Registry недоступен, получение сообщений приостановлено на {delay:.0f} с"
+        )
+        self.connection.call_later(delay, self._resume_consuming)
+
+    def _resume_consuming(self):
+        if self._stop_requested:
+            return
+        logger.info("Возобновление получения сообщений")
+        self._paused = False
+        self._start_consuming()
 
     def stop(self, *args):
         """Безопасная остановка."""
@@ -182,19 +607,34 @@ class AccessRequestWorker:
             self.connection.close()
         self.registry.close()
 
-    def run(self):
+    def request_stop(self):
+        """
+        Остановка из другого потока (supervisor).
+
+        pika-соединение не потокобезопасно, поэтому остановка
+        передается в поток воркера через add_callback_threadsafe.
+        """
+        self._stop_requested = True
+        connection = self.connection
+        if connection and connection.is_open:
+            connection.add_callback_threadsafe(self._stop_consuming)
+
+    def _stop_consuming(self):
+        if self.channel and self.channel.is_open:
+            self.channel.stop_consuming()
+
+    def run(self, install_signal_handlers: bool = True):
         """Запуск цикла прослушивания."""
-        signal.signal(signal.SIGINT, self.stop)
-        signal.signal(signal.SIGTERM, self.stop)
+        if install_signal_handlers:
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
 
         while not self._stop_requested:
             try:
                 self._connect()
-                self.channel.basic_consume(
-                    queue=ACCESS_REQUEST_QUEUE, 
-                    on_message_callback=self._on_message_callback
-                )
-                logger.info("Воркер запущен и ожидает задач...")
+                self._refresh_conflict_matrix()
+                self._start_consuming()
+                logger.info(f"Воркер запущен и ожидает задач из {self.queues}...")
                 self.channel.start_consuming()
             except pika.exceptions.AMQPConnectionError:
                 if self._stop_requested:
@@ -206,6 +646,41 @@ class AccessRequestWorker:
                 logger.exception(f"Непредвиденная ошибка: {e}")
                 break
 
-if __name__ == "__main__":
+        if self.connection and self.connection.is_open:
+            self.connection.close()
+        self.registry.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ARS worker")
+    parser.add_argument(
+        "--consumers", type=int, default=1, help="Консьюмеров (потоков) на процесс"
+    )
+    parser.add_argument("--processes", type=int, default=1, help="Число процессов")
+    parser.add_argument(
+        "--healthcheck",
+        action="store_true",
+        help="Проверить состояние запущенного supervisor'а и выйти",
+    )
+    args = parser.parse_args()
+
+    if not args.healthcheck:
+        metrics.start_metrics_server(settings.metrics_port)
+
+    if args.healthcheck or args.consumers > 1 or args.processes > 1:
+        from worker.app.workers import supervisor
+
+        if args.healthcheck:
+            sys.exit(0 if supervisor.check_health() else 1)
+        try:
+            supervisor.run(consumers=args.consumers, processes=args.processes)
+        except ValueError as e:
+            parser.error(str(e))
+        return
+
     worker = AccessRequestWorker()
     worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+import asyncio
+import json
+import logging
+import signal
+import uuid
+from typing import Any, Optional
+
+import aio_pika
+import httpx
+from aio_pika.abc import AbstractIncomingMessage
+
+from worker.app.core import metrics
+from worker.app.core.config import settings
+from worker.app.core.db import AsyncSessionLocal, dispose_async_engine
+from worker.app.core.rabbitmq import (
+    declare_topology_async,
+    next_retry_delay,
+    retry_headers,
+)
+from worker.app.core.registry import make_async_registry_client, registry_breaker
+from common.enums import AccessAction
+from common.messaging import ACCESS_REQUEST_RETRY_EXCHANGE, is_redelivery, retry_count
+from common.models.access_request import AccessRequestStatus
+from common.clients.resilience import CircuitState
+from worker.app.services.conflicts import ConflictMatrix
+from worker.app.services.requests import (
+    SUPERSEDED_REASON,
+    processing_allowed_from,
+    superseded_requests,
+    transition_request_status,
+)
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+class AsyncAccessRequestWorker:
+    """
+    Asyncio-версия AccessRequestWorker.
+
+    Держит до settings.max_in_flight заявок в обработке одновременно:
+    пока одна заявка ждет Registry или Postgres, процесс обрабатывает другие.
+    """
+
+    def __init__(self):
+        self.registry = make_async_registry_client()
+        self.conflict_matrix = ConflictMatrix(settings.conflict_matrix_refresh_s)
+        self._conflict_matrix_lock = asyncio.Lock()
+        # Имена групп из ответов Registry - для проекции прав ARS
+        self.group_names: dict[uuid.UUID, str] = {}
+        self.connection: Optional[aio_pika.abc.AbstractRobustConnection] = None
+        self.channel: Optional[aio_pika.abc.AbstractChannel] = None
+        self.retry_exchange: Optional[aio_pika.abc.AbstractExchange] = None
+        self._queues: list[aio_pika.abc.AbstractQueue] = []
+        self._consumers: list[tuple[aio_pika.abc.AbstractQueue, str]] = []
+        self._pause_task: Optional[asyncio.Task] = None
+        self._semaphore = asyncio.Semaphore(settings.max_in_flight)
+        self._in_flight: set[asyncio.Task] = set()
+        self._stop_event = asyncio.Event()
+        # Заявки одного пользователя обрабатываются последовательно даже
+        # при параллельной обработке сообщений внутри шарда
+        self._user_locks: dict[str, asyncio.Lock] = {}
+        self._user_lock_waiters: dict[str, int] = {}
+
+    async def _connect(self) -> list[aio_pika.abc.AbstractQueue]:
+        """Установка соединения с RabbitMQ (с автоматическим переподключением)."""
+        self.connection = await aio_pika.connect_robust(settings.rabbitmq_url)
+        self.channel = await self.connection.channel()
+        # Prefetch ограничивает число неподтвержденных сообщений на процесс
+        await self.channel.set_qos(prefetch_count=settings.max_in_flight)
+        queues = await declare_topology_async(self.channel)
+        self.retry_exchange = await self.channel.get_exchange(
+            ACCESS_REQUEST_RETRY_EXCHANGE, ensure=False
+        )
+        logger.info("Успешное подключение к RabbitMQ (asyncio)")
+        return queues
+
+    async def _transition(
+        self,
+        request_id: uuid.UUID,
+        status: AccessRequestStatus,
+        reason: Optional[str] = None,
+        allowed_from: Optional[tuple[AccessRequestStatus, ...]] = None,
+    ) -> Any:
+        """CAS-перевод статуса заявки с коммитом. None - CAS проигран."""
+        async with AsyncSessionLocal() as db:
+            row = await db.run_sync(
+                transition_request_status,
+                request_id,
+                status,
+                reason,
+                allowed_from,
+                self.group_names,
+            )
+            await db.commit()
+            return row
+
+    async def _is_superseded(self, request: Any) -> bool:
+        """После заявки уже одобрена более поздняя заявка на ту же группу."""
+        async with AsyncSessionLocal() as db:
+            return bool(await db.run_sync(superseded_requests, [request]))
+
+    async def _refresh_conflict_matrix(self):
+        """Обновляет матрицу конфликтов, если истек интервал проверки."""
+        if not self.conflict_matrix.is_stale:
+            return
+        # Одно обновление на все параллельные задачи
+        async with self._conflict_matrix_lock:
+            if not self.conflict_matrix.is_stale:
+                return
+            try:
+                self.conflict_matrix.apply(
+                    await self.registry.get_conflict_matrix(self.conflict_matrix.version)
+                )
+            except Exception as e:
+                logger.warning(f"Не удалось обновить матрицу конфликтов: {e}")
+
+    async def _check_conflicts(self, request: Any) -> tuple[bool, Optional[str]]:
+        """
+        Проверяет конфликт по локальной матрице.
+
+        Текущие группы пользователя запрашиваются, только если новая группа
+        вообще с чем-то конфликтует. Без загруженной матрицы - проверка в Registry.
+        """
+        await self._refresh_conflict_matrix()
+
+        if not self.conflict_matrix.loaded:
+            current_groups = await self.registry.get_user_permission_groups(
+                request.user_id
+            )
+            group_ids = [g["id"] for g in current_groups]
+            return await self.registry.check_conflicts(
+                group_ids,
+                request.permission_group_id,
+            )
+
+        if not self.conflict_matrix.conflicts_of(request.permission_group_id):
+            return False, None
+
+        current_groups = await self.registry.get_user_permission_groups(
+            request.user_id
+        )
+        if self.conflict_matrix.has_conflict(
+            [g["id"] for g in current_groups],
+            request.permission_group_id,
+        ):
+            return True, "Permission group conflict"
+        return False, None
+
+    async def _apply_access_change(self, request: Any) -> tuple[bool, Optional[str]]:
+        """
+        Проверка конфликтов и GRANT / REVOKE одним запросом к Registry.
+
+        Недоступность Registry (сеть, 5xx) пробрасывается, чтобы сообщение
+        вернулось в очередь; ответы 4xx отклоняют заявку.
+        """
+        try:
+            result = await self.registry.apply_access_change(
+                request.user_id,
+                request.permission_group_id,
+                request.action.value,
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                raise
+            logger.error(f"Ошибка Registry API: {e}")
+            return False, "Ошибка внешней системы (Registry API)"
+        if result.group_name:
+            self.group_names[request.permission_group_id] = result.group_name
+        return result.applied, result.reason
+
+    async def _process_access_request(
+        self,
+        request: Any,
+    ) -> tuple[bool, Optional[str]]:
+        """
+        Обрабатывает заявку на доступ:
+        - проверяет конфликты
+        - выполняет GRANT / REVOKE через Registry
+
+        Как и в _apply_access_change, недоступность Registry (сеть, 5xx,
+        открытый breaker) пробрасывается для повтора; ответы 4xx отклоняют заявку.
+        """
+
+        if settings.use_apply_endpoint:
+            with metrics.stage(metrics.STAGE_REGISTRY):
+                return await self._apply_access_change(request)
+
+        if request.action is AccessAction.GRANT:
+            with metrics.stage(metrics.STAGE_CONFLICT_CHECK):
+                has_conflict, reason = await self._check_conflicts(request)
+            if has_conflict:
+                return False, reason or "Конфликт прав доступа"
+
+        try:
+            with metrics.stage(metrics.STAGE_REGISTRY):
+                if request.action is AccessAction.GRANT:
+                    await self.registry.grant_permission_group(
+                        request.user_id,
+                        request.permission_group_id,
+                    )
+                else:
+                    await self.registry.revoke_permission_group(
+                        request.user_id,
+                        request.permission_group_id,
+                    )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                raise
+            logger.error(f"Ошибка Registry API: {e}")
+            return False, "Ошибка внешней системы (Registry API)"
+
+        return True, None
+
+    async def _retry_later(self, message: AbstractIncomingMessage):
+        """
+        Откладывает повторную обработку сообщения вместо немедленного requeue.
+        После settings.max_retries попыток сообщение паркуется в DLQ.
+        """
+        delay_ms = next_retry_delay(message.headers)
+        if delay_ms is None:
+            logger.error(
+                f"Попытки исчерпаны ({retry_count(message.headers)}), сообщение перемещено в DLQ"
+            )
+            await message.nack(requeue=False)
+            metrics.count(metrics.OUTCOME_DROPPED)
+            return
+
+        await self.retry_exchange.publish(
+            aio_pika.Message(
+                message.body,
+                headers=retry_headers(message.headers, delay_ms),
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            ),
+            routing_key=message.routing_key,
+        )
+        await message.ack()
+        metrics.count(metrics.OUTCOME_REQUEUED)
+        logger.info(f"Повтор обработки через {delay_ms} мс")
+
+    async def _handle_message(self, message: AbstractIncomingMessage):
+        request_id_str = "unknown"
+
+        try:
+            payload = json.loads(message.body.decode("utf-8"))
+            request_id = uuid.UUID(payload["request_id"])
+            request_id_str = str(request_id)
+
+            logger.info(f"[request_id={request_id_str}] получено сообщение")
+
+            redelivered = is_redelivery(message.redelivered, message.headers)
+            with metrics.stage(metrics.STAGE_CLAIM):
+                request = await self._transition(
+                    request_id,
+                    AccessRequestStatus.PROCESSING,
+                    allowed_from=processing_allowed_from(redelivered),
+                )
+
+            if request is None:
+                logger.info(
+                    f"[request_id={request_id_str}] заявка не найдена, уже финализирована "
+                    f"или обрабатывается (дубль сообщения), ACK"
+                )
+                await message.ack()
+                metrics.count(metrics.OUTCOME_DUPLICATE)
+                return
+
+            # Повтор мог прийти после более поздней заявки на ту же группу
+            if redelivered and await self._is_superseded(request):
+                success, error_reason = False, SUPERSEDED_REASON
+            else:
+                success, error_reason = await self._process_access_request(request)
+
+            with metrics.stage(metrics.STAGE_FINALIZE):
+                if success:
+                    finalized = await self._transition(
+                        request_id, AccessRequestStatus.APPROVED
+                    )
+                else:
+                    finalized = await self._transition(
+                        request_id,
+                        AccessRequestStatus.REJECTED,
+                        error_reason,
+                    )
+
+            if finalized is None:
+                logger.warning(
+                    f"[request_id={request_id_str}] статус изменен параллельно, результат не записан"
+                )
+                metrics.count(metrics.OUTCOME_DUPLICATE)
+            elif success:
+                logger.info(f"[request_id={request_id_str}] заявка одобрена")
+                metrics.count(metrics.OUTCOME_APPROVED)
+            else:
+                logger.info(
+                    f"[request_id={request_id_str}] заявка отклонена: {error_reason}"
+                )
+                metrics.count(metrics.OUTCOME_REJECTED)
+
+            await message.ack()
+
+        except json.JSONDecodeError:
+            logger.error("Некорректный JSON, сообщение отброшено")
+            await message.nack(requeue=False)
+            metrics.count(metrics.OUTCOME_DROPPED)
+
+        except Exception as e:
+            logger.exception(f"[request_id={request_id_str}] ошибка обработки: {e}")
+            await self._retry_later(message)
+
+    def _acquire_user_lock(self, user_id: str) -> asyncio.Lock:
+        lock = self._user_locks.setdefault(user_id, asyncio.Lock())
+        self._user_lock_waiters[user_id] = self._user_lock_waiters.get(user_id, 0) + 1
+        return lock
+
+    def _release_user_lock(self, user_id: str):
+        self._user_lock_waiters[user_id] -= 1
+        if not self._user_lock_waiters[user_id]:
+            del self._user_lock_waiters[user_id]
+            del self._user_locks[user_id]
+
+    async def _on_message(self, message: AbstractIncomingMessage):
+        """Запускает обработку сообщения, не превышая max_in_flight."""
+        task = asyncio.current_task()
+        self._in_flight.add(task)
+        metrics.observe_queue_wait(message.headers)
+        try:
+            try:
+                user_id = str(json.loads(message.body.decode("utf-8"))["user_id"])
+            except Exception:
+                # Некорректное сообщение отбросит _handle_message
+                user_id = ""
+
+            lock = self._acquire_user_lock(user_id)
+            try:
+                async with lock, self._semaphore:
+                    metrics.IN_FLIGHT.inc()
+                    try:
+                        with metrics.stage(metrics.STAGE_TOTAL):
+                            await self._handle_message(message)
+                    finally:
+                        metrics.IN_FLIGHT.dec()
+            finally:
+                self._release_user_lock(user_id)
+            self._check_breaker()
+        finally:
+            self._in_flight.discard(task)
+
+    async def _start_consuming(self):
+        self._consumers = [
+            (queue, await queue.consume(self._on_message)) for queue in self._queues
+        ]
+
+    async def _stop_consuming(self):
+        consumers, self._consumers = self._consumers, []
+        for queue, consumer_tag in consumers:
+            await queue.cancel(consumer_tag)
+
+    def _check_breaker(self):
+        """Если цепь к Registry разомкнута - приостанавливает получение сообщений."""
+        if self._pause_task is not None or registry_breaker.state is not CircuitState.OPEN:
+            return
+        self._pause_task = asyncio.create_task(self._pause_consuming())
+
+    async def _pause_consuming(self):
+        """
+        Отменяет подписки до перехода цепи в HALF_OPEN.
+
+        Заявки, уже взятые в обработку, завершаются (и уходят на отложенный
+        повтор), неразобранные prefetch-сообщения возвращаются в очередь.
+        """
+        try:
+            await self._stop_consuming()
+            delay = max(registry_breaker.retry_after(), 1.0)
+            logger.warning(
+                f"Registry недоступен, получение сообщений приостановлено на {delay:.0f} с"
+            )
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+            logger.info("Возобновление получения сообщений")
+            await self._start_consuming()
+        finally:
+            self._pause_task = None
+
+    def stop(self, *args):
+        """Запрос безопасной остановки (из обработчика сигнала)."""
+        logger.info("Завершение работы воркера...")
+        self._stop_event.set()
+
+    async def _shutdown(self):
+        """Прекращает получение новых сообщений и дожидается текущих."""
+        if self._pause_task is not None:
+            await self._pause_task
+        await self._stop_consuming()
+
+        if self._in_flight:
+            logger.info(f"Ожидание завершения {len(self._in_flight)} заявок...")
+            _, pending = await asyncio.wait(
+                set(self._in_flight),
+                timeout=settings.shutdown_timeout_s,
+            )
+            for task in pending:
+                task.cancel()
+
+        await self.connection.close()
+        await self.registry.close()
+        await dispose_async_engine()
+
+    async def _main(self):
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGINT, self.stop)
+        loop.add_signal_handler(signal.SIGTERM, self.stop)
+
+        self._queues = await self._connect()
+        await self._refresh_conflict_matrix()
+        await self._start_consuming()
+        logger.info(
+            f"Воркер (asyncio, max_in_flight={settings.max_in_flight}) запущен и ожидает задач..."
+        )
+
+        await self._stop_event.wait()
+        await self._shutdown()
+
+    def run(self):
+        """Запуск цикла прослушивания."""
+        asyncio.run(self._main())
+
+
+if __name__ == "__main__":
+    metrics.start_metrics_server(settings.metrics_port)
+    worker = AsyncAccessRequestWorker()
+    worker.run()
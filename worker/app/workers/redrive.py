@@ -0,0 +1,138 @@
+"""
+Повторная отправка запаркованных сообщений из очереди мертвых сообщений.
+
+    python -m worker.app.workers.redrive [--limit N]
+
+Сообщения возвращаются в шард пользователя со сброшенным счетчиком повторов
+и заголовком x-redriven: по нему воркер снова берет заявку, оставшуюся в PROCESSING.
+
+При переходе на шардированные очереди тем же способом переносятся сообщения,
+оставшиеся в прежней единой очереди access_request_created:
+
+    python -m worker.app.workers.redrive --from-legacy-queue
+"""
+import argparse
+import json
+import logging
+from typing import Any, Optional
+
+import pika
+from pika.exceptions import ChannelClosedByBroker
+
+from worker.app.core.config import settings
+from worker.app.core.rabbitmq import declare_topology
+from common.messaging import (
+    ACCESS_REQUEST_DEAD_QUEUE,
+    ACCESS_REQUEST_EXCHANGE,
+    LEGACY_ACCESS_REQUEST_QUEUE,
+    PUBLISHED_AT_HEADER,
+    REDRIVEN_HEADER,
+    RETRY_COUNT_HEADER,
+    RETRY_DELAY_HEADER,
+    shard_for_user,
+    shard_queue_name,
+)
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# Служебные заголовки повторов и dead-letter, которые не переносятся при повторной отправке.
+# Время публикации тоже сбрасывается: иначе время в DLQ попадет в метрику ожидания в очереди.
+_DROPPED_HEADERS = (RETRY_COUNT_HEADER, RETRY_DELAY_HEADER, PUBLISHED_AT_HEADER)
+_DROPPED_HEADER_PREFIXES = ("x-death", "x-first-death", "x-last-death")
+
+
+def _routing_key(properties: Any, body: bytes) -> Optional[str]:
+    """Шард пользователя; для некорректного тела - исходный ключ из x-death."""
+    try:
+        user_id = json.loads(body.decode("utf-8"))["user_id"]
+        return shard_queue_name(shard_for_user(user_id, settings.queue_shards))
+    except (ValueError, KeyError, TypeError):
+        pass
+
+    deaths = (properties.headers or {}).get("x-death") or []
+    for death in deaths:
+        routing_keys = death.get("routing-keys") or []
+        if routing_keys:
+            return routing_keys[0]
+    return None
+
+
+def _redrive_headers(headers: dict | None) -> dict:
+    return {
+        **{
+            key: value
+            for key, value in (headers or {}).items()
+            if key not in _DROPPED_HEADERS and not key.startswith(_DROPPED_HEADER_PREFIXES)
+        },
+        REDRIVEN_HEADER: 1,
+    }
+
+
+def redrive(limit: Optional[int] = None, source: str = ACCESS_REQUEST_DEAD_QUEUE) -> int:
+    """Переносит до limit сообщений из source (по умолчанию DLQ) в очереди шардов."""
+    connection = pika.BlockingConnection(pika.URLParameters(settings.rabbitmq_url))
+    channel = connection.channel()
+    moved = 0
+
+    try:
+        declare_topology(channel)
+        channel.confirm_delivery()
+
+        # Обрабатываем только то, что лежало в очереди на момент запуска:
+        # снова упавшие сообщения не зациклятся
+        try:
+            pending = channel.queue_declare(queue=source, passive=True).method.message_count
+        except ChannelClosedByBroker:
+            logger.info(f"Очереди {source} нет, переносить нечего")
+            return 0
+        if limit is not None:
+            pending = min(pending, limit)
+
+        for _ in range(pending):
+            method, properties, body = channel.basic_get(queue=source)
+            if method is None:
+                break
+
+            routing_key = _routing_key(properties, body)
+            if routing_key is None:
+                logger.error(f"Не удалось определить шард сообщения, оставлено в {source}")
+                channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+                continue
+
+            channel.basic_publish(
+                exchange=ACCESS_REQUEST_EXCHANGE,
+                routing_key=routing_key,
+                body=body,
+                properties=pika.BasicProperties(
+                    delivery_mode=2,
+                    headers=_redrive_headers(properties.headers),
+                ),
+            )
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            moved += 1
+    finally:
+        if connection.is_open:
+            connection.close()
+
+    logger.info(f"Из {source} повторно отправлено сообщений: {moved}")
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Повторная отправка сообщений из DLQ")
+    parser.add_argument("--limit", type=int, default=None, help="Максимум сообщений")
+    parser.add_argument(
+        "--from-legacy-queue",
+        action="store_true",
+        help=f"Перенести сообщения из прежней единой очереди {LEGACY_ACCESS_REQUEST_QUEUE}",
+    )
+    args = parser.parse_args()
+    redrive(
+        args.limit,
+        LEGACY_ACCESS_REQUEST_QUEUE if args.from_legacy_queue else ACCESS_REQUEST_DEAD_QUEUE,
+    )
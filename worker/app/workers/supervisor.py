@@ -0,0 +1,237 @@
+"""
+Supervisor: несколько консьюмеров в одном контейнере.
+
+    python -m worker.app.workers.access_request_worker --consumers N [--processes M]
+
+В каждом процессе работают N потоков AccessRequestWorker, у каждого свое
+соединение и канал RabbitMQ (pika не потокобезопасен) и общий пул БД
+на N соединений. Упавшие потоки и процессы перезапускаются; состояние
+пишется в settings.health_file для healthcheck.
+
+Очереди шардов объявлены с x-single-active-consumer, поэтому шарды
+settings.consumed_shards делятся между N x M консьюмерами без пересечений
+(assign_shards): иначе на каждом шарде работал бы один консьюмер, а
+остальные простаивали в резерве.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from typing import Optional
+
+from worker.app.core import db, metrics
+from worker.app.core.config import settings
+from worker.app.workers.access_request_worker import AccessRequestWorker
+
+
+logger = logging.getLogger(__name__)
+
+# Как часто проверять потоки / процессы и обновлять файл состояния, сек
+_MONITOR_INTERVAL_S = 1.0
+# Сколько ждать остановки консьюмеров при завершении, сек
+_SHUTDOWN_TIMEOUT_S = 30.0
+
+
+def _write_health(path: str, state: dict) -> None:
+    """Атомарно записывает состояние в файл."""
+    state = {**state, "pid": os.getpid(), "updated_at": time.time()}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def _read_health(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def check_health(path: Optional[str] = None) -> bool:
+    """Supervisor жив (файл свежий) и все консьюмеры работают."""
+    state = _read_health(path or settings.health_file)
+    if state is None:
+        return False
+    if time.time() - state["updated_at"] > settings.health_max_age_s:
+        return False
+    return state["alive"] == state["expected"]
+
+
+def assign_shards(shards: list[int], index: int, total: int) -> list[int]:
+    """Шарды консьюмера index из total: каждый total-й шард, начиная с index-го."""
+    return shards[index::total]
+
+
+def check_consumers(consumers: int, processes: int) -> None:
+    """
+    Raises:
+        ValueError: консьюмеров больше, чем шардов - лишним нечего слушать
+    """
+    shards = len(settings.consumed_shards)
+    if consumers * processes > shards:
+        raise ValueError(
+            f"Консьюмеров ({processes} x {consumers}) больше, чем шардов ({shards}): "
+            f"увеличьте QUEUE_SHARDS или уменьшите --consumers/--processes"
+        )
+
+
+class ConsumerSupervisor:
+    """
+    N потоков-консьюмеров в одном процессе.
+
+    process_index / processes - номер процесса и число процессов: консьюмер
+    index получает шарды assign_shards(..., process_index * N + index, N * M).
+    """
+
+    def __init__(
+        self, consumers: int, health_file: str, process_index: int = 0, processes: int = 1
+    ):
+        self.consumers = consumers
+        self.health_file = health_file
+        total = consumers * processes
+        self.shards = [
+            assign_shards(settings.consumed_shards, process_index * consumers + index, total)
+            for index in range(consumers)
+        ]
+        self.restarts = 0
+        self._workers: list[Optional[AccessRequestWorker]] = [None] * consumers
+        self._threads: list[Optional[threading.Thread]] = [None] * consumers
+        self._stop_event = threading.Event()
+
+    def _start_consumer(self, index: int) -> None:
+        worker = AccessRequestWorker(shards=self.shards[index])
+        thread = threading.Thread(
+            target=worker.run,
+            kwargs={"install_signal_handlers": False},
+            name=f"consumer-{index}",
+            daemon=True,
+        )
+        self._workers[index] = worker
+        self._threads[index] = thread
+        thread.start()
+
+    def _alive(self) -> int:
+        return sum(1 for thread in self._threads if thread and thread.is_alive())
+
+    def stop(self, *args):
+        logger.info("Supervisor: завершение работы...")
+        self._stop_event.set()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        db.configure_pool(self.consumers)
+        for index in range(self.consumers):
+            self._start_consumer(index)
+        logger.info(
+            f"Supervisor: запущено консьюмеров: {self.consumers}, шарды: {self.shards}"
+        )
+
+        while not self._stop_event.wait(_MONITOR_INTERVAL_S):
+            for index, thread in enumerate(self._threads):
+                if not thread.is_alive():
+                    logger.error(f"Supervisor: консьюмер {index} остановился, перезапуск")
+                    self.restarts += 1
+                    self._start_consumer(index)
+            _write_health(
+                self.health_file,
+                {"expected": self.consumers, "alive": self._alive(), "restarts": self.restarts},
+            )
+
+        for worker in self._workers:
+            worker.request_stop()
+        deadline = time.monotonic() + _SHUTDOWN_TIMEOUT_S
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+        _write_health(
+            self.health_file,
+            {"expected": self.consumers, "alive": self._alive(), "restarts": self.restarts},
+        )
+        db.engine.dispose()
+        logger.info("Supervisor: остановлен")
+
+
+def _process_health_file(index: int) -> str:
+    return f"{settings.health_file}.{index}"
+
+
+def _run_process(consumers: int, index: int, processes: int) -> None:
+    ConsumerSupervisor(consumers, _process_health_file(index), index, processes).run()
+
+
+def _run_processes(consumers: int, processes: int) -> None:
+    """M процессов по N консьюмеров; родитель следит за ними и агрегирует состояние."""
+    stop_event = threading.Event()
+
+    def stop(*args):
+        logger.info("Supervisor: завершение работы процессов...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    if settings.metrics_port and not metrics.multiprocess_enabled():
+        logger.warning(
+            "PROMETHEUS_MULTIPROC_DIR не задан: метрики дочерних процессов не попадут в /metrics"
+        )
+
+    # spawn: дочерние процессы не наследуют соединения родителя
+    context = multiprocessing.get_context("spawn")
+    restarts = 0
+
+    def start(index: int) -> multiprocessing.Process:
+        process = context.Process(
+            target=_run_process,
+            args=(consumers, index, processes),
+            name=f"worker-{index}",
+        )
+        process.start()
+        return process
+
+    children: list[multiprocessing.Process] = [start(index) for index in range(processes)]
+    logger.info(f"Supervisor: запущено процессов: {processes} x {consumers} консьюмеров")
+
+    while not stop_event.wait(_MONITOR_INTERVAL_S):
+        for index, process in enumerate(children):
+            if not process.is_alive():
+                logger.error(
+                    f"Supervisor: процесс {index} завершился (код {process.exitcode}), перезапуск"
+                )
+                restarts += 1
+                metrics.mark_process_dead(process.pid)
+                children[index] = start(index)
+
+        alive = 0
+        for index in range(processes):
+            state = _read_health(_process_health_file(index))
+            if state and time.time() - state["updated_at"] <= settings.health_max_age_s:
+                alive += state["alive"]
+        _write_health(
+            settings.health_file,
+            {"expected": processes * consumers, "alive": alive, "restarts": restarts},
+        )
+
+    for process in children:
+        process.terminate()
+    deadline = time.monotonic() + _SHUTDOWN_TIMEOUT_S
+    for process in children:
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            process.kill()
+        metrics.mark_process_dead(process.pid)
+    logger.info("Supervisor: процессы остановлены")
+
+
+def run(consumers: int, processes: int = 1) -> None:
+    check_consumers(consumers, processes)
+    if processes > 1:
+        _run_processes(consumers, processes)
+    else:
+        ConsumerSupervisor(consumers, settings.health_file).run()